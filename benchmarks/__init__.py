@@ -0,0 +1,4 @@
+# coding=utf-8
+'''
+Offline benchmarks of tinder_api. Run with `python -m benchmarks.run`.
+'''
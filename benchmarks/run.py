@@ -0,0 +1,212 @@
+# coding=utf-8
+'''
+Offline benchmarks of tinder_api, against a local stub of the Tinder API.
+
+usage: python -m benchmarks.run [--quick] [--output results.json]
+       python -m benchmarks.run --baseline previous.json --tolerance 0.25
+
+Results are written as JSON. Every result has a `seconds` value, lower is better;
+with `--baseline`, the run fails when a result is slower than the baseline by more than `--tolerance`.
+'''
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import synthetic
+from benchmarks.stub_server import StubServer
+from tinder_api import Tinder_API, helpers, timestamps
+from tinder_api.match_view import view_matches
+from tinder_api.snapshot import Snapshot, write_snapshot
+from tinder_api.transport import BufferedResponse
+
+PROFILE_PATH = '/profile'
+
+DEFAULTS = {'sizes': [1000, 100000, 1000000], 'concurrency': [1, 4, 16, 64], 'requests': 2000}
+QUICK_DEFAULTS = {'sizes': [1000, 10000], 'concurrency': [1, 8], 'requests': 300}
+
+
+class _NullTransport(object):
+    '''
+    Transport answering every request at once with the same response, to measure the client's own overhead.
+    '''
+    def __init__(self, payload_size):
+        self._response = BufferedResponse(200, {}, json.dumps({'meta': {'status': 200}, 'data': {'padding': 'x' * payload_size}}).encode('utf-8'))
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        return self._response
+
+
+    def close(self):
+        pass
+
+
+def _best_of(function, repeat):
+    '''
+    :return: the fastest of `repeat` runs of `function`, in seconds.
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _percentile(sorted_values, percent):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def bench_request_overhead(requests, payload_size):
+    '''
+    Time spent in `custom_request` itself, without any network.
+    '''
+    with Tinder_API(host='http://stub', api_token='benchmark', transport=_NullTransport(payload_size)) as tinder_api:
+        seconds = _best_of(lambda: [tinder_api.custom_request(PROFILE_PATH) for _ in range(requests)], 3) / requests
+    return {'name': 'custom_request_overhead', 'params': {'payload_size': payload_size}, 'seconds': seconds}
+
+
+def bench_latency(server, requests):
+    '''
+    Latency of sequential calls to the stub server, over one kept-alive connection.
+    '''
+    latencies = []
+    with Tinder_API(host=server.url, api_token='benchmark') as tinder_api:
+        tinder_api.custom_request(PROFILE_PATH)  # opens the connection
+        for _ in range(requests):
+            start = time.perf_counter()
+            tinder_api.custom_request(PROFILE_PATH)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'name': 'custom_request_latency',
+        'params': {'requests': requests},
+        'seconds': _percentile(latencies, 50),
+        'p95': _percentile(latencies, 95),
+        'p99': _percentile(latencies, 99),
+    }
+
+
+def bench_throughput(server, requests, concurrency):
+    '''
+    Requests per second sent by `concurrency` threads sharing one client.
+    '''
+    with Tinder_API(host=server.url, api_token='benchmark', pool_size=concurrency) as tinder_api:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda _: tinder_api.custom_request(PROFILE_PATH), range(concurrency)))  # opens the connections
+            start = time.perf_counter()
+            results = list(executor.map(lambda _: tinder_api.custom_request(PROFILE_PATH), range(requests)))
+            elapsed = time.perf_counter() - start
+    errors = sum(1 for result in results if 'error' in result)
+    return {
+        'name': 'custom_request_throughput',
+        'params': {'concurrency': concurrency, 'requests': requests},
+        'seconds': elapsed / requests,
+        'requests_per_second': requests / elapsed,
+        'errors': errors,
+    }
+
+
+def bench_helpers(size, repeat):
+    '''
+    Helpers over `size` synthetic matches.
+    '''
+    raw_matches = synthetic.matches(size)
+    formatted = helpers.format_matches(raw_matches)
+    activity_dates = [match['last_activity_date'] for match in formatted.values()]
+    now = timestamps.utc_now()
+    snapshot_path = os.path.join(tempfile.mkdtemp(), 'matches.snapshot')
+    write_snapshot(formatted, snapshot_path)
+    benchmarks = (
+        ('format_matches', lambda: helpers.format_matches(raw_matches)),
+        ('view_matches', lambda: view_matches(raw_matches)),
+        ('sort_by_value', lambda: helpers.sort_by_value(formatted, 'last_activity_date')),
+        ('sort_by_value_top20', lambda: helpers.sort_by_value(formatted, 'last_activity_date', limit=20)),
+        ('how_long_since_last_seen_all', lambda: helpers.how_long_since_last_seen_all(formatted)),
+        ('timestamps.seconds_since', lambda: timestamps.seconds_since(activity_dates, now)),
+        ('write_snapshot', lambda: write_snapshot(formatted, snapshot_path)),
+        ('snapshot_open', lambda: Snapshot(snapshot_path).close()),
+    )
+    try:
+        return [{'name': name, 'params': {'matches': size}, 'seconds': _best_of(function, repeat)} for name, function in benchmarks]
+    finally:
+        os.remove(snapshot_path)
+        os.rmdir(os.path.dirname(snapshot_path))
+
+
+def compare(results, baseline, tolerance):
+    '''
+    :return: `list` of the results slower than their baseline by more than `tolerance`, as messages.
+    '''
+    previous = {(result['name'], json.dumps(result['params'], sort_keys=True)): result['seconds'] for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['name'], json.dumps(result['params'], sort_keys=True)))
+        if before and result['seconds'] > before * (1 + tolerance):
+            regressions.append('%s %s: %.3g s, was %.3g s (+%.0f%%)' % (
+                result['name'], result['params'], result['seconds'], before, 100 * (result['seconds'] / before - 1)))
+    return regressions
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Offline benchmarks of tinder_api.')
+    parser.add_argument('--sizes', type=_int_list, help='numbers of matches for the helper benchmarks, defaults to 1000,100000,1000000')
+    parser.add_argument('--concurrency', type=_int_list, help='numbers of threads for the throughput benchmarks, defaults to 1,4,16,64')
+    parser.add_argument('--requests', type=int, help='requests sent by each request benchmark, defaults to 2000')
+    parser.add_argument('--payload-size', type=int, default=512, help='minimum size in bytes of the stub responses')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each helper benchmark, the fastest is kept')
+    parser.add_argument('--quick', action='store_true', help='smaller defaults, for CI: 1000,10000 matches, 1,8 threads, 300 requests')
+    parser.add_argument('--output', help='file where the results are written, defaults to stdout')
+    parser.add_argument('--baseline', help='results of a previous run to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='slowdown relative to the baseline considered a regression')
+    args = parser.parse_args(argv)
+    defaults = QUICK_DEFAULTS if args.quick else DEFAULTS
+    for name, value in defaults.items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    results = [bench_request_overhead(args.requests, args.payload_size)]
+    with StubServer(payload_size=args.payload_size) as server:
+        results.append(bench_latency(server, args.requests))
+        for concurrency in args.concurrency:
+            results.append(bench_throughput(server, args.requests, concurrency))
+    for size in args.sizes:
+        results.extend(bench_helpers(size, 1 if size >= 1000000 else args.repeat))
+        print('benchmarked helpers on %d matches' % size, file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# coding=utf-8
+'''
+Local stub of the Tinder API, serving every route of `api_endpoints.json` with synthetic payloads.
+
+`/v2/matches` and `/updates` return synthetic matches, `/user/{id}` a synthetic person;
+every other route returns `{"meta": {"status": 200}, "data": {...}}`, padded to `payload_size` bytes.
+'''
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import synthetic
+from tinder_api.api_endpoints import ENDPOINTS
+
+
+def compile_routes(endpoints=ENDPOINTS):
+    '''
+    :return: `list` of `(HTTP verb, compiled path regex, endpoint key)`, from the endpoint registry.
+    '''
+    routes = []
+    for endpoint in endpoints:
+        path = urlsplit(endpoint.path).path
+        pattern = '^' + re.sub(r'\\\{[^}]*\\\}', '[^/]+', re.escape(path)) + '$'
+        routes.append((endpoint.method.upper(), re.compile(pattern), endpoint.key))
+    return routes
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def log_message(self, *args):
+        pass
+
+
+    def _respond(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        url = urlsplit(self.path)
+        status, body = server.stub.respond(self.command, url.path, {key: values[0] for key, values in parse_qs(url.query).items()})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _respond
+
+
+class StubServer(object):
+    '''
+    Stub Tinder API listening on localhost, in a background thread.
+
+    example: with StubServer(total_matches=1000) as server:
+                 tinder_api = Tinder_API(host=server.url, api_token='benchmark')
+
+    :param payload_size: minimum size in bytes of the generic responses.
+
+    :param total_matches: number of matches served by `/v2/matches` and `/updates`.
+    '''
+    def __init__(self, payload_size=512, total_matches=1000):
+        self._routes = compile_routes()
+        self._total_matches = total_matches
+        self._generic_body = self._encode({'meta': {'status': 200}, 'data': {'padding': 'x' * payload_size}})
+        self._person_body = self._encode({'status': 200, 'results': synthetic.person(0)})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+        self.requests = 0
+
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+    @staticmethod
+    def _encode(payload):
+        return json.dumps(payload).encode('utf-8')
+
+
+    def route(self, http_verb, path):
+        '''
+        :return: key of the endpoint matching the request, or `None`.
+        '''
+        for method, pattern, key in self._routes:
+            if method == http_verb and pattern.match(path):
+                return key
+        return None
+
+
+    def respond(self, http_verb, path, query):
+        '''
+        :return: `tuple` of the status code and the encoded body.
+        '''
+        self.requests += 1
+        if path == '/v2/matches' and http_verb == 'GET':
+            start = int(query.get('page_token') or 0)
+            end = min(self._total_matches, start + int(query.get('count') or 60))
+            data = {'matches': [synthetic.match(i) for i in range(start, end)]}
+            if end < self._total_matches:
+                data['next_page_token'] = str(end)
+            return 200, self._encode({'meta': {'status': 200}, 'data': data})
+        if path == '/updates' and http_verb == 'POST':
+            return 200, self._encode({'matches': [synthetic.match(i) for i in range(self._total_matches)], 'blocks': [], 'inbox': [],
+                                      'last_activity_date': '2020-05-21T17:00:00.392Z'})
+        if path == ENDPOINTS.auth_api_path + '/sms' and http_verb == 'POST':
+            return 200, self._encode({'meta': {'status': 200}, 'data': {'api_token': 'stub-token-%d' % self.requests}})
+        if path.startswith('/user/') and http_verb == 'GET':
+            return 200, self._person_body
+        if self.route(http_verb, path) is None:
+            return 404, self._encode({'meta': {'status': 404}, 'error': 'No route for %s %s' % (http_verb, path)})
+        return 200, self._generic_body
@@ -0,0 +1,62 @@
+# coding=utf-8
+'''
+Deterministic synthetic Tinder payloads, shaped like the responses of the real API.
+'''
+
+import random
+
+NAMES = ('Alex', 'Sam', 'Charlie', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery',
+         'Quinn', 'Robin', 'Dana', 'Jesse', 'Noa', 'Lou', 'Camille', 'Eden', 'Sacha', 'Ariel')
+BIOS = ('', 'Coffee first.', 'Hiking, climbing and bad puns.', 'Ask me about my dog 🐶', 'Looking for a travel buddy ✈️')
+# photos and messages are shared between matches, to keep a million matches in memory
+PHOTOS = tuple([{'url': 'https://images-ssl.gotinder.com/%d/640x800_%d.jpg' % (i, j)} for j in range(i % 4 + 1)] for i in range(16))
+MESSAGES = tuple([{'_id': 'msg%d' % j, 'from': 'p%d' % j, 'message': 'Hello there %d!' % j, 'sent_date': '2020-05-21T17:00:00.392Z'}
+                  for j in range(i)] for i in range(4))
+
+
+def person(i, rng=None):
+    '''
+    :param i: index of the person, which determines its ID.
+
+    :return: a person, as in a match or a recommendation.
+    '''
+    rng = rng or random.Random(i)
+    return {
+        '_id': '5e%022x' % i,
+        'name': NAMES[i % len(NAMES)],
+        'bio': BIOS[i % len(BIOS)],
+        'gender': i % 2,
+        'birth_date': '%04d-%02d-%02dT22:49:41.151Z' % (1970 + rng.randrange(33), 1 + rng.randrange(12), 1 + rng.randrange(28)),
+        'ping_time': '2014-12-09T00:00:00.000Z',
+        'photos': PHOTOS[i % len(PHOTOS)],
+    }
+
+
+def match(i, rng=None):
+    '''
+    :param i: index of the match, which determines its ID and its person's ID.
+
+    :return: a match, as in the response of `/v2/matches` or `/updates`.
+    '''
+    rng = rng or random.Random(i)
+    messages = MESSAGES[rng.randrange(len(MESSAGES))]
+    return {
+        '_id': '5f%022x' % i,
+        'message_count': len(messages),
+        'messages': messages,
+        'last_activity_date': '2020-%02d-%02dT%02d:%02d:%02d.%03dZ' % (
+            1 + rng.randrange(12), 1 + rng.randrange(28), rng.randrange(24), rng.randrange(60), rng.randrange(60), rng.randrange(1000)),
+        'person': person(i, rng),
+    }
+
+
+def matches(count, seed=0):
+    '''
+    :param count: number of matches.
+
+    :param seed: seed of the random values, the same seed gives the same matches.
+
+    :return: `list` of matches.
+    '''
+    rng = random.Random(seed)
+    return [match(i, rng) for i in range(count)]
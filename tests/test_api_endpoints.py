@@ -0,0 +1,23 @@
+import pytest
+
+from tinder_api import Tinder_API
+from tinder_api.api_endpoints import ENDPOINTS, UnknownEndpointError
+
+
+def test_get_endpoint_returns_the_json_entry():
+    with Tinder_API(host='http://stub') as tinder_api:
+        endpoint = tinder_api.get_endpoint('user', 'getMatch')
+        assert endpoint == ENDPOINTS.raw['services']['user']['endpoints']['getMatch']
+        assert endpoint['path'] == endpoint.get('path') == ENDPOINTS.get('user', 'getMatch').path
+        endpoint['path'] = '/changed'
+        assert tinder_api.get_endpoint('user', 'getMatch')['path'] != '/changed'
+        with pytest.raises(UnknownEndpointError):
+            tinder_api.get_endpoint('user', 'getMatchs')
+
+
+def test_registry():
+    api_endpoint = ENDPOINTS.get('user', 'getMatch')
+    assert api_endpoint.key == 'user.getMatch' and api_endpoint.method == 'get'
+    assert api_endpoint.format_path(matchId='M1').endswith('M1')
+    with pytest.raises(UnknownEndpointError, match='Did you mean'):
+        ENDPOINTS.get('usr', 'getMatch')
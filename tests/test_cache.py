@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from benchmarks.stub_server import StubServer
+from tinder_api import Tinder_API
+from tinder_api.api_endpoints import UnknownEndpointError
+from tinder_api.cache import ResponseCache
+from tinder_api.transport import BufferedResponse
+
+HOST = 'http://stub'
+
+
+class _ETagTransport(object):
+    '''
+    Serves the profile with an ETag, and `304 Not Modified` to requests revalidating it.
+    '''
+    def __init__(self, on_revalidation=None):
+        self.requests = []
+        self._on_revalidation = on_revalidation
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        headers = dict(headers or {})
+        self.requests.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            if self._on_revalidation is not None:
+                self._on_revalidation()
+            return BufferedResponse(304, {}, b'')
+        return BufferedResponse(200, {'ETag': '"v1"'}, json.dumps({'meta': {'status': 200}, 'data': {'name': 'Alex', 'photos': []}}).encode('utf-8'))
+
+
+    def close(self):
+        pass
+
+
+def _expire(cache):
+    for entry in cache._entries.values():
+        entry.expires_at = 0
+
+
+def test_fresh_responses_are_served_from_the_cache():
+    with StubServer() as server:
+        with Tinder_API(host=server.url, api_token='test', cache=True) as tinder_api:
+            first = tinder_api.get_self()
+            second = tinder_api.get_self()
+            assert first == second
+            assert server.requests == 1
+            tinder_api.invalidate_cache('profile', 'getProfile')
+            tinder_api.get_self()
+            assert server.requests == 2
+
+
+def test_callers_get_their_own_copy():
+    transport = _ETagTransport()
+    with Tinder_API(host=HOST, api_token='test', transport=transport, cache=True) as tinder_api:
+        first = tinder_api.get_self()
+        first['data']['name'] = 'changed'
+        first['data']['photos'].append('url')
+        second = tinder_api.get_self()
+        assert second['data'] == {'name': 'Alex', 'photos': []}
+        second['data']['photos'].append('url')
+        assert tinder_api.get_self()['data']['photos'] == []
+    assert len(transport.requests) == 1
+
+
+def test_not_modified_reuses_the_cached_response():
+    cache = ResponseCache()
+    transport = _ETagTransport()
+    with Tinder_API(host=HOST, api_token='test', transport=transport, cache=cache) as tinder_api:
+        tinder_api.get_self()
+        _expire(cache)
+        assert tinder_api.get_self()['data']['name'] == 'Alex'
+    assert transport.requests[1]['If-None-Match'] == '"v1"'
+    assert cache.revalidations == 1
+
+
+def test_not_modified_after_eviction_is_sent_again():
+    cache = ResponseCache()
+    transport = _ETagTransport(on_revalidation=cache.clear)
+    with Tinder_API(host=HOST, api_token='test', transport=transport, cache=cache) as tinder_api:
+        tinder_api.get_self()
+        _expire(cache)
+        assert tinder_api.get_self()['data']['name'] == 'Alex'
+    assert len(transport.requests) == 3
+    assert 'If-None-Match' not in transport.requests[2]
+    assert len(cache) == 1
+
+
+def test_lru_eviction():
+    cache = ResponseCache(maxsize=2)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, 'service.endpoint', {'key': key}, ttl=60)
+    assert len(cache) == 2
+    assert cache.get('a') is None
+    assert cache.get('c').copy() == {'key': 'c'}
+    cache.invalidate('service.endpoint')
+    assert len(cache) == 0
+
+
+def test_async_not_modified_after_eviction_is_sent_again():
+    import asyncio
+    from tinder_api.async_api import AsyncTinder_API
+
+    cache = ResponseCache()
+    transport = _ETagTransport(on_revalidation=cache.clear)
+
+    class _AsyncTransport(object):
+        async def request(self, method, url, headers=None, data=None, stream=False):
+            return transport.request(method, url, headers, data)
+
+        async def close(self):
+            pass
+
+    async def main():
+        async with AsyncTinder_API(host=HOST, api_token='test', transport=_AsyncTransport(), cache=cache) as tinder_api:
+            await tinder_api.get_self()
+            _expire(cache)
+            return await tinder_api.get_self()
+
+    assert asyncio.run(main())['data']['name'] == 'Alex'
+    assert len(transport.requests) == 3 and 'If-None-Match' not in transport.requests[2]
+
+
+def test_invalidating_an_unknown_service_keeps_the_cache():
+    with StubServer() as server:
+        with Tinder_API(host=server.url, api_token='test', cache=True) as tinder_api:
+            tinder_api.get_self()
+            with pytest.raises(UnknownEndpointError, match="Unknown service 'profil'. Did you mean: profile?"):
+                tinder_api.invalidate_cache('profil')
+            with pytest.raises(UnknownEndpointError):
+                tinder_api.invalidate_cache('profile', 'getProfil')
+            tinder_api.get_self()
+            assert server.requests == 1
+            tinder_api.invalidate_cache('profile')
+            tinder_api.get_self()
+            assert server.requests == 2
+
+
+def test_invalidate_without_keys_removes_nothing():
+    cache = ResponseCache()
+    cache.set('a', 'service.endpoint', {}, ttl=60)
+    cache.invalidate()
+    assert len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+from tinder_api import Tinder_API
+from tinder_api.async_api import AsyncTinder_API
+from tinder_api.cassette import SCRUBBED, AsyncReplayTransport, CassetteMissError, RecordingTransport, ReplayTransport
+from tinder_api.metrics import Metrics
+from tinder_api.policy import RequestPolicy
+from tinder_api.transport import BufferedResponse
+
+HOST = 'http://stub'
+
+
+class _FakeTransport(object):
+    def __init__(self):
+        self.tokens = []
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        self.tokens.append((headers or {}).get('X-Auth-Token'))
+        if url.endswith('/sms'):
+            return BufferedResponse(200, {'x-auth-token': 'secret'}, json.dumps({'data': {'api_token': 'secret'}}).encode('utf-8'))
+        return BufferedResponse(200 if self.tokens[-1] == 'secret' else 401, {}, json.dumps({'meta': {'status': 200}}).encode('utf-8'))
+
+
+    def close(self):
+        pass
+
+
+def test_recording_returns_the_real_response_and_scrubs_the_cassette(tmp_path):
+    path = str(tmp_path / 'session.cassette')
+    transport = _FakeTransport()
+    with Tinder_API(host=HOST, transport=RecordingTransport(path, transport)) as tinder_api:
+        assert tinder_api.get_api_token('refresh') == 'secret'
+        assert tinder_api.custom_request('/profile')['meta']['status'] == 200
+    assert transport.tokens[-1] == 'secret'
+
+    with open(path, 'rb') as cassette_file:
+        assert b'secret' not in cassette_file.read()
+    with Tinder_API(host=HOST, transport=ReplayTransport(path)) as tinder_api:
+        assert tinder_api.get_api_token('refresh') == SCRUBBED
+        assert tinder_api.custom_request('/profile')['meta']['status'] == 200
+
+
+def test_replay_of_an_unrecorded_request_fails(tmp_path):
+    path = str(tmp_path / 'empty.cassette')
+    RecordingTransport(path, _FakeTransport()).close()
+    replay = ReplayTransport(path)
+    with pytest.raises(CassetteMissError):
+        replay.request('GET', HOST + '/profile')
+    replay.close()
+
+
+class _UnavailableOnceTransport(object):
+    '''
+    Answers `503` to the first GET request, `200` with updates otherwise.
+    '''
+    def __init__(self, updates):
+        self.updates = updates
+        self.requests = 0
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        self.requests += 1
+        if method == 'GET' and self.requests == 1:
+            return BufferedResponse(503, {'Retry-After': '0'}, b'')
+        return BufferedResponse(200, {}, json.dumps({'data': self.updates}).encode('utf-8'))
+
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def updates():
+    return {'matches': [{'_id': 'match%d' % i} for i in range(3)], 'blocks': ['match9']}
+
+
+@pytest.fixture
+def cassette(tmp_path, updates):
+    path = str(tmp_path / 'updates.cassette')
+    transport = _UnavailableOnceTransport(updates)
+    with Tinder_API(host=HOST, api_token='test', transport=RecordingTransport(path, transport), policy=RequestPolicy(max_retries=1)) as tinder_api:
+        list(tinder_api.stream_request('user', 'getMatches', ('matches',), data={'count': 3}))
+        list(tinder_api.stream_updates())
+    assert transport.requests == 3
+    return path
+
+
+def test_streams_go_through_the_policy_and_metrics(cassette, updates):
+    metrics = Metrics()
+    with Tinder_API(host=HOST, api_token='test', transport=ReplayTransport(cassette), policy=RequestPolicy(max_retries=1), metrics=metrics) as tinder_api:
+        matches = list(tinder_api.stream_request('user', 'getMatches', ('matches',), data={'count': 3}))
+        assert matches == [('matches', match) for match in updates['matches']]
+        assert list(tinder_api.stream_updates()) == matches + [('blocks', 'match9')]
+    snapshot = metrics.snapshot()
+    assert snapshot['user.getMatches']['requests'] == 2 and snapshot['user.getMatches']['status_codes'] == {503: 1, 200: 1}
+    assert snapshot['user.getUpdates']['requests'] == 1 and snapshot['user.getUpdates']['status_codes'] == {200: 1}
+    # the streamed bodies are not read by the metrics
+    assert snapshot['user.getUpdates']['in_flight'] == 0 and snapshot['user.getUpdates']['response_bytes'] == 0
+
+    # without retries, the first answer is the error
+    with Tinder_API(host=HOST, api_token='test', transport=ReplayTransport(cassette)) as tinder_api:
+        with pytest.raises(RuntimeError, match='status 503'):
+            list(tinder_api.stream_request('user', 'getMatches', ('matches',), data={'count': 3}))
+
+
+def test_async_streams_go_through_the_policy_and_metrics(cassette, updates):
+    metrics = Metrics()
+
+    async def main():
+        async with AsyncTinder_API(host=HOST, api_token='test', transport=AsyncReplayTransport(cassette), policy=RequestPolicy(max_retries=1), metrics=metrics) as tinder_api:
+            return [item async for item in tinder_api.stream_request('user', 'getMatches', ('matches',), data={'count': 3})]
+
+    assert asyncio.run(main()) == [('matches', match) for match in updates['matches']]
+    assert metrics.snapshot()['user.getMatches']['status_codes'] == {503: 1, 200: 1}
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from benchmarks.stub_server import StubServer
+from tinder_api import Tinder_API
+from tinder_api.codec import JSONCodec, aiter_json_items, get_codec, iter_json_items
+
+DOCUMENT = {
+    'meta': {'status': 200},
+    'data': {
+        'matches': [{'_id': 'm%d' % i, 'bio': 'é ✈️ "quoted"', 'score': -25000000000.0, 'count': 123456789} for i in range(50)],
+        'skipped': {'matches': ['not', 'yielded']},
+    },
+    'inbox': [1, 2.5e-3, None, True, [], {}],
+    'blocks': [],
+}
+
+
+def _chunks(content, seed):
+    rng = random.Random(seed)
+    position = 0
+    while position < len(content):
+        size = rng.choice([1, 2, 3, 7, 64, 4096])
+        yield content[position:position + size]
+        position += size
+
+
+def _expected(keys):
+    return [('matches', match) for match in DOCUMENT['data']['matches']] * ('matches' in keys) + \
+        [('inbox', item) for item in DOCUMENT['inbox']] * ('inbox' in keys)
+
+
+def test_get_codec():
+    assert isinstance(get_codec('json'), JSONCodec)
+    assert get_codec('auto').loads(b'{"a": 1}') == {'a': 1}
+
+
+@pytest.mark.parametrize('indent', [None, 1])
+@pytest.mark.parametrize('seed', range(20))
+def test_iter_json_items_whatever_the_chunks(indent, seed):
+    content = json.dumps(DOCUMENT, indent=indent).encode('utf-8')
+    items = list(iter_json_items(_chunks(content, seed), ('matches', 'inbox', 'blocks')))
+    # matches are nested in `data`, so they come first
+    assert items == _expected(('matches', 'inbox'))
+
+
+def test_numbers_split_across_chunks():
+    assert list(iter_json_items([b'{"inbox": [-25000000000.', b'0, 1e', b'5]}'], ('inbox',))) == [('inbox', -25000000000.0), ('inbox', 1e5)]
+
+
+@pytest.mark.parametrize('content', [b'', b'[1]', b'{"inbox": [1, 2', b'{"inbox": [1; 2]}'])
+def test_invalid_json(content):
+    with pytest.raises(ValueError):
+        list(iter_json_items([content], ('inbox',)))
+
+
+def test_aiter_json_items():
+    content = json.dumps(DOCUMENT).encode('utf-8')
+
+    async def chunks():
+        for chunk in _chunks(content, 0):
+            yield chunk
+
+    async def collect():
+        return [item async for item in aiter_json_items(chunks(), ('matches', 'inbox'))]
+
+    assert asyncio.run(collect()) == _expected(('matches', 'inbox'))
+
+
+def test_stream_updates():
+    with StubServer(total_matches=300) as server:
+        with Tinder_API(host=server.url, api_token='test') as tinder_api:
+            matches = [item for key, item in tinder_api.stream_updates() if key == 'matches']
+            assert len(matches) == 300
+            assert matches == tinder_api.get_updates()['matches']
+
+
+@pytest.mark.parametrize('transport', ['aiohttp', 'httpx'])
+def test_async_stream_updates(transport):
+    pytest.importorskip(transport)
+    from tinder_api.async_api import AsyncTinder_API
+    from tinder_api.transport import AiohttpTransport, AsyncHttpxTransport
+
+    async def stream(url):
+        async with AsyncTinder_API(host=url, api_token='test', transport=AiohttpTransport() if transport == 'aiohttp' else AsyncHttpxTransport(http2=False)) as tinder_api:
+            matches = [item async for key, item in tinder_api.stream_updates() if key == 'matches']
+            return matches, (await tinder_api.get_updates())['matches']
+
+    with StubServer(total_matches=300) as server:
+        streamed, updates = asyncio.run(stream(server.url))
+    assert len(streamed) == 300
+    assert streamed == updates
+
+
+def test_tinder_api_uses_the_standard_library_by_default():
+    with Tinder_API(host='http://stub', api_token='test') as tinder_api:
+        assert isinstance(tinder_api._codec, JSONCodec)
+
+
+def test_orjson_falls_back_to_json():
+    codec = pytest.importorskip('orjson') and get_codec('orjson')
+    data = {1: 'integer key', 'big': 1 << 70}
+    assert json.loads(codec.dumps(data)) == {'1': 'integer key', 'big': 1 << 70}
+    assert codec.dumps({'a': [1]}) == b'{"a":[1]}'
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tinder_api.async_api import AsyncTinder_API
+from tinder_api.concurrency import bounded_map, prefetch
+
+
+def _settle():
+    # lets the background threads run as far ahead as they are allowed to
+    time.sleep(0.2)
+
+
+def _counting(produced, count=None):
+    index = 0
+    while count is None or index < count:
+        produced.append(index)
+        yield index
+        index += 1
+
+
+def _prefetch_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'tinder_api-prefetch']
+
+
+def test_prefetch_order():
+    assert list(prefetch(range(100), depth=3)) == list(range(100))
+    assert list(prefetch([], depth=3)) == []
+
+
+@pytest.mark.parametrize('depth', [1, 3])
+def test_prefetch_depth(depth):
+    produced = []
+    items = prefetch(_counting(produced), depth=depth)
+    assert next(items) == 0
+    _settle()
+    assert len(produced) == 1 + depth
+    assert next(items) == 1
+    _settle()
+    assert len(produced) == 2 + depth
+    items.close()
+
+
+def test_prefetch_producer_exception():
+    def failing():
+        yield 1
+        yield 2
+        raise ValueError('page 3')
+
+    items = prefetch(failing(), depth=2)
+    assert next(items) == 1 and next(items) == 2
+    with pytest.raises(ValueError, match='page 3'):
+        next(items)
+
+
+def test_prefetch_early_close_stops_the_producer():
+    produced = []
+    before = set(_prefetch_threads())
+    items = prefetch(_counting(produced), depth=2)
+    assert [next(items), next(items)] == [0, 1]
+    items.close()
+    for thread in set(_prefetch_threads()) - before:
+        thread.join(timeout=1)
+        assert not thread.is_alive()
+    stopped_at = len(produced)
+    _settle()
+    assert len(produced) == stopped_at <= 2 + 2
+
+
+class _PagedAsyncTinder_API(AsyncTinder_API):
+    def __init__(self, pages):
+        super().__init__(transport=object())
+        self.pages = pages
+        self.fetched = []
+
+
+    async def matches(self, limit=60, page_token=None):
+        page = int(page_token or 0)
+        self.fetched.append(page)
+        return {'data': {'matches': [page], 'next_page_token': str(page + 1) if page + 1 < self.pages else None}}
+
+
+@pytest.mark.parametrize('depth', [1, 3])
+def test_async_iter_matches_depth(depth):
+    async def main():
+        tinder_api = _PagedAsyncTinder_API(pages=10)
+        matches = tinder_api.iter_matches(prefetch_pages=depth)
+        assert await matches.__anext__() == 0
+        for _ in range(20):
+            await asyncio.sleep(0)
+        assert tinder_api.fetched == list(range(1 + depth))
+        assert [match async for match in matches] == list(range(1, 10))
+
+    asyncio.run(main())
+
+
+def test_bounded_map_order():
+    def slow_for_small(item):
+        time.sleep(0.01 * (5 - item))
+        return item * 10
+
+    assert list(bounded_map(slow_for_small, range(5), max_workers=5)) == [(i, i * 10) for i in range(5)]
+
+
+def test_bounded_map_unordered():
+    def slow_for_first(item):
+        time.sleep(0.3 if item == 0 else 0)
+        return item
+
+    results = list(bounded_map(slow_for_first, range(4), max_workers=4, ordered=False))
+    assert sorted(results) == [(i, i) for i in range(4)]
+    assert results[-1] == (0, 0)
+
+
+def test_bounded_map_exception():
+    def failing(item):
+        if item == 3:
+            raise ValueError('item 3')
+        return item
+
+    results = bounded_map(failing, range(10), max_workers=2)
+    assert [next(results) for _ in range(3)] == [(0, 0), (1, 1), (2, 2)]
+    with pytest.raises(ValueError, match='item 3'):
+        next(results)
+
+
+def test_bounded_map_reads_items_lazily_and_stops_early():
+    produced = []
+    calls = []
+
+    def call(item):
+        calls.append(item)
+        return item
+
+    results = bounded_map(call, _counting(produced), max_workers=2)
+    assert next(results) == (0, 0)
+    results.close()
+    # at most twice `max_workers` calls submitted, plus the one replacing the result taken
+    assert len(produced) <= 2 * 2 + 1
+    assert len(calls) <= len(produced)
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+import pytest
+
+from benchmarks import synthetic
+from tinder_api import helpers
+from tinder_api.ingest import ingest
+
+
+@pytest.fixture
+def raw():
+    return synthetic.matches(12)
+
+
+@pytest.fixture
+def paths(tmp_path, raw):
+    # a.json: matches 0-5 with a malformed one, b.json.gz: 6-11 and 0 again with new values,
+    # c.json: not JSON, d.json: an account data export
+    again = dict(raw[0], last_activity_date='2021-01-01T00:00:00.000Z')
+    files = {
+        'a.json': json.dumps({'data': {'matches': raw[:3] + [{'_id': 'malformed'}] + raw[3:6]}}),
+        'b.json.gz': json.dumps({'data': {'matches': raw[6:] + [again]}}),
+        'c.json': '{"data": {"matches": [',
+        'd.json': json.dumps({'Messages': [{'match_id': 'Match 1', 'messages': []}]}),
+    }
+    for name, content in files.items():
+        if name.endswith('.gz'):
+            with gzip.open(str(tmp_path / name), 'wt') as f:
+                f.write(content)
+        else:
+            (tmp_path / name).write_text(content)
+    return [str(tmp_path)]
+
+
+@pytest.fixture
+def expected(raw):
+    # first position, last values
+    return helpers.format_matches(raw + [dict(raw[0], last_activity_date='2021-01-01T00:00:00.000Z')])
+
+
+@pytest.mark.parametrize('max_workers, chunk_size', [
+    (1, 1000),  # files formatted by one worker each
+    (8, 2),  # chunks of the files formatted across the workers
+])
+def test_merge_order_and_errors(paths, expected, max_workers, chunk_size):
+    progress = []
+    ingested = ingest(paths, max_workers=max_workers, chunk_size=chunk_size, progress=progress.append)
+    assert list(ingested) == list(expected)
+    assert ingested == expected
+    assert ingested[next(iter(expected))]['last_activity_date'] == '2021-01-01T00:00:00.000Z'
+
+    errors = [(error['path'].rsplit('/', 1)[1], error['index']) for error in ingested.errors]
+    assert errors == [('a.json', 3), ('c.json', None), ('d.json', None)]
+    assert ingested.stats['files'] == 4
+    assert ingested.stats['matches'] == 14
+    assert ingested.stats['skipped'] == 1
+    assert [stats['files'] for stats in progress] == [1, 2, 3, 4]
+    assert progress[-1]['files_total'] == 4 and progress[-1]['matches'] == 14
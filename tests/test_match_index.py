@@ -0,0 +1,61 @@
+from benchmarks import synthetic
+from tinder_api import helpers
+from tinder_api.match_index import MatchIndex
+
+
+def _raw_match(match_id, person_id, name, messages, last_activity_date='2020-05-01T00:00:00.000Z'):
+    return {
+        '_id': match_id,
+        'message_count': len(messages),
+        'messages': [{'_id': message_id, 'match_id': match_id, 'message': message_id} for message_id in messages],
+        'last_activity_date': last_activity_date,
+        'person': {'_id': person_id, 'name': name, 'gender': 1, 'birth_date': '1995-01-01T00:00:00.000Z', 'bio': '', 'photos': []},
+    }
+
+
+def _index():
+    return MatchIndex(helpers.format_matches([_raw_match('M1', 'P1', 'Alex', ['a', 'b']), _raw_match('M2', 'P2', 'sam', [])]))
+
+
+def test_lookups():
+    index = _index()
+    assert len(index) == 2 and 'P1' in index
+    assert index.by_name('Alex') == {'P1'}
+    assert index.by_name('SAM', ignore_case=True) == {'P2'}
+    assert index.get_by_match_id('M2')['name'] == 'sam'
+    assert index.filter(gender=1, active_since='2020-04-01') == {'P1', 'P2'}
+    assert index.filter(name='nobody') == set()
+
+
+def test_matches_the_helpers():
+    formatted = helpers.format_matches(synthetic.matches(500))
+    index = MatchIndex(formatted)
+    for person_id in list(formatted)[:50]:
+        match = formatted[person_id]
+        assert person_id in index.by_name(match['name'])
+        assert person_id in index.by_age(match['age'], match['age'])
+    assert index.filter(min_age=30, max_age=40) == {person_id for person_id, match in formatted.items() if 30 <= match['age'] <= 40}
+
+
+def test_update_with_person_keeps_the_message_history():
+    index = _index()
+    index.apply_updates({'matches': [_raw_match('M1', 'P1', 'Alex', ['c'], last_activity_date='2020-06-01T00:00:00.000Z')]})
+    match = index['P1']
+    assert [message['_id'] for message in match['messages']] == ['a', 'b', 'c']
+    assert match['last_activity_date'] == '2020-06-01T00:00:00.000Z'
+    assert index.active_between(since='2020-05-15') == ['P1']
+
+
+def test_partial_update_appends_messages():
+    index = _index()
+    index.apply_updates({'matches': [{'_id': 'M2', 'messages': [{'_id': 'x', 'message': 'hi'}], 'last_activity_date': '2020-07-01T00:00:00.000Z'}]})
+    assert [message['_id'] for message in index['P2']['messages']] == ['x']
+    assert index['P2']['message_count'] == 1
+
+
+def test_blocks_remove_the_match():
+    index = _index()
+    index.apply_updates({'matches': [], 'blocks': ['M1']})
+    assert 'P1' not in index
+    assert index.by_name('Alex') == set()
+    assert index.get_by_match_id('M1') is None
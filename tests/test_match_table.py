@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from benchmarks import synthetic
+from tinder_api import helpers
+from tinder_api.match_table import MISSING, MatchTable
+
+
+def _sparse_match():
+    return {'_id': 'M0', 'last_activity_date': None, 'person': {'_id': 'P0', 'name': 'Alex', 'photos': []}}
+
+
+def test_round_trip():
+    matches = synthetic.matches(200)
+    table = MatchTable.from_matches(matches)
+    assert len(table) == 200
+    assert table.to_formatted_matches() == helpers.format_matches(matches)
+
+
+def test_missing_values_round_trip_to_none():
+    table = MatchTable.from_matches([_sparse_match()])
+    assert [table[column][0] for column in ('gender', 'age', 'message_count')] == [MISSING['gender'], MISSING['age'], MISSING['message_count']]
+    match = table.to_formatted_matches()['P0']
+    assert match['gender'] is None and match['age'] is None and match['message_count'] is None
+    assert match['last_activity_date'] is None
+
+
+def test_zero_message_count_and_negative_gender_are_kept():
+    match = dict(_sparse_match(), message_count=0)
+    match['person'] = dict(match['person'], gender=-1)
+    formatted = MatchTable.from_matches([match]).to_formatted_matches()['P0']
+    assert formatted['message_count'] == 0 and formatted['gender'] == -1
+
+
+def test_ages_and_select():
+    matches = synthetic.matches(200)
+    table = MatchTable.from_matches(matches, today=date.today())
+    expected = [helpers.calculate_age(match['person']['birth_date']) for match in matches]
+    assert table['age'].tolist() == expected
+    young = table.select(table['age'] < 30)
+    assert sorted(young['person_id']) == sorted(match['person']['_id'] for match, age in zip(matches, expected) if age < 30)
@@ -0,0 +1,29 @@
+from benchmarks import synthetic
+from tinder_api import helpers
+from tinder_api.match_view import MatchView, view_matches
+
+
+def test_same_dict_as_format_matches():
+    matches = synthetic.matches(20)
+    formatted = helpers.format_matches(matches)
+    views = view_matches(matches)
+    assert list(views) == list(formatted)
+    for person_id, view in views.items():
+        assert dict(view) == formatted[person_id]
+        assert view.copy() == formatted[person_id]
+        assert set(view) == set(formatted[person_id]) and len(view) == len(formatted[person_id])
+
+
+def test_distance_is_not_a_key():
+    match = synthetic.matches(1)[0]
+    match['person']['distance_mi'] = 10
+    view = MatchView(match)
+    assert view.distance == helpers.distance_in_km(10)
+    assert 'distance' not in view and 'distance' not in dict(view)
+
+
+def test_malformed_matches_are_skipped():
+    matches = synthetic.matches(3)
+    views = view_matches([matches[0], {'_id': 'malformed'}, None, matches[1]])
+    assert list(views) == list(helpers.format_matches([matches[0], matches[1]]))
+    assert [(error['index'], error['match_id']) for error in views.errors] == [(1, 'malformed'), (2, None)]
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from tinder_api import Tinder_API
+from tinder_api.async_api import AsyncTinder_API
+from tinder_api.media import AsyncMediaUploader, FileSlice, MediaUploader, UploadJournal
+from tinder_api.transport import BufferedResponse
+
+# the compiled `mediaservice` schemas are not available, its endpoints fall back to JSON
+pytestmark = pytest.mark.filterwarnings('ignore:mediaservice')
+
+HOST = 'http://stub'
+CHUNK_SIZE = 1000
+
+
+class _MediaServer(object):
+    '''
+    Stub of the `mediaservice` endpoints, following the protocol assumed in `tinder_api/media.py`.
+
+    :param fail_after: number of chunks received before the connection drops.
+
+    :param lose_answers: whether a dropped chunk was received, its answer only being lost.
+    '''
+    def __init__(self, fail_after=None, lose_answers=False):
+        self.fail_after = fail_after
+        self.lose_answers = lose_answers
+        self.media = {}
+        self.chunks = []
+        self.probes = 0
+        self.order = None
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        url = urlsplit(url)
+        if url.path == '/mediaservice/placeholders':
+            count = json.loads(data)['count']
+            media_ids = ['media%d' % (len(self.media) + i) for i in range(count)]
+            self.media.update((media_id, b'') for media_id in media_ids)
+            return self._json({'media_id': media_ids})
+        if url.path == '/mediaservice/order':
+            self.order = json.loads(data)['media_id']
+            return self._json({})
+        media_id = parse_qs(url.query)['media_id'][0]
+        content_range = headers['Content-Range'][len('bytes '):]
+        if content_range.startswith('*/'):
+            self.probes += 1
+            return self._progress(media_id, int(content_range[2:]))
+        first, total = content_range.split('-')[0], content_range.split('/')[1]
+        if int(first) != len(self.media[media_id]):
+            return BufferedResponse(400, {}, b'')
+        return self.receive(media_id, b''.join(data), int(total))
+
+
+    def receive(self, media_id, content, total):
+        self.chunks.append((media_id, len(self.media[media_id])))
+        if self.fail_after is not None and len(self.chunks) > self.fail_after:
+            if self.lose_answers:
+                self.media[media_id] += content
+            raise ConnectionError('connection reset')
+        self.media[media_id] += content
+        return self._progress(media_id, total)
+
+
+    def _progress(self, media_id, total):
+        received = len(self.media[media_id])
+        if received == total:
+            return BufferedResponse(201, {}, b'')
+        return BufferedResponse(308, {'Range': 'bytes=0-%d' % (received - 1)} if received else {}, b'')
+
+
+    def _json(self, data):
+        return BufferedResponse(200, {}, json.dumps(data).encode('utf-8'))
+
+
+    def close(self):
+        pass
+
+
+class _AsyncMediaServer(object):
+    def __init__(self, server):
+        self.server = server
+
+
+    async def request(self, method, url, headers=None, data=None, stream=False):
+        if data is not None and not isinstance(data, (bytes, str)):
+            data = [block async for block in data]
+        return self.server.request(method, url, headers, data)
+
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def photos(tmp_path):
+    paths = []
+    for i, size in enumerate((2500, 1000, 10)):
+        path = tmp_path / ('%d.jpg' % i)
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    return paths
+
+
+def _upload(server, photos, journal_path):
+    with Tinder_API(host=HOST, api_token='test', transport=server) as tinder_api:
+        return MediaUploader(tinder_api).upload_photos(photos, journal_path=journal_path, max_workers=1, chunk_size=CHUNK_SIZE)
+
+
+def _contents(photos):
+    contents = []
+    for path in photos:
+        with open(path, 'rb') as photo_file:
+            contents.append(photo_file.read())
+    return contents
+
+
+def test_upload_photos(photos):
+    server = _MediaServer()
+    result = _upload(server, photos, None)
+    assert result['media_ids'] == ['media0', 'media1', 'media2'] == server.order
+    assert [server.media[media_id] for media_id in result['media_ids']] == _contents(photos)
+    assert len(server.chunks) == 3 + 1 + 1
+
+
+@pytest.mark.parametrize('lose_answers', [False, True])
+def test_interrupted_upload_resumes(tmp_path, photos, lose_answers):
+    journal_path = str(tmp_path / 'upload.journal')
+    server = _MediaServer(fail_after=1, lose_answers=lose_answers)
+    result = _upload(server, photos, journal_path)
+    assert result['error'] == 'Upload failed.' and set(result['failed']) == set(photos)
+    assert server.order is None and os.path.exists(journal_path)
+
+    server.fail_after, chunks = None, len(server.chunks)
+    result = _upload(server, photos, journal_path)
+    assert result['media_ids'] == ['media0', 'media1', 'media2'] == server.order
+    assert [server.media[media_id] for media_id in result['media_ids']] == _contents(photos)
+    # the first chunk is not sent again, nor the second if it arrived before the connection dropped
+    assert ('media0', 0) not in server.chunks[chunks:]
+    assert (('media0', CHUNK_SIZE) in server.chunks[chunks:]) != lose_answers
+    # every file had a chunk sent
+    assert server.probes == 3
+    assert not os.path.exists(journal_path)
+
+
+def test_async_interrupted_upload_resumes(tmp_path, photos):
+    journal_path = str(tmp_path / 'upload.journal')
+    server = _MediaServer(fail_after=4)
+
+    async def upload():
+        async with AsyncTinder_API(host=HOST, api_token='test', transport=_AsyncMediaServer(server)) as tinder_api:
+            return await AsyncMediaUploader(tinder_api).upload_photos(photos, journal_path=journal_path, max_workers=1, chunk_size=CHUNK_SIZE)
+
+    assert 'error' in asyncio.run(upload())
+    server.fail_after = None
+    assert asyncio.run(upload())['media_ids'] == server.order
+    assert [server.media[media_id] for media_id in server.order] == _contents(photos)
+    # the fifth chunk is sent again
+    assert len(server.chunks) == 3 + 1 + 1 + 1 and server.probes == 1
+
+
+def test_file_slice(photos):
+    body = FileSlice(photos[0], 1000, 1200, block_size=500)
+    assert len(body) == 1200
+    assert [len(block) for block in body] == [500, 500, 200]
+    assert b''.join(body) == _contents(photos)[0][1000:2200]
+    with pytest.raises(IOError):
+        list(FileSlice(photos[2], 0, 20))
+
+
+def test_journal_resets_modified_files(tmp_path, photos):
+    journal_path = str(tmp_path / 'upload.journal')
+    journal = UploadJournal(journal_path)
+    journal.entry(photos[0])
+    journal.update(photos[0], media_id='media0', offset=1000)
+    assert UploadJournal(journal_path).entry(photos[0])['offset'] == 1000
+    with open(photos[0], 'ab') as photo_file:
+        photo_file.write(b'more')
+    entry = UploadJournal(journal_path).entry(photos[0])
+    assert entry['media_id'] is None and entry['offset'] == 0 and entry['size'] == 2504
@@ -0,0 +1,45 @@
+from tinder_api.message_index import MessageIndex, tokenize
+
+
+def _index():
+    index = MessageIndex()
+    index.add_messages([
+        {'_id': 'a1', 'match_id': 'M1', 'message': 'Hello world, see you tomorrow'},
+        {'_id': 'a2', 'match_id': 'M1', 'message': 'Dinner tomorrow?'},
+        {'_id': 'b1', 'match_id': 'M2', 'message': 'hello there'},
+        {'_id': 'b2', 'match_id': 'M2', 'message': 'See you at dinner'},
+    ])
+    return index
+
+
+def test_tokenize_folds_case():
+    assert tokenize('STRASSE Straße') == ['strasse', 'strasse']
+
+
+def test_search_words_and_phrases():
+    index = _index()
+    assert set(index.search('tomorrow')) == {('M1', 'a1'), ('M1', 'a2')}
+    assert index.search('"see you" tomorrow') == [('M1', 'a1')]
+    assert index.search('"you see"') == []
+    assert index.search('missing') == []
+
+
+def test_one_word_prefix_with_match_id():
+    index = _index()
+    assert index.search('hel*', match_id='M2') == [('M2', 'b1')]
+
+
+def test_one_word_prefix_after_selective_clause():
+    index = _index()
+    assert index.search('there hel*') == [('M2', 'b1')]
+    assert set(index.search('din* see')) == {('M2', 'b2')}
+
+
+def test_remove_and_updates():
+    index = _index()
+    index.remove_message('M2', 'b1')
+    assert index.search('hello') == [('M1', 'a1')]
+    index.apply_updates({'matches': [], 'inbox': [{'_id': 'c1', 'match_id': 'M3', 'message': 'hello again'}], 'blocks': ['M1']})
+    assert index.search('hello') == [('M3', 'c1')]
+    assert ('M1', 'a2') not in index
+    assert index.words_with_prefix('ag') == ['again']
@@ -0,0 +1,36 @@
+import logging
+
+from benchmarks.stub_server import StubServer
+from tinder_api import Tinder_API
+from tinder_api.metrics import Metrics
+
+
+def _fail(*args):
+    raise ValueError('broken hook')
+
+
+def test_metrics_per_endpoint():
+    metrics = Metrics()
+    with StubServer() as server:
+        with Tinder_API(host=server.url, api_token='test', metrics=metrics) as tinder_api:
+            tinder_api.get_self()
+            tinder_api.get_self()
+            tinder_api.custom_request('/unknown')
+    snapshot = metrics.snapshot()
+    assert snapshot['profile.getProfile']['requests'] == 2
+    assert snapshot['custom']['status_codes'] == {404: 1}
+    assert 'tinder_api_request_duration_seconds_count{endpoint="profile.getProfile"} 2' in metrics.to_prometheus()
+
+
+def test_failing_hooks_do_not_change_the_result(caplog):
+    metrics = Metrics()
+    metrics.add_hooks(pre=_fail, post=_fail)
+    seen = []
+    metrics.add_hooks(post=lambda request, response, error, elapsed: seen.append(response.status_code))
+    with StubServer() as server:
+        with Tinder_API(host=server.url, api_token='test', metrics=metrics) as tinder_api:
+            with caplog.at_level(logging.ERROR, logger='tinder_api.metrics'):
+                assert tinder_api.get_self()['meta']['status'] == 200
+    assert seen == [200]
+    assert metrics.snapshot()['profile.getProfile']['in_flight'] == 0
+    assert len([record for record in caplog.records if 'broken hook' in record.exc_text]) == 2
@@ -0,0 +1,13 @@
+import subprocess
+import sys
+
+
+def test_optional_modules_are_imported_on_first_access():
+    script = (
+        'import sys, tinder_api\n'
+        'lazy = ("tinder_api.async_api", "tinder_api.match_table", "tinder_api.match_index", "tinder_api.message_index")\n'
+        'assert not [module for module in lazy if module in sys.modules], sys.modules\n'
+        'assert tinder_api.MatchIndex.__module__ == "tinder_api.match_index"\n'
+        'assert tinder_api.MessageIndex.__module__ == "tinder_api.message_index"\n'
+    )
+    subprocess.run([sys.executable, '-c', script], check=True)
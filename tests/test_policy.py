@@ -0,0 +1,69 @@
+import json
+
+from tinder_api import Tinder_API
+from tinder_api.policy import RequestPolicy, RetryBudget, parse_retry_after
+from tinder_api.transport import BufferedResponse
+
+HOST = 'http://stub'
+
+
+class _FailingTransport(object):
+    '''
+    Answers `503` to the first `failures` requests, then `200`.
+    '''
+    def __init__(self, failures, retry_after='0'):
+        self.failures = failures
+        self.requests = 0
+        self._retry_after = retry_after
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        self.requests += 1
+        if self.requests <= self.failures:
+            return BufferedResponse(503, {'Retry-After': self._retry_after}, b'')
+        return BufferedResponse(200, {}, json.dumps({'meta': {'status': 200}}).encode('utf-8'))
+
+
+    def close(self):
+        pass
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+
+
+def test_retries_until_success():
+    transport = _FailingTransport(failures=2)
+    with Tinder_API(host=HOST, api_token='test', transport=transport, policy=RequestPolicy(max_retries=3)) as tinder_api:
+        assert tinder_api.get_self() == {'meta': {'status': 200}}
+    assert transport.requests == 3
+
+
+def test_gives_up_after_max_retries():
+    transport = _FailingTransport(failures=10)
+    with Tinder_API(host=HOST, api_token='test', transport=transport, policy=RequestPolicy(max_retries=2)) as tinder_api:
+        result = tinder_api.get_self()
+    assert result['status'] == 503 and result['attempts'] == 3
+
+
+def test_retries_do_not_refill_the_budget():
+    budget = RetryBudget(ratio=0.5, minimum=2)
+    transport = _FailingTransport(failures=100)
+    with Tinder_API(host=HOST, api_token='test', transport=transport, policy=RequestPolicy(max_retries=100, budget=budget)) as tinder_api:
+        result = tinder_api.get_self()
+    # 2 retries from the minimum, plus half a retry earned by the one request sent
+    assert result['attempts'] == 3
+    assert transport.requests == 3
+
+
+def test_retry_after_pauses_the_group():
+    policy = RequestPolicy(max_retry_after=120)
+    assert policy.retry_delay('get', None, 0, BufferedResponse(429, {'Retry-After': '30'}, b'')) == 30
+    assert 29 < policy.before_request(None) <= 30
+
+
+def test_long_retry_after_is_not_waited_for():
+    policy = RequestPolicy(max_retry_after=120)
+    assert policy.retry_delay('get', None, 0, BufferedResponse(429, {'Retry-After': '86400'}, b'')) is None
+    assert 119 < policy.before_request(None) <= 120
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tinder_api.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    single_flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def function():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(single_flight.do('key', function))) for _ in range(4)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['result'] * 4
+    assert len(calls) <= 4 and len(single_flight) == 0
+
+
+def test_exception_is_raised_to_the_caller():
+    single_flight = SingleFlight()
+    with pytest.raises(ValueError):
+        single_flight.do('key', lambda: int('x'))
+    assert len(single_flight) == 0
+
+
+def test_async_calls_are_coalesced():
+    async def main():
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        results = await asyncio.gather(*[single_flight.do('key', function) for _ in range(5)])
+        return results, calls, len(single_flight)
+
+    results, calls, in_flight = asyncio.run(main())
+    assert results == ['result'] * 5
+    assert calls == [1]
+    assert in_flight == 0
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    async def main():
+        single_flight = AsyncSingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        first = asyncio.ensure_future(single_flight.do('key', function))
+        second = asyncio.ensure_future(single_flight.do('key', function))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        await asyncio.sleep(0)
+        return first.cancelled(), result, len(single_flight)
+
+    assert asyncio.run(main()) == (True, 'result', 0)
+
+
+def test_async_exception_is_raised_to_every_caller():
+    async def main():
+        single_flight = AsyncSingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.01)
+            raise ValueError('failed')
+
+        return await asyncio.gather(*[single_flight.do('key', function) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+
+
+def test_callers_get_their_own_copy():
+    single_flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def function():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {'data': {'results': [1]}}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(single_flight.do('key', function))) for _ in range(3)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    results[0]['data']['results'].append(2)
+    assert sorted(result['data']['results'] for result in results) == [[1], [1], [1, 2]]
+
+
+def test_async_callers_get_their_own_copy():
+    async def main():
+        single_flight = AsyncSingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.01)
+            return {'data': {'results': [1]}}
+
+        return await asyncio.gather(*[single_flight.do('key', function) for _ in range(3)])
+
+    results = asyncio.run(main())
+    results[0]['data']['results'].append(2)
+    assert [result['data']['results'] for result in results[1:]] == [[1], [1]]
+    assert results[1] is not results[2]
@@ -0,0 +1,100 @@
+import pickle
+import struct
+
+import pytest
+
+from benchmarks import synthetic
+from tinder_api import helpers
+from tinder_api.snapshot import MAGIC, NULL_INTEGERS, VERSION, Snapshot, write_snapshot
+
+
+@pytest.fixture
+def formatted():
+    formatted = helpers.format_matches(synthetic.matches(300))
+    # unicode, empty and missing values
+    person_id = next(iter(formatted))
+    formatted[person_id].update(name='Zoë ✈️', bio='', gender=None, age=None, message_count=None, messages=None)
+    return formatted
+
+
+@pytest.fixture
+def path(tmp_path, formatted):
+    path = str(tmp_path / 'matches.snapshot')
+    write_snapshot(formatted, path)
+    return path
+
+
+def test_round_trip(path, formatted):
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == len(formatted)
+        assert list(snapshot) == list(formatted)
+        assert snapshot.to_formatted_matches() == formatted
+
+
+def test_lookups(path, formatted):
+    person_id = next(iter(formatted))
+    with Snapshot(path) as snapshot:
+        assert person_id in snapshot and 'unknown' not in snapshot and 42 not in snapshot
+        assert snapshot[person_id]['name'] == 'Zoë ✈️'
+        assert snapshot.value(person_id, 'age') is None
+        assert snapshot.value(person_id, 'messages') is None
+        assert snapshot.row_of(person_id) == 0
+        with pytest.raises(KeyError):
+            snapshot['unknown']
+        with pytest.raises(KeyError):
+            snapshot.value(person_id, 'distance')
+        with pytest.raises(IndexError):
+            snapshot.row(len(formatted))
+
+
+def test_column(path, formatted):
+    with Snapshot(path) as snapshot:
+        ages = snapshot.column('age').tolist()
+    assert ages[0] == NULL_INTEGERS['h']
+    assert ages[1:] == [match['age'] for match in list(formatted.values())[1:]]
+
+
+def test_pickle_reopens_the_file(path, formatted):
+    with Snapshot(path) as snapshot:
+        copy = pickle.loads(pickle.dumps(snapshot))
+    with copy:
+        assert copy.to_formatted_matches() == formatted
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / 'empty.snapshot')
+    write_snapshot({}, path)
+    with Snapshot(path) as snapshot:
+        assert len(snapshot) == 0 and dict(snapshot) == {} and 'anyone' not in snapshot
+
+
+def test_invalid_files(tmp_path, path):
+    not_a_snapshot = tmp_path / 'matches.json'
+    not_a_snapshot.write_bytes(b'{"matches": []}' * 10)
+    with pytest.raises(ValueError, match='not a snapshot'):
+        Snapshot(str(not_a_snapshot))
+
+    with open(path, 'rb') as snapshot_file:
+        content = snapshot_file.read()
+    truncated = tmp_path / 'truncated.snapshot'
+    truncated.write_bytes(content[:len(content) // 2])
+    with pytest.raises(ValueError, match='truncated'):
+        Snapshot(str(truncated))
+
+
+def test_newer_version(tmp_path, path):
+    with open(path, 'rb') as snapshot_file:
+        content = bytearray(snapshot_file.read())
+    struct.pack_into('<H', content, len(MAGIC), VERSION + 1)
+    newer = tmp_path / 'newer.snapshot'
+    newer.write_bytes(bytes(content))
+    with pytest.raises(ValueError, match='version %d' % (VERSION + 1)):
+        Snapshot(str(newer))
+
+
+def test_failed_write_keeps_the_previous_snapshot(tmp_path, path, formatted):
+    with pytest.raises(ValueError, match='Person IDs must be strings'):
+        write_snapshot({42: {}}, path)
+    assert sorted(child.name for child in tmp_path.iterdir()) == ['matches.snapshot']
+    with Snapshot(path) as snapshot:
+        assert snapshot.to_formatted_matches() == formatted
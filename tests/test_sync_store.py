@@ -0,0 +1,69 @@
+from tinder_api import helpers
+from tinder_api.sync_store import SyncStore
+
+
+def _match(match_id, person_id, last_activity_date, message_count=1, name='Alex'):
+    return {
+        '_id': match_id,
+        'last_activity_date': last_activity_date,
+        'message_count': message_count,
+        'messages': [{'_id': match_id + '-m0', 'match_id': match_id, 'from': person_id, 'message': 'hi', 'sent_date': last_activity_date}],
+        'person': {'_id': person_id, 'name': name, 'gender': 1, 'birth_date': '1995-01-01T00:00:00.000Z', 'bio': '', 'photos': []},
+    }
+
+
+def _store():
+    store = SyncStore(':memory:')
+    store.load_matches([_match('M1', 'P1', '2020-05-01T00:00:00.000Z'), _match('M2', 'P2', '2020-06-01T00:00:00.000Z', name='Sam')],
+                       last_activity_date='2020-06-01T00:00:00.000Z')
+    return store
+
+
+def test_load_and_query():
+    store = _store()
+    assert store.count() == 2 and store.count('persons') == 2 and store.count('messages') == 2
+    assert store.last_activity_date == '2020-06-01T00:00:00.000Z'
+    assert [match['_id'] for match in store.matches()] == ['M2', 'M1']
+    assert [match['_id'] for match in store.matches(name='alex')] == ['M1']
+    assert store.get_match('M1', messages=True)['messages'][0]['_id'] == 'M1-m0'
+    assert set(helpers.format_matches(store.matches())) == {'P1', 'P2'}
+
+
+def test_partial_update_is_merged_into_the_stored_match():
+    store = _store()
+    store.apply_updates({
+        'matches': [{'_id': 'M1', 'last_activity_date': '2020-07-01T00:00:00.000Z', 'message_count': 2,
+                     'messages': [{'_id': 'M1-m1', 'message': 'hello', 'sent_date': '2020-07-01T00:00:00.000Z'}]}],
+        'last_activity_date': '2020-07-01T00:00:00.000Z',
+    })
+    latest = store.matches(limit=1)[0]
+    assert latest['_id'] == 'M1'
+    assert latest['last_activity_date'] == '2020-07-01T00:00:00.000Z' and latest['message_count'] == 2
+    assert latest['person']['_id'] == 'P1'
+    assert [message['_id'] for message in store.messages('M1')] == ['M1-m0', 'M1-m1']
+    assert store.last_activity_date == '2020-07-01T00:00:00.000Z'
+
+
+def test_partial_update_of_an_unknown_match_is_ignored():
+    store = _store()
+    store.apply_updates({'matches': [{'_id': 'M3', 'last_activity_date': '2020-07-01T00:00:00.000Z', 'message_count': 4}]})
+    assert store.get_match('M3') is None
+    assert store.count() == 2
+    assert [match['_id'] for match in store.matches()] == ['M2', 'M1']
+
+
+def test_blocks_delete_the_match_and_its_person():
+    store = _store()
+    store.apply_updates({'blocks': ['M2']})
+    assert store.get_match('M2') is None
+    assert store.get_person('P2') is None
+    assert store.count('messages') == 1
+
+
+def test_failed_update_is_rolled_back():
+    store = _store()
+    try:
+        store.apply_updates({'matches': [_match('M3', 'P3', '2020-07-01T00:00:00.000Z')], 'blocks': object()})
+    except TypeError:
+        pass
+    assert store.get_match('M3') is None
@@ -0,0 +1,51 @@
+import math
+from array import array
+from datetime import datetime
+
+import pytest
+
+from tinder_api import timestamps
+
+TIMESTAMPS = ['2017-07-09T10:28:13.392Z', '', None, '2017-07-09T10:28:13Z', '1970-01-01T00:00:01.500', '2017-07-09T12:28:13.392+02:00']
+NOW = datetime(2017, 7, 10, 10, 28, 13, 392000)
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(timestamps, '_numpy', lambda: None)
+    return request.param
+
+
+def _assert_same(values, expected):
+    assert len(values) == len(expected)
+    for value, expected_value in zip(values, expected):
+        assert (math.isnan(value) and math.isnan(expected_value)) or value == pytest.approx(expected_value)
+
+
+def test_parse_timestamp():
+    assert timestamps.parse_timestamp('2017-07-09T10:28:13.392Z') == datetime(2017, 7, 9, 10, 28, 13, 392000)
+    assert timestamps.parse_timestamp('') is None
+    for timestamp in ('2017-07-09T12:28:13.392+02:00', '2017-07-09T05:28:13.392-0500'):
+        assert timestamps.parse_timestamp(timestamp) == datetime(2017, 7, 9, 10, 28, 13, 392000)
+    assert timestamps.to_epoch('2017-07-09T12:28:13.392+02:00') == timestamps.to_epoch('2017-07-09T10:28:13.392Z')
+    with pytest.raises(ValueError):
+        timestamps.parse_timestamp('yesterday')
+
+
+def test_to_epoch_array(backend):
+    epochs = timestamps.to_epoch_array(iter(TIMESTAMPS))
+    assert isinstance(epochs, array) == (backend == 'python')
+    _assert_same(epochs, [timestamps.to_epoch(timestamp) for timestamp in TIMESTAMPS])
+
+
+def test_seconds_since(backend):
+    elapsed = timestamps.seconds_since(TIMESTAMPS, NOW)
+    _assert_same(elapsed, [(NOW - timestamps.EPOCH).total_seconds() - timestamps.to_epoch(timestamp) for timestamp in TIMESTAMPS])
+    assert elapsed[0] == 86400
+
+
+def test_how_long_in_words_since_all(backend):
+    assert timestamps.how_long_in_words_since_all(TIMESTAMPS[:3], NOW, include_seconds=True) == ['1 days, 0 hrs 00 min 00 s', None, None]
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from benchmarks.stub_server import StubServer
+from tinder_api import Tinder_API
+from tinder_api.async_api import AsyncTinder_API
+from tinder_api.token_manager import TokenManager, _FileLock
+from tinder_api.transport import BufferedResponse
+
+HOST = 'http://stub'
+
+
+class _Clock(object):
+    def __init__(self):
+        self.now = 1600000000.0
+
+
+    def __call__(self):
+        return self.now
+
+
+class _AuthTransport(object):
+    '''
+    Answers each refresh request with a new token, or `401` when `fail` is set.
+    '''
+    def __init__(self):
+        self.refreshes = 0
+        self.fail = False
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        assert url.endswith('/v2/auth/login/sms') and json.loads(data)['refresh_token'] == 'refresh'
+        if self.fail:
+            return BufferedResponse(401, {}, b'{"meta": {"status": 401}}')
+        self.refreshes += 1
+        return BufferedResponse(200, {}, json.dumps({'data': {'api_token': 'token-%d' % self.refreshes}}).encode('utf-8'))
+
+
+    def close(self):
+        pass
+
+
+def _manage_token(transport, clock, cache_path=None):
+    tinder_api = Tinder_API(host=HOST, transport=transport)
+    tinder_api.manage_token('refresh', cache_path, clock=clock, lifetime=1000, refresh_margin=100, retry_interval=10)
+    return tinder_api
+
+
+def test_start_authenticates_and_schedules_the_refresh(tmp_path):
+    cache_path = str(tmp_path / 'token.json')
+    transport = _AuthTransport()
+    tinder_api = _manage_token(transport, _Clock(), cache_path)
+    token_manager = tinder_api._token_manager
+    assert tinder_api._headers['X-Auth-Token'] == token_manager.api_token == 'token-1'
+    assert token_manager.seconds_left() == 1000
+    assert token_manager._timer.interval == 900
+    with open(cache_path) as cache_file:
+        assert json.load(cache_file)['api_token'] == 'token-1'
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+    tinder_api.close()
+    assert token_manager._timer is None
+
+
+def test_processes_share_the_cached_token(tmp_path):
+    cache_path = str(tmp_path / 'token.json')
+    clock = _Clock()
+    first, second = _AuthTransport(), _AuthTransport()
+    first_api = _manage_token(first, clock, cache_path)
+    second_api = _manage_token(second, clock, cache_path)
+    assert second_api._headers['X-Auth-Token'] == 'token-1' and second.refreshes == 0
+
+    # the first process due for a refresh gets a new token, the other adopts it
+    clock.now += 950
+    first_api._token_manager._on_timer()
+    assert first.refreshes == 2 and first_api._token_manager._timer.interval == 900
+    second_api._token_manager._on_timer()
+    assert second.refreshes == 0 and second_api._headers['X-Auth-Token'] == 'token-2'
+
+    second_api._token_manager.refresh(force=True)
+    assert second.refreshes == 1 and second_api._headers['X-Auth-Token'] == 'token-1'
+    first_api.close()
+    second_api.close()
+
+
+def test_expired_cached_token_is_not_used(tmp_path):
+    cache_path = str(tmp_path / 'token.json')
+    clock = _Clock()
+    with open(cache_path, 'w') as cache_file:
+        json.dump({'api_token': 'old', 'expires_at': clock.now + 50}, cache_file)
+    transport = _AuthTransport()
+    tinder_api = _manage_token(transport, clock, cache_path)
+    assert tinder_api._headers['X-Auth-Token'] == 'token-1'
+    tinder_api.close()
+
+
+def test_failed_refresh_is_retried():
+    clock = _Clock()
+    transport = _AuthTransport()
+    tinder_api = _manage_token(transport, clock)
+    token_manager = tinder_api._token_manager
+    transport.fail = True
+    clock.now += 950
+    token_manager._on_timer()
+    assert isinstance(token_manager.last_error, RuntimeError)
+    assert token_manager._timer.interval == 10
+    assert tinder_api._headers['X-Auth-Token'] == 'token-1'
+
+    transport.fail = False
+    token_manager._on_timer()
+    assert token_manager.last_error is None and tinder_api._headers['X-Auth-Token'] == 'token-2'
+    tinder_api.close()
+
+
+def test_failed_start_raises():
+    transport = _AuthTransport()
+    transport.fail = True
+    with pytest.raises(RuntimeError):
+        _manage_token(transport, _Clock())
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    lock_path = str(tmp_path / 'token.json.lock')
+    events = []
+    locked = threading.Event()
+
+    def hold():
+        with _FileLock(lock_path):
+            locked.set()
+            time.sleep(0.2)
+            events.append('released')
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    locked.wait()
+    with _FileLock(lock_path):
+        events.append('acquired')
+    holder.join()
+    assert events == ['released', 'acquired']
+
+
+class _NullAsyncTransport(object):
+    async def request(self, method, url, headers=None, data=None, stream=False):
+        raise AssertionError('refreshes use a synchronous client')
+
+
+    async def close(self):
+        pass
+
+
+def test_async_manage_token_does_not_block_the_event_loop(tmp_path):
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main(url):
+        async with AsyncTinder_API(host=url, transport=_NullAsyncTransport()) as tinder_api:
+            ticker = asyncio.ensure_future(tick())
+            token_manager = await tinder_api.manage_token('refresh', str(tmp_path / 'token.json'))
+            ticker.cancel()
+            assert isinstance(token_manager, TokenManager)
+            return tinder_api._headers['X-Auth-Token']
+
+    with StubServer() as server:
+        assert asyncio.run(main(server.url)).startswith('stub-token-')
+    assert len(ticks) > 1
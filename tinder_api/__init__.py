@@ -1,3 +1,20 @@
 from tinder_api import api_endpoints
 from tinder_api.api import Tinder_API
-from tinder_api import helpers
\ No newline at end of file
+from tinder_api import helpers
+
+
+def __getattr__(name):
+    # imported on first access, to keep asyncio and optional dependencies out of the import time
+    if name == 'AsyncTinder_API':
+        from tinder_api.async_api import AsyncTinder_API
+        return AsyncTinder_API
+    if name == 'MatchTable':
+        from tinder_api.match_table import MatchTable
+        return MatchTable
+    if name == 'MatchIndex':
+        from tinder_api.match_index import MatchIndex
+        return MatchIndex
+    if name == 'MessageIndex':
+        from tinder_api.message_index import MessageIndex
+        return MessageIndex
+    raise AttributeError("module 'tinder_api' has no attribute '%s'" % name)
\ No newline at end of file
@@ -9,14 +9,61 @@ Read `readme.md` and `Tinder API.ipnyb` for usage.
 '''
 
 import json
-import requests
-from tinder_api.api_endpoints import API_ENDPOINTS
+import time
+from functools import partial
+from tinder_api.api_endpoints import ENDPOINTS, REQUEST_HAS_BODY, RESPONSE_HAS_BODY, UnknownEndpointError
+from tinder_api.cache import ResponseCache
+from tinder_api.codec import CodecRegistry, get_codec, iter_json_items
+from tinder_api.concurrency import bounded_map, prefetch
+from tinder_api.metrics import Metrics
+from tinder_api.policy import RETRYABLE_STATUS_CODES, RequestPolicy, parse_retry_after
+from tinder_api.singleflight import SingleFlight
+from tinder_api.transport import RequestsTransport
+
+# requests without side effects, which can be coalesced
+SAFE_HTTP_VERBS = ('get', 'head', 'options')
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+class PreparedRequest(object):
+    '''
+    A request ready to be sent, and what is needed to handle its response.
+
+    `result` is set instead when the request does not need to be sent,
+    ex: not authenticated, or answered from the cache.
+    `coalesce_key` is set when identical concurrent requests may share this one's result.
+    `codec` decodes the response.
+    `stream` is set when the response body is read as it is downloaded, see :method:`Tinder_API.stream_request`.
+    '''
+    __slots__ = ('http_verb', 'url', 'headers', 'body', 'api_endpoint', 'codec', 'cache_entry', 'result', 'coalesce_key', 'stream')
+
+    def __init__(self, http_verb, url, headers, body, api_endpoint=None, codec=None):
+        self.http_verb = http_verb
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.api_endpoint = api_endpoint
+        self.codec = codec
+        self.cache_entry = None
+        self.result = None
+        self.coalesce_key = None
+        self.stream = False
+
 
 class Tinder_API(object):
-    def __init__(self, host= 'https://api.gotinder.com', headers={}, api_token=None):
+    def __init__(self, host= 'https://api.gotinder.com', headers={}, api_token=None, transport=None, pool_size=10, cache=None, coalesce=False, codec='json', policy=None, metrics=None, schema_path=None):
         self._host = host
+        self._codec = get_codec(codec)
+        self.codecs = CodecRegistry(self._codec, schema_path)
+        self._transport = transport if transport is not None else RequestsTransport(pool_size=pool_size)
+        self._cache = ResponseCache() if cache is True else cache
+        self._single_flight = self._make_single_flight() if coalesce else None
+        self._policy = RequestPolicy() if policy is True else policy
+        self.metrics = Metrics() if metrics is True else metrics
+        self._token_manager = None
         self._not_authenticated_error = {'error': 'Please authenticate first.'}
-        self._API_ENDPOINTS = API_ENDPOINTS
+        self._endpoints = ENDPOINTS
         self._headers = headers if headers != {} else {
             'app_version': '11.15.0',
             'platform': 'ios',
@@ -30,13 +77,95 @@ class Tinder_API(object):
             self.authenticate(api_token)
 
 
+    def close(self):
+        '''
+        Closes the underlying transport and its pooled connections.
+        '''
+        if self._token_manager is not None:
+            self._token_manager.stop()
+        self._transport.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def _make_single_flight(self):
+        return SingleFlight()
+
+
     # AUTHENTICATION METHODS
 
     def authenticate(self, api_token):
         '''
         Sets the authenticate header attribute.
+        Clears the response cache, as it holds the previous user's data.
         '''
-        self._headers.update({self._auth_key: api_token})
+        self._set_api_token(api_token)
+        if self._cache is not None:
+            self._cache.clear()
+
+
+    def _set_api_token(self, api_token):
+        # the headers are replaced rather than updated, so that requests in flight keep consistent headers
+        self._headers = dict(self._headers, **{self._auth_key: api_token})
+
+
+    def manage_token(self, refresh_token, cache_path=None, **kwargs):
+        '''
+        Authenticates, then keeps the API token valid by refreshing it in the background before it expires.
+
+        example: tinder_api.manage_token(refresh_token, cache_path='/var/tmp/tinder_token.json')
+
+        :param refresh_token: obtained from :method:`get_refresh_token`.
+
+        :param cache_path: file where the token is shared with other processes, `None` to not share it.
+
+        :param kwargs: see :class:`tinder_api.token_manager.TokenManager`.
+
+        :return: :class:`tinder_api.token_manager.TokenManager`, stopped by :method:`close`.
+        '''
+        self._replace_token_manager(refresh_token, cache_path, **kwargs).start()
+        return self._token_manager
+
+
+    def _replace_token_manager(self, refresh_token, cache_path, **kwargs):
+        '''
+        Stops the current token manager, if any, and creates a new one, not started.
+        '''
+        from tinder_api.token_manager import TokenManager
+        if self._token_manager is not None:
+            self._token_manager.stop()
+        self._token_manager = TokenManager(self, refresh_token, cache_path, **kwargs)
+        return self._token_manager
+
+
+    def invalidate_cache(self, service=None, endpoint=None):
+        '''
+        Removes cached responses. Does nothing if caching is disabled.
+
+        :param service: only remove the responses of this service.
+
+        :param endpoint: only remove the responses of this endpoint of `service`.
+
+        :raises tinder_api.api_endpoints.UnknownEndpointError: if the service or endpoint does not exist.
+        '''
+        if service is None:
+            if self._cache is not None:
+                self._cache.clear()
+            return
+        if endpoint is not None:
+            endpoint_keys = [self._endpoints.get(service, endpoint).key]
+        else:
+            endpoint_keys = [api_endpoint.key for api_endpoint in self._endpoints if api_endpoint.service == service]
+            if not endpoint_keys:
+                raise UnknownEndpointError(self._endpoints._unknown_endpoint_message(service, None))
+        if self._cache is not None:
+            self._cache.invalidate(*endpoint_keys)
 
 
     # SMS authentication
@@ -69,7 +198,7 @@ class Tinder_API(object):
         :param refresh_token: Refresh token obtained from :method:`get_refresh_token`.
         '''
         data = {'refresh_token': refresh_token }
-        response_body = self.custom_request(self._API_ENDPOINTS['authApiPath'] + '/sms', http_verb='POST', data=data)
+        response_body = self.custom_request(self._endpoints.auth_api_path + '/sms', http_verb='POST', data=data)
         api_token = response_body.get("data", {}).get("api_token", None)
         self.authenticate(api_token)
         return api_token
@@ -117,11 +246,28 @@ class Tinder_API(object):
         return self.api_request('user', 'getUpdates', data={'last_activity_date': last_activity_date})
 
 
+    def stream_updates(self, last_activity_date=None, keys=('matches', 'inbox', 'blocks')):
+        '''
+        Same as :method:`get_updates`, but the response is decoded as it is downloaded,
+        yielding each match, message, etc. as soon as it is parsed.
+        Use it for large accounts, to avoid holding the whole response in memory.
+
+        example: for key, item in tinder_api.stream_updates(): ...
+
+        :param last_activity_date: see :method:`get_updates`.
+
+        :param keys: arrays of the response whose elements are yielded.
+
+        :return: generator of `(key, element)`, ex: `('matches', match)`.
+        '''
+        return self.stream_request('user', 'getUpdates', keys, data={'last_activity_date': last_activity_date})
+
+
     def get_self(self):
         '''
         Returns your own profile data
         '''
-        return self.custom_request('/profile')
+        return self.api_request('profile', 'getProfile')
 
 
     def get_self_v2(self):
@@ -146,7 +292,7 @@ class Tinder_API(object):
         
         example: change_preferences(age_filter_min=30, gender=0)
         '''
-        return self.custom_request('/profile', http_verb='POST', data=preferences)
+        return self.api_request('profile', 'updateProfile', data=preferences)
 
 
     def get_meta(self):
@@ -156,7 +302,7 @@ class Tinder_API(object):
         'status', 'groups', 'products', 'rating', 'tutorials',
         'travel', 'notifications', 'user']
         '''
-        return self.custom_request('/meta')
+        return self.api_request('meta', 'getMetaV1')
 
 
     def get_meta_v2(self):
@@ -195,7 +341,7 @@ class Tinder_API(object):
         :param username: string
             ex: https://www.gotinder.com/@YOURUSERNAME
         '''
-        return self.custom_request('/profile/username', http_verb='PUT', data={'username': username})
+        return self.api_request('profile', 'setUsername', data={'username': username})
 
     def reset_webprofileusername(self, username):
         '''
@@ -203,7 +349,7 @@ class Tinder_API(object):
 
         :param username: ?
         '''
-        return self.custom_request('/profile/username', http_verb='DELETE')
+        return self.api_request('profile', 'resetUsername')
 
 
     def get_person(self, id):
@@ -286,6 +432,79 @@ class Tinder_API(object):
         return self.api_request('user', 'getMatch', matchId=match_id)
 
 
+    def get_match_messages(self, match_id, limit=100, page_token=None):
+        '''
+        Get the messages of a match, most recent first. Use the page token in the response to obtain older ones.
+
+        :param match_id: ID of the match.
+
+        :param limit: maximum number of messages to get.
+
+        :param page_token: Page offset. Obtained in this function's response.
+        '''
+        return self.api_request('user', 'getMatchMessages', data={'count': limit, 'page_token': page_token}, matchId=match_id)
+
+
+    def hydrate_matches(self, match_ids, messages=True, max_workers=8):
+        '''
+        Get the details, and optionally the whole message history, of several matches,
+        fetching up to `max_workers` matches at once.
+
+        example: tinder_api.hydrate_matches([match['_id'] for match in tinder_api.iter_matches()])
+
+        :param match_ids: IDs of the matches.
+
+        :param messages: also get every message of each match.
+
+        :param max_workers: maximum number of matches fetched at once.
+
+        :return: `list` in the order of `match_ids`. Each item is `{'match': match, 'messages': [messages]}`,
+            or an error `dict` when a call for that match failed, without affecting the other matches.
+        '''
+        return [result for _, result in bounded_map(partial(self._hydrate_match, messages=messages), match_ids, max_workers)]
+
+
+    def iter_hydrated_matches(self, match_ids, messages=True, max_workers=8):
+        '''
+        Same as :method:`hydrate_matches`, but yields each match as soon as it is fetched.
+
+        :return: generator of `(match ID, result)`, in completion order.
+        '''
+        def hydrate(match_id):
+            return match_id, self._hydrate_match(match_id, messages)
+        for _, result in bounded_map(hydrate, match_ids, max_workers, ordered=False):
+            yield result
+
+
+    def _hydrate_match(self, match_id, messages=True):
+        try:
+            response = self.get_match(match_id)
+            if 'error' in response:
+                return response
+            hydrated = {'match': response.get('data', response)}
+            if messages:
+                hydrated['messages'], page_token = [], None
+                while True:
+                    response = self.get_match_messages(match_id, page_token=page_token)
+                    if 'error' in response:
+                        return response
+                    page, page_token = self._parse_messages_page(response)
+                    hydrated['messages'].extend(page)
+                    if not page_token:
+                        break
+            return hydrated
+        except Exception as e:
+            return {'error': 'Something went wrong.', 'exception': str(e)}
+
+
+    def _parse_messages_page(self, response):
+        '''
+        :return: `tuple` of the messages of a :method:`get_match_messages` response and the next page token.
+        '''
+        data = response.get('data') or {}
+        return data.get('messages', []), data.get('next_page_token')
+
+
     def matches(self, limit=60, page_token=None):
         '''
         Get matches, in increments of roughly 60. Use the page token in the response to obtain the next set.
@@ -297,6 +516,58 @@ class Tinder_API(object):
         return self.api_request('user', 'getMatches', data={'count': limit, 'page_token': page_token})
 
 
+    def iter_matches(self, limit=60, page_token=None, prefetch_pages=1):
+        '''
+        Iterate over all your matches, following the page token of each response.
+        The next pages are fetched in the background while the current one is being processed.
+
+        example: helpers.format_matches(tinder_api.iter_matches())
+
+        :param limit: number of matches per page.
+
+        :param page_token: page to start from. Defaults to the first page.
+
+        :param prefetch_pages: maximum number of pages fetched ahead. 0 fetches each page when it is needed.
+
+        :return: generator of match objects.
+        '''
+        pages = self._iter_matches_pages(limit, page_token)
+        if prefetch_pages > 0:
+            pages = prefetch(pages, prefetch_pages)
+        for page in pages:
+            yield from page
+
+
+    def _iter_matches_pages(self, limit, page_token):
+        while True:
+            page, page_token = self._parse_matches_page(self.matches(limit=limit, page_token=page_token))
+            yield page
+            if not page_token:
+                return
+
+
+    def _parse_matches_page(self, response):
+        '''
+        :return: `tuple` of the matches of a :method:`matches` response and the next page token.
+        '''
+        data = response.get('data') if isinstance(response, dict) else None
+        if data is None:
+            raise RuntimeError('Could not get matches: %r' % (response,))
+        return data.get('matches', []), data.get('next_page_token')
+
+
+    # MEDIA
+
+    def update_media_details(self, details):
+        '''
+        Updates details of media of your profile.
+        Uploading media is experimental, see :class:`tinder_api.media.MediaUploader`.
+
+        :param details: fields of the `UpdateMediaDetailsRequest` message.
+        '''
+        return self.api_request('mediaservice', 'details', data=details)
+
+
     def fast_match_count(self):
         '''
         Get your match count. Returns a value between 0 and 99.
@@ -339,14 +610,93 @@ class Tinder_API(object):
 
         :param data: data to send with the request.
 
+        :param kwargs: path parameters, ex: `matchId`.
+
         :return: :class:`requests.Reponse`
         '''
-        api_endpoint = self.get_endpoint(service, endpoint)
-        return self.custom_request(api_endpoint.get('path').format(**kwargs), http_verb=api_endpoint.get('method', 'GET'), data=data)
+        return self._call_endpoint(self._endpoints.get(service, endpoint), data, **kwargs)
+
+
+    def stream_request(self, service, endpoint, keys, data={}, **kwargs):
+        '''
+        Perform an API request, decoding the response as it is downloaded.
+        Elements of the arrays named in `keys` are yielded as soon as they are parsed,
+        whether the arrays are at the top of the response or in its `data` object.
+        Responses are never cached nor coalesced, but requests are paced and retried by the policy and measured
+        by the metrics like the others: until the response headers are received, without the streamed body.
+
+        :param service: Tinder API service from `api_endpoints.json`.
+
+        :param endpoint: Tinder API service endpoint from `api_endpoints.json`.
+
+        :param keys: names of the arrays whose elements are yielded, ex: ('matches', 'messages').
+
+        :param data: data to send with the request.
+
+        :param kwargs: path parameters, ex: `matchId`.
+
+        :return: generator of `(key, element)`.
+
+        :raises RuntimeError: if not authenticated, or the server answers with an error status.
+            The exception raised by the transport if it fails.
+        '''
+        api_endpoint = self._endpoints.get(service, endpoint)
+        endpoint_path = api_endpoint.format_path(**kwargs)
+        if self._auth_key not in self._headers and '/auth' not in endpoint_path:
+            raise RuntimeError(self._not_authenticated_error['error'])
+        url, body = self._prepare_request(endpoint_path, api_endpoint.method, data)
+        request = PreparedRequest(api_endpoint.method, url, self._headers, body, api_endpoint)
+        request.stream = True
+        return self._stream(request, keys)
+
+
+    def _stream(self, request, keys):
+        response, error, _ = self._exchange(request)
+        if error is not None:
+            raise error
+        try:
+            if response.status_code >= 400:
+                raise RuntimeError('Request failed with status %d: %s' % (response.status_code, response.text[:200]))
+            yield from iter_json_items(response.iter_content(STREAM_CHUNK_SIZE), keys)
+        finally:
+            response.close()
+
 
-    
     def get_endpoint(self, service, endpoint):
-        return self._API_ENDPOINTS['services'].get(service)['endpoints'].get(endpoint)
+        '''
+        Get the description of an endpoint.
+
+        :param service: Tinder API service from `api_endpoints.json`.
+
+        :param endpoint: Tinder API service endpoint from `api_endpoints.json`.
+
+        :return: `dict`, a copy of the endpoint's entry in `api_endpoints.json`, ex: `{'path': '/profile'}`.
+
+        :raises tinder_api.api_endpoints.UnknownEndpointError: if the service or endpoint does not exist.
+        '''
+        self._endpoints.get(service, endpoint)
+        return dict(self._endpoints.raw['services'][service]['endpoints'][endpoint])
+
+
+    def endpoint(self, service, endpoint):
+        '''
+        Get a function calling an endpoint, with the endpoint lookup already done.
+        Useful when calling the same endpoint many times.
+
+        example: get_match = tinder_api.endpoint('user', 'getMatch')
+                 get_match(matchId=match_id)
+
+        :param service: Tinder API service from `api_endpoints.json`.
+
+        :param endpoint: Tinder API service endpoint from `api_endpoints.json`.
+
+        :return: function taking the same `data` and path parameters as :method:`api_request`.
+        '''
+        return partial(self._call_endpoint, self._endpoints.get(service, endpoint))
+
+
+    def _call_endpoint(self, api_endpoint, data={}, **kwargs):
+        return self._send(self._prepare(api_endpoint.format_path(**kwargs), api_endpoint.method, data, api_endpoint))
 
 
     def custom_request(self, endpoint, http_verb='get', data={}):
@@ -365,29 +715,203 @@ class Tinder_API(object):
 
         :return: response object
         '''
-        if self._auth_key not in self._headers and '/auth' not in endpoint:
-            return self._not_authenticated_error
-        
-        http_verb_functions={ 'get': requests.get, 'head': requests.head, 'post': requests.post, 'patch': requests.patch, 'put': requests.put, 'delete': requests.delete, 'options': requests.options }
-        request_has_body={ 'get': False, 'head': False, 'post': True, 'patch': True, 'put': True, 'delete': True, 'options': False }
-        response_has_body={ 'get': True, 'head': False, 'post': True, 'patch': True, 'put': False, 'delete': True, 'options': True }
-        
-        http_verb = http_verb.lower()
-        url = self._host + endpoint
-        http_verb_function = http_verb_functions[http_verb.lower()]
+        return self._send(self._prepare(endpoint, http_verb.lower(), data))
+
+
+    def _send(self, request):
+        '''
+        Sends a prepared request, unless it already has a result.
+
+        :param request: :class:`PreparedRequest`
+
+        :return: see :method:`custom_request`.
+        '''
+        if request.result is not None:
+            return request.result
+        if request.coalesce_key is not None:
+            return self._single_flight.do(request.coalesce_key, lambda: self._perform(request))
+        return self._perform(request)
+
+
+    def _perform(self, request):
+        response, error, attempts = self._exchange(request)
+        if request.cache_entry is not None and response is not None and response.status_code == 304:
+            cached = self._revalidated(request)
+            if cached is not None:
+                return cached
+            # evicted since the request was prepared: sent again for a response with a body
+            self._unconditional(request)
+            response, error, more_attempts = self._exchange(request)
+            attempts += more_attempts
+        return self._result(request, response, error, attempts)
 
-        if not request_has_body[http_verb]:
-            url += self.data_to_query_string(data)
-            data = None
-        else:
-            data = json.dumps(data)
 
+    def _revalidated(self, request):
+        '''
+        Refreshes the cache entry of a request answered `304 Not Modified`.
+
+        :return: copy of the cached response, or `None` if it was evicted meanwhile.
+        '''
+        cached = self._cache.revalidated(request.url, request.api_endpoint.cache_ttl)
+        if cached is not None and self.metrics is not None:
+            self.metrics.cache_revalidated(request)
+        return cached
+
+
+    def _unconditional(self, request):
+        '''
+        Turns a request revalidating a cache entry into a plain one.
+        '''
+        request.cache_entry = None
+        request.headers = {name: value for name, value in request.headers.items() if name != 'If-None-Match'}
+
+
+    def _exchange(self, request):
+        '''
+        Sends a request, retrying it as the policy allows.
+
+        :param request: :class:`PreparedRequest`
+
+        :return: `tuple` of the last response (`None` if the transport raised), the exception raised and the number of attempts.
+        '''
+        attempt = 0
+        while True:
+            if self._policy is not None:
+                time.sleep(self._policy.before_request(request.api_endpoint, attempt))
+            response, error = None, None
+            if self.metrics is not None:
+                started = self.metrics.request_started(request)
+            try:
+                response = self._transport.request(request.http_verb.upper(), request.url, headers=request.headers, data=request.body, stream=request.stream)
+            except Exception as e:
+                error = e
+            finally:
+                if self.metrics is not None:
+                    self.metrics.request_finished(request, started, response, error)
+            delay = None if self._policy is None else self._policy.retry_delay(request.http_verb, request.api_endpoint, attempt, response, error)
+            if delay is None:
+                return response, error, attempt + 1
+            if request.stream and response is not None:
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+    def _result(self, request, response, error, attempts):
+        '''
+        Result of the last attempt of a request.
+
+        :param request: :class:`PreparedRequest`
+
+        :param response: response returned by the transport, `None` if it raised `error`.
+
+        :param error: exception raised by the transport, if any.
+
+        :param attempts: number of attempts made.
+
+        :return: see :method:`custom_request`. Errors are `dict` with an 'error' key,
+            and when known the HTTP 'status', the 'retry_after' seconds asked by the server and the number of 'attempts'.
+        '''
+        if error is not None:
+            return {'error': 'Something went wrong.', 'exception': str(error), 'attempts': attempts}
+        if self._policy is not None and response.status_code in RETRYABLE_STATUS_CODES:
+            return {
+                'error': 'Too many requests.' if response.status_code == 429 else 'Server unavailable.',
+                'status': response.status_code,
+                'retry_after': parse_retry_after(response.headers.get('Retry-After')),
+                'attempts': attempts,
+            }
         try:
-            # call API and developer must figure out what to do with responses with no body
-            response = http_verb_function(url, headers=self._headers, data=data)
-            return response.json() if response_has_body[http_verb] else response
+            return self._handle_response(request, response)
         except Exception as e:
-            return {'error': 'Something went wrong.', 'exception': str(e)}
+            return {'error': 'Something went wrong.', 'exception': str(e), 'status': response.status_code, 'attempts': attempts}
+
+
+    def _prepare(self, endpoint, http_verb, data, api_endpoint=None):
+        '''
+        Builds a request, and answers it from the cache when possible.
+
+        :param endpoint: endpoint (part of the link after host).
+
+        :param http_verb: lower case HTTP verb.
+
+        :param data: data to send with the request.
+
+        :param api_endpoint: :class:`tinder_api.api_endpoints.Endpoint` called, if known.
+
+        :return: :class:`PreparedRequest`
+        '''
+        if self._auth_key not in self._headers and '/auth' not in endpoint:
+            request = PreparedRequest(http_verb, None, None, None, api_endpoint)
+            request.result = self._not_authenticated_error
+            return request
+        codec = self.codecs.get(api_endpoint)
+        url, body = self._prepare_request(endpoint, http_verb, data, codec)
+        request = PreparedRequest(http_verb, url, self._headers, body, api_endpoint, codec)
+        if codec is not self._codec and getattr(codec, 'headers', None):
+            request.headers = dict(self._headers, **codec.headers)
+        if self._cache is not None and api_endpoint is not None and api_endpoint.cache_ttl:
+            entry = self._cache.get(url)
+            fresh = entry is not None and entry.is_fresh()
+            if self.metrics is not None:
+                self.metrics.cache_lookup(request, fresh)
+            if fresh:
+                request.result = entry.copy()
+            elif entry is not None and entry.etag:
+                request.cache_entry = entry
+                request.headers = dict(self._headers, **{'If-None-Match': entry.etag})
+        if self._single_flight is not None and request.result is None and http_verb in SAFE_HTTP_VERBS:
+            request.coalesce_key = (http_verb, endpoint, json.dumps(data, sort_keys=True, default=str))
+        return request
+
+
+    def _handle_response(self, request, response):
+        '''
+        Decodes a response, and updates the cache.
+
+        :param request: :class:`PreparedRequest`
+
+        :param response: response returned by the transport.
+
+        :return: see :method:`custom_request`.
+        '''
+        api_endpoint = request.api_endpoint
+        codec = request.codec or self._codec
+        if codec is not self._codec:
+            # endpoints with their own codec, ex: protobuf, have their responses decoded whatever the verb,
+            # JSON responses from them are errors
+            if 'json' in response.headers.get('Content-Type', ''):
+                codec = self._codec
+            result = codec.loads(response.content)
+        else:
+            # developer must figure out what to do with responses with no body
+            result = codec.loads(response.content) if RESPONSE_HAS_BODY[request.http_verb] else response
+        if self._cache is not None and api_endpoint is not None:
+            if api_endpoint.cache_ttl and response.status_code == 200:
+                self._cache.set(request.url, api_endpoint.key, result, api_endpoint.cache_ttl, response.headers.get('ETag'))
+            if api_endpoint.invalidates and response.status_code < 400:
+                self._cache.invalidate(*api_endpoint.invalidates)
+        return result
+
+
+    def _prepare_request(self, endpoint, http_verb, data, codec=None):
+        '''
+        Builds the URL and body of a request.
+
+        :param endpoint: endpoint (part of the link after host).
+
+        :param http_verb: lower case HTTP verb.
+
+        :param data: data to send with the request.
+
+        :param codec: codec encoding the body. Defaults to the client's codec.
+
+        :return: `tuple` of the URL and the body (`None` if the verb has no body).
+        '''
+        url = self._host + endpoint
+        if not REQUEST_HAS_BODY[http_verb]:
+            return url + self.data_to_query_string(data), None
+        return url, (codec or self._codec).dumps(data)
 
 
     def data_to_query_string(self, data):
@@ -0,0 +1,220 @@
+# coding=utf-8
+'''
+Registry of the Tinder API endpoints listed in `api_endpoints.json`.
+
+The JSON file is only read the first time an endpoint is looked up. Each entry is then
+compiled once into a frozen :class:`Endpoint` descriptor holding its pre-parsed path template,
+so that building a request is a single dict lookup and a printf-style formatting.
+
+`API_ENDPOINTS` is still available and holds the raw content of the JSON file.
+'''
+
+import json
+import os
+import threading
+from collections import namedtuple
+from operator import itemgetter
+from string import Formatter
+
+ENDPOINTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_endpoints.json')
+
+REQUEST_HAS_BODY = { 'get': False, 'head': False, 'post': True, 'patch': True, 'put': True, 'delete': True, 'options': False }
+RESPONSE_HAS_BODY = { 'get': True, 'head': False, 'post': True, 'patch': True, 'put': False, 'delete': True, 'options': True }
+
+
+class UnknownEndpointError(KeyError):
+    '''
+    Raised when looking up a service or endpoint that is not in `api_endpoints.json`.
+    '''
+    def __str__(self):
+        return self.args[0]
+
+
+def compile_path_template(path):
+    '''
+    Converts a path template to a printf-style format string, which is cheaper to fill in than `str.format`.
+
+    :param path: path template, ex: '/v2/seen/{matchId}/{messageId}'
+
+    :return: `tuple` of the format string and the parameter names, ex: `('/v2/seen/%s/%s', ('matchId', 'messageId'))`
+    '''
+    template = []
+    parameters = []
+    for literal, field, _, _ in Formatter().parse(path):
+        template.append(literal.replace('%', '%%'))
+        if field is not None:
+            template.append('%s')
+            parameters.append(field)
+    return ''.join(template), tuple(parameters)
+
+
+class Endpoint(namedtuple('Endpoint', ['service', 'name', 'path', 'method', 'template', 'parameters', 'get_parameters',
+                                       'has_body', 'response_has_body', 'authenticated',
+                                       'request_schema', 'response_schema', 'cache_ttl', 'invalidates'])):
+    '''
+    Compiled, immutable description of one endpoint of `api_endpoints.json`.
+
+    - `path`: path template, ex: '/v2/matches/{matchId}'.
+    - `method`: HTTP verb, lower case.
+    - `template`: path template compiled by :func:`compile_path_template`.
+    - `parameters`: names of the path parameters.
+    - `get_parameters`: picks the values of the path parameters out of a `dict`.
+    - `has_body`: whether data is sent as a JSON body (otherwise as a query string).
+    - `response_has_body`: whether the response body is decoded.
+    - `authenticated`: whether the endpoint requires the auth token.
+    - `request_schema`, `response_schema`: protobuf `(package, message)` refs, or `None`.
+    - `cache_ttl`: seconds a response may be cached for, or `None` if it must not be cached.
+    - `invalidates`: 'service.endpoint' keys of the cached reads made stale by calling this endpoint.
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def compile(cls, service, name, spec):
+        '''
+        Builds an endpoint from its entry in `api_endpoints.json`.
+        '''
+        method = spec.get('method', 'GET').lower()
+        template, parameters = compile_path_template(spec['path'])
+        request_schema = spec.get('requestSchema')
+        response_schema = spec.get('responseSchema')
+        return cls(
+            service=service,
+            name=name,
+            path=spec['path'],
+            method=method,
+            template=template,
+            parameters=parameters,
+            get_parameters=itemgetter(*parameters) if parameters else None,
+            has_body=REQUEST_HAS_BODY[method],
+            response_has_body=RESPONSE_HAS_BODY[method],
+            authenticated=not spec.get('unAuthed', False),
+            request_schema=tuple(request_schema) if request_schema else None,
+            response_schema=tuple(response_schema) if response_schema else None,
+            cache_ttl=spec['cache']['ttl'] if 'cache' in spec and method == 'get' else None,
+            invalidates=tuple(spec.get('invalidates', ())),
+        )
+
+
+    @property
+    def key(self):
+        '''
+        `service.name`, ex: 'user.getMatch'.
+        '''
+        return self.service + '.' + self.name
+
+
+    def format_path(self, **kwargs):
+        '''
+        Fills in the path parameters.
+
+        :param kwargs: value of each path parameter, ex: `matchId='...'`.
+
+        :return: the path.
+        '''
+        if not self.parameters:
+            return self.path
+        try:
+            values = self.get_parameters(kwargs)
+        except KeyError as ex:
+            raise TypeError("%s() missing path parameter '%s'" % (self.key, ex.args[0])) from None
+        return self.template % (values if len(self.parameters) > 1 else (values,))
+
+
+class EndpointRegistry(object):
+    '''
+    All the endpoints of `api_endpoints.json`, compiled on first use.
+
+    :param filename: path of the JSON file to load.
+    '''
+    def __init__(self, filename=ENDPOINTS_FILE):
+        self._filename = filename
+        self._lock = threading.Lock()
+        self._raw = None
+        self._endpoints = None
+
+
+    def _load(self):
+        with self._lock:
+            if self._endpoints is None:
+                with open(self._filename, 'r') as endpoints_file:
+                    raw = json.load(endpoints_file)
+                endpoints = {}
+                for service, service_spec in raw['services'].items():
+                    for name, spec in service_spec['endpoints'].items():
+                        endpoints[(service, name)] = Endpoint.compile(service, name, spec)
+                keys = set(endpoint.key for endpoint in endpoints.values())
+                for endpoint in endpoints.values():
+                    for key in endpoint.invalidates:
+                        if key not in keys:
+                            raise ValueError("%s invalidates unknown endpoint '%s'." % (endpoint.key, key))
+                self._raw = raw
+                self._endpoints = endpoints
+        return self._endpoints
+
+
+    @property
+    def raw(self):
+        '''
+        Content of the JSON file.
+        '''
+        if self._endpoints is None:
+            self._load()
+        return self._raw
+
+
+    @property
+    def auth_api_path(self):
+        return self.raw['authApiPath']
+
+
+    def get(self, service, name):
+        '''
+        Gets an endpoint.
+
+        :param service: Tinder API service from `api_endpoints.json`.
+
+        :param name: Tinder API service endpoint from `api_endpoints.json`.
+
+        :return: :class:`Endpoint`
+
+        :raises UnknownEndpointError: if the service or endpoint does not exist.
+        '''
+        endpoints = self._endpoints if self._endpoints is not None else self._load()
+        try:
+            return endpoints[(service, name)]
+        except KeyError:
+            raise UnknownEndpointError(self._unknown_endpoint_message(service, name)) from None
+
+
+    def _unknown_endpoint_message(self, service, name):
+        import difflib
+        services = self.raw['services']
+        if service not in services:
+            suggestions = difflib.get_close_matches(str(service), services.keys())
+            message = "Unknown service '%s'." % service
+        else:
+            suggestions = ['%s.%s' % (service, match) for match in difflib.get_close_matches(str(name), services[service]['endpoints'].keys())]
+            message = "Unknown endpoint '%s' in service '%s'." % (name, service)
+        if suggestions:
+            message += ' Did you mean: %s?' % ', '.join(suggestions)
+        return message
+
+
+    def __iter__(self):
+        endpoints = self._endpoints if self._endpoints is not None else self._load()
+        return iter(endpoints.values())
+
+
+    def __len__(self):
+        endpoints = self._endpoints if self._endpoints is not None else self._load()
+        return len(endpoints)
+
+
+ENDPOINTS = EndpointRegistry()
+
+
+def __getattr__(name):
+    # `API_ENDPOINTS` is loaded on first access only
+    if name == 'API_ENDPOINTS':
+        return ENDPOINTS.raw
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
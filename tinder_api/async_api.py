@@ -0,0 +1,312 @@
+# coding=utf-8
+'''
+Asynchronous Tinder API python wrapper
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Same methods as :class:`tinder_api.api.Tinder_API`, but every API call is a
+coroutine that must be awaited.
+
+:license: MIT, see LICENSE for more details.
+'''
+
+import asyncio
+import itertools
+from tinder_api.api import STREAM_CHUNK_SIZE, Tinder_API
+from tinder_api.codec import aiter_json_items
+from tinder_api.singleflight import AsyncSingleFlight
+from tinder_api.transport import AiohttpTransport
+
+class AsyncTinder_API(Tinder_API):
+    '''
+    Asynchronous version of :class:`tinder_api.api.Tinder_API`.
+
+    Methods that only forward to :method:`api_request` or :method:`custom_request`
+    are inherited as is, and return awaitables: both end in :method:`_send`, which is a coroutine here.
+
+    :param concurrency: maximum number of requests in flight at once.
+    '''
+    def __init__(self, host= 'https://api.gotinder.com', headers={}, api_token=None, transport=None, pool_size=100, concurrency=100, cache=None, coalesce=False, codec='json', policy=None, metrics=None, schema_path=None):
+        if transport is None:
+            transport = AiohttpTransport(pool_size=pool_size)
+        super().__init__(host=host, headers=headers, api_token=api_token, transport=transport, cache=cache, coalesce=coalesce, codec=codec, policy=policy, metrics=metrics, schema_path=schema_path)
+        self._concurrency = concurrency
+        self._semaphore = None
+
+
+    async def close(self):
+        '''
+        Closes the underlying transport and its pooled connections.
+        '''
+        if self._token_manager is not None:
+            self._token_manager.stop()
+        await self._transport.close()
+
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with AsyncTinder_API.')
+
+
+    def _make_single_flight(self):
+        return AsyncSingleFlight()
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+    # AUTHENTICATION METHODS
+
+    async def manage_token(self, refresh_token, cache_path=None, **kwargs):
+        '''
+        See :method:`tinder_api.api.Tinder_API.manage_token`.
+        The first refresh runs in the default executor, so that it does not block the event loop,
+        and the next ones on the background timer thread.
+        '''
+        token_manager = self._replace_token_manager(refresh_token, cache_path, **kwargs)
+        await asyncio.get_running_loop().run_in_executor(None, token_manager.start)
+        return token_manager
+
+
+    async def get_refresh_token(self, phone_number, otp_code):
+        '''
+        Gets the refresh token.
+
+        :param phone_number: the user's phone number.
+
+        :param otp_code: received by the user on the number provided.
+        '''
+        response_body = await self.api_request('auth', 'smsValidate', data={'otp_code': otp_code, 'phone_number': phone_number})
+        return response_body.get("data", {}).get("refresh_token")
+
+
+    async def get_api_token(self, refresh_token):
+        '''
+        Gets the API token from the refresh token. Will also authenticate.
+
+        :param refresh_token: Refresh token obtained from :method:`get_refresh_token`.
+        '''
+        data = {'refresh_token': refresh_token }
+        response_body = await self.custom_request(self._endpoints.auth_api_path + '/sms', http_verb='POST', data=data)
+        api_token = response_body.get("data", {}).get("api_token", None)
+        self.authenticate(api_token)
+        return api_token
+
+
+    async def get_facebook_auth_token(self, facebook_auth_token, facebook_user_id):
+        '''
+        Get api_token using Facebook.
+
+        :param facebook_auth_token: the Facebook auth token of the user to authenticate.
+
+        :param facebook_user_id: the Facebook ID of the user to authenticate.
+        '''
+        response_body = await self.custom_request('/auth', http_verb='POST', data={'facebook_token': facebook_auth_token, 'facebook_id': facebook_user_id})
+        token = response_body['token']
+        self.authenticate(token)
+        return token
+
+
+    # APP FUNCTIONALITY
+
+    async def iter_matches(self, limit=60, page_token=None, prefetch_pages=1):
+        '''
+        Iterate over all your matches, following the page token of each response.
+        The next pages are fetched in a background task while the current one is being processed.
+
+        example: async for match in tinder_api.iter_matches(): ...
+
+        :param limit: number of matches per page.
+
+        :param page_token: page to start from. Defaults to the first page.
+
+        :param prefetch_pages: maximum number of pages fetched ahead. 0 fetches each page when it is needed.
+
+        :return: asynchronous generator of match objects.
+        '''
+        if prefetch_pages <= 0:
+            while True:
+                page, page_token = self._parse_matches_page(await self.matches(limit=limit, page_token=page_token))
+                for match in page:
+                    yield match
+                if not page_token:
+                    return
+
+        pages = asyncio.Queue()
+        # one slot per page fetched and not taken yet, acquired before fetching it
+        slots = asyncio.Semaphore(prefetch_pages)
+
+        async def produce(page_token):
+            try:
+                while True:
+                    await slots.acquire()
+                    page, page_token = self._parse_matches_page(await self.matches(limit=limit, page_token=page_token))
+                    await pages.put((page, None))
+                    if not page_token:
+                        await pages.put((None, None))
+                        return
+            except Exception as ex:
+                await pages.put((None, ex))
+
+        producer = asyncio.ensure_future(produce(page_token))
+        try:
+            while True:
+                page, error = await pages.get()
+                slots.release()
+                if error is not None:
+                    raise error
+                if page is None:
+                    return
+                for match in page:
+                    yield match
+        finally:
+            producer.cancel()
+
+
+    async def hydrate_matches(self, match_ids, messages=True, max_workers=8):
+        '''
+        See :method:`tinder_api.api.Tinder_API.hydrate_matches`.
+
+        :param max_workers: maximum number of matches fetched at once.
+        '''
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def hydrate(match_id):
+            async with semaphore:
+                return await self._hydrate_match(match_id, messages)
+
+        return await asyncio.gather(*[hydrate(match_id) for match_id in match_ids])
+
+
+    async def iter_hydrated_matches(self, match_ids, messages=True, max_workers=8):
+        '''
+        Same as :method:`hydrate_matches`, but yields each match as soon as it is fetched.
+
+        example: async for match_id, result in tinder_api.iter_hydrated_matches(match_ids): ...
+
+        :return: asynchronous generator of `(match ID, result)`, in completion order.
+        '''
+        match_ids = iter(match_ids)
+        pending = {}
+
+        def submit(count):
+            for match_id in itertools.islice(match_ids, count):
+                pending[asyncio.ensure_future(self._hydrate_match(match_id, messages))] = match_id
+
+        try:
+            submit(max_workers)
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield pending.pop(task), task.result()
+                submit(len(done))
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+    async def _hydrate_match(self, match_id, messages=True):
+        try:
+            response = await self.get_match(match_id)
+            if 'error' in response:
+                return response
+            hydrated = {'match': response.get('data', response)}
+            if messages:
+                hydrated['messages'], page_token = [], None
+                while True:
+                    response = await self.get_match_messages(match_id, page_token=page_token)
+                    if 'error' in response:
+                        return response
+                    page, page_token = self._parse_messages_page(response)
+                    hydrated['messages'].extend(page)
+                    if not page_token:
+                        break
+            return hydrated
+        except Exception as e:
+            return {'error': 'Something went wrong.', 'exception': str(e)}
+
+
+    # REQUESTS
+
+    async def _stream(self, request, keys):
+        '''
+        Asynchronous version of :method:`tinder_api.api.Tinder_API._stream`: :method:`stream_request`
+        and :method:`stream_updates` return asynchronous generators, ex: `async for key, item in tinder_api.stream_updates(): ...`
+        The transport must support streamed responses, see :mod:`tinder_api.transport`.
+        '''
+        response, error, _ = await self._exchange(request)
+        if error is not None:
+            raise error
+        try:
+            if response.status_code >= 400:
+                content = b''.join([chunk async for chunk in response.aiter_content(STREAM_CHUNK_SIZE)])
+                raise RuntimeError('Request failed with status %d: %s' % (response.status_code, content.decode('utf-8', 'replace')[:200]))
+            async for item in aiter_json_items(response.aiter_content(STREAM_CHUNK_SIZE), keys):
+                yield item
+        finally:
+            await response.aclose()
+
+
+    def _get_semaphore(self):
+        # created lazily so that it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        return self._semaphore
+
+
+    async def _send(self, request):
+        '''
+        Sends a prepared request, unless it already has a result.
+        At most `concurrency` requests are sent at once, the others wait for a free slot.
+
+        :param request: :class:`tinder_api.api.PreparedRequest`
+
+        :return: see :method:`tinder_api.api.Tinder_API.custom_request`.
+        '''
+        if request.result is not None:
+            return request.result
+        if request.coalesce_key is not None:
+            return await self._single_flight.do(request.coalesce_key, lambda: self._perform(request))
+        return await self._perform(request)
+
+
+    async def _perform(self, request):
+        response, error, attempts = await self._exchange(request)
+        if request.cache_entry is not None and response is not None and response.status_code == 304:
+            cached = self._revalidated(request)
+            if cached is not None:
+                return cached
+            # evicted since the request was prepared: sent again for a response with a body
+            self._unconditional(request)
+            response, error, more_attempts = await self._exchange(request)
+            attempts += more_attempts
+        return self._result(request, response, error, attempts)
+
+
+    async def _exchange(self, request):
+        attempt = 0
+        while True:
+            if self._policy is not None:
+                await asyncio.sleep(self._policy.before_request(request.api_endpoint, attempt))
+            response, error = None, None
+            async with self._get_semaphore():
+                if self.metrics is not None:
+                    started = self.metrics.request_started(request)
+                try:
+                    response = await self._transport.request(request.http_verb.upper(), request.url, headers=request.headers, data=request.body, stream=request.stream)
+                except Exception as e:
+                    error = e
+                finally:
+                    # also when cancelled, so that the request is not counted in flight forever
+                    if self.metrics is not None:
+                        self.metrics.request_finished(request, started, response, error)
+            delay = None if self._policy is None else self._policy.retry_delay(request.http_verb, request.api_endpoint, attempt, response, error)
+            if delay is None:
+                return response, error, attempt + 1
+            if request.stream and response is not None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,148 @@
+# coding=utf-8
+'''
+Response cache for read-only endpoints.
+
+Which endpoints are cached, and for how long, is set by the `cache` entry of each
+endpoint in `api_endpoints.json`, ex: `"cache": {"ttl": 300}`. Write endpoints list the
+reads they make stale in `invalidates`, ex: `"invalidates": ["profile.getProfile"]`.
+'''
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+def copy_value(value):
+    '''
+    :return: deep copy of a decoded response. JSON values are copied without the overhead of :func:`copy.deepcopy`.
+    '''
+    if isinstance(value, dict):
+        return {key: copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_value(item) for item in value]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return copy.deepcopy(value)
+
+
+class CacheEntry(object):
+    __slots__ = ('endpoint_key', 'value', 'etag', 'expires_at')
+
+    def __init__(self, endpoint_key, value, etag, expires_at):
+        self.endpoint_key = endpoint_key
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+    def is_fresh(self, now=None):
+        return (now or time.monotonic()) < self.expires_at
+
+
+    def copy(self):
+        '''
+        :return: copy of the cached value, that the caller may modify.
+        '''
+        return copy_value(self.value)
+
+
+class ResponseCache(object):
+    '''
+    Thread-safe LRU cache of decoded responses, with a time to live per entry.
+
+    Expired entries are kept until evicted: if the server sent an `ETag`, the next
+    request revalidates them with `If-None-Match` and a `304 Not Modified` reuses the cached value.
+
+    Values are copied when stored and when served, so that a caller modifying its response does not change the others'.
+
+    :param maxsize: maximum number of responses kept. The least recently used one is evicted first.
+    '''
+    def __init__(self, maxsize=256):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+
+    def get(self, key):
+        '''
+        :param key: request URL.
+
+        :return: :class:`CacheEntry`, fresh or expired, or `None`.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.is_fresh():
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+
+    def set(self, key, endpoint_key, value, ttl, etag=None):
+        '''
+        Stores a response.
+
+        :param key: request URL.
+
+        :param endpoint_key: 'service.endpoint' the response comes from, used for invalidation.
+
+        :param value: decoded response.
+
+        :param ttl: seconds during which the response is served without asking the server.
+
+        :param etag: `ETag` header of the response, if any.
+        '''
+        with self._lock:
+            self._entries[key] = CacheEntry(endpoint_key, copy_value(value), etag, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+
+    def revalidated(self, key, ttl):
+        '''
+        Marks an entry as fresh again, after the server answered `304 Not Modified`.
+
+        :return: copy of the entry's value, or `None` if it was evicted meanwhile.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.revalidations += 1
+            entry.expires_at = time.monotonic() + ttl
+        return entry.copy()
+
+
+    def invalidate(self, *endpoint_keys):
+        '''
+        Removes the responses of the given endpoints. See :method:`clear` to remove every response.
+
+        :param endpoint_keys: 'service.endpoint' keys, ex: 'profile.getProfile'.
+        '''
+        if not endpoint_keys:
+            return
+        with self._lock:
+            endpoint_keys = set(endpoint_keys)
+            for key in [key for key, entry in self._entries.items() if entry.endpoint_key in endpoint_keys]:
+                del self._entries[key]
+
+
+    def clear(self):
+        '''
+        Removes every response.
+        '''
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self):
+        return len(self._entries)
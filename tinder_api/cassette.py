@@ -0,0 +1,412 @@
+# coding=utf-8
+'''
+Record/replay transports: :class:`RecordingTransport` saves the requests sent through another
+transport and their responses to a cassette file, :class:`ReplayTransport` serves them back without any network.
+
+example: with Tinder_API(api_token=api_token, transport=RecordingTransport('matches.cassette')) as tinder_api:
+             tinder_api.matches()
+         with Tinder_API(api_token='anything', transport=ReplayTransport('matches.cassette')) as tinder_api:
+             tinder_api.matches()  # same response, no network
+
+Requests are matched by HTTP verb, endpoint path template of `api_endpoints.json` and normalized
+parameters (path parameters, query string and JSON body, with sorted keys). Headers, the host and
+secrets (auth token, refresh token...) are not part of the key, and secrets are not written to the file.
+When the same request was recorded several times, its responses are replayed in order, the last one repeating.
+
+File format, little-endian:
+- header: `TCAS` magic, format version (1 byte).
+- records: length (4 bytes), then key length (4 bytes), metadata length (4 bytes), key, metadata (JSON: status, headers), body.
+- index: JSON `{key: [record offsets]}`, then its offset (8 bytes) and `TIDX` magic.
+A cassette whose recording was interrupted has no index: it is rebuilt by scanning the records.
+'''
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+from tinder_api.api_endpoints import ENDPOINTS
+
+MAGIC = b'TCAS'
+INDEX_MAGIC = b'TIDX'
+FORMAT_VERSION = 1
+# header, record and footer layouts
+_HEADER = struct.Struct('<4sB')
+_RECORD = struct.Struct('<III')
+_FOOTER = struct.Struct('<Q4s')
+
+SCRUBBED = '<scrubbed>'
+# fields of request and response bodies holding secrets
+SECRET_FIELDS = frozenset(('api_token', 'refresh_token', 'token', 'facebook_token', 'otp_code', 'phone_number'))
+_SECRET_FIELD_NAMES = tuple(('"%s"' % field).encode('utf-8') for field in SECRET_FIELDS)
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+class CassetteMissError(KeyError):
+    '''
+    Raised when replaying a request that is not in the cassette.
+    '''
+    def __str__(self):
+        return self.args[0]
+
+
+class CassetteFormatError(ValueError):
+    '''
+    Raised when a file is not a cassette, or a cassette of an unsupported version.
+    '''
+
+
+class RequestMatcher(object):
+    '''
+    Builds the key of a request: HTTP verb, endpoint path template and normalized parameters.
+
+    :param endpoints: :class:`tinder_api.api_endpoints.EndpointRegistry` whose templates are matched.
+    '''
+    def __init__(self, endpoints=ENDPOINTS):
+        self._endpoints = endpoints
+        self._routes = None
+        self._lock = threading.Lock()
+
+
+    def _get_routes(self):
+        # (verb, number of path segments) -> [(regex, template, parameter names)], most literal segments first
+        if self._routes is None:
+            with self._lock:
+                if self._routes is None:
+                    routes = {}
+                    for endpoint in self._endpoints:
+                        path = urlsplit(endpoint.path).path
+                        pattern = re.compile('^' + re.sub(r'\\\{[^}]*\\\}', '([^/]+)', re.escape(path)) + '$')
+                        literals = sum(1 for segment in path.split('/') if '{' not in segment)
+                        routes.setdefault((endpoint.method, path.count('/')), []).append((literals, pattern, path, endpoint.parameters))
+                    for candidates in routes.values():
+                        candidates.sort(key=lambda candidate: -candidate[0])
+                    self._routes = {key: [candidate[1:] for candidate in candidates] for key, candidates in routes.items()}
+        return self._routes
+
+
+    def match(self, method, path):
+        '''
+        :param method: HTTP verb.
+
+        :param path: request path, without the query string.
+
+        :return: `tuple` of the path template and the `dict` of path parameters.
+            The path itself and no parameters if no endpoint matches, ex: for custom requests.
+        '''
+        for pattern, template, parameters in self._get_routes().get((method.lower(), path.count('/')), ()):
+            found = pattern.match(path)
+            if found is not None:
+                return template, dict(zip(parameters, found.groups()))
+        return path, {}
+
+
+    def key(self, method, url, data=None):
+        '''
+        :param method: HTTP verb.
+
+        :param url: absolute URL.
+
+        :param data: request body, JSON encoded.
+
+        :return: key of the request, ex: 'GET /v2/matches/{matchId} {"path":{"matchId":"5f0"}}'
+        '''
+        split_url = urlsplit(url)
+        template, path_parameters = self.match(method, split_url.path)
+        parameters = {}
+        if path_parameters:
+            parameters['path'] = path_parameters
+        if split_url.query:
+            parameters['query'] = dict(parse_qsl(split_url.query, keep_blank_values=True))
+        if data:
+            parameters['body'] = decode_body(data)
+        return '%s %s %s' % (method.upper(), template, json.dumps(scrub(parameters), sort_keys=True, separators=(',', ':')))
+
+
+def decode_body(data):
+    '''
+    :return: decoded JSON body, or the body as a string if it is not JSON.
+    '''
+    if isinstance(data, (bytes, bytearray)):
+        data = bytes(data).decode('utf-8', 'replace')
+    elif not isinstance(data, str):
+        # streamed body, ex: a media upload, matched on its size
+        return '<%d bytes>' % len(data)
+    try:
+        return json.loads(data)
+    except ValueError:
+        return data
+
+
+def scrub(value):
+    '''
+    :return: copy of a decoded JSON value, with the values of :data:`SECRET_FIELDS` replaced.
+    '''
+    if isinstance(value, dict):
+        return {key: SCRUBBED if key in SECRET_FIELDS and item is not None else scrub(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    return value
+
+
+class CassetteResponse(object):
+    '''
+    Recorded response. The body of a replayed response is read from the cassette only when accessed.
+
+    :param status_code: HTTP status code.
+
+    :param headers: response headers.
+
+    :param body: `bytes`, or `memoryview` of the cassette.
+    '''
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self._body = body
+
+
+    @property
+    def content(self):
+        return bytes(self._body)
+
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+
+    def json(self):
+        return json.loads(self.content)
+
+
+    def iter_content(self, chunk_size=STREAM_CHUNK_SIZE):
+        for start in range(0, len(self._body), chunk_size):
+            yield bytes(self._body[start:start + chunk_size])
+
+
+    async def aiter_content(self, chunk_size=STREAM_CHUNK_SIZE):
+        for chunk in self.iter_content(chunk_size):
+            yield chunk
+
+
+    def close(self):
+        pass
+
+
+    async def aclose(self):
+        pass
+
+
+class RecordingTransport(object):
+    '''
+    Sends requests through another transport, and records them with their responses to a cassette.
+    The cassette is complete once the transport is closed, ex: by closing the :class:`Tinder_API` using it.
+
+    Secrets are scrubbed from the cassette only, the responses returned are left as received.
+    Streamed responses are read in full before being returned.
+
+    :param path: cassette file, overwritten.
+
+    :param transport: transport sending the requests. Defaults to a :class:`tinder_api.transport.RequestsTransport`.
+
+    :param matcher: :class:`RequestMatcher` building the keys.
+    '''
+    def __init__(self, path, transport=None, matcher=None):
+        if transport is None:
+            from tinder_api.transport import RequestsTransport
+            transport = RequestsTransport()
+        self._transport = transport
+        self._matcher = matcher or RequestMatcher()
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+        self._index = {}
+        self._lock = threading.Lock()
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        '''
+        See :method:`tinder_api.transport.RequestsTransport.request`.
+
+        :return: :class:`CassetteResponse`
+        '''
+        response = self._transport.request(method, url, headers=headers, data=data)
+        return self._record(method, url, data, response)
+
+
+    def _record(self, method, url, data, response):
+        content = response.content
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in ('set-cookie', 'x-auth-token')}
+        body = _scrub_body(content)
+        key = self._matcher.key(method, url, data).encode('utf-8')
+        metadata = json.dumps({'status': response.status_code, 'headers': headers}).encode('utf-8')
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(_RECORD.pack(_RECORD.size - 4 + len(key) + len(metadata) + len(body), len(key), len(metadata)))
+            self._file.write(key)
+            self._file.write(metadata)
+            self._file.write(body)
+            self._index.setdefault(key.decode('utf-8'), []).append(offset)
+        # only the cassette is scrubbed, the client gets the real token
+        return CassetteResponse(response.status_code, response.headers, content)
+
+
+    def close(self):
+        '''
+        Writes the index, closes the cassette and the recorded transport.
+        '''
+        self._close_cassette()
+        self._transport.close()
+
+
+    def _close_cassette(self):
+        with self._lock:
+            if not self._file.closed:
+                index_offset = self._file.tell()
+                self._file.write(json.dumps(self._index, separators=(',', ':')).encode('utf-8'))
+                self._file.write(_FOOTER.pack(index_offset, INDEX_MAGIC))
+                self._file.close()
+
+
+def _scrub_body(content):
+    if not content or not any(field in content for field in _SECRET_FIELD_NAMES):
+        return content
+    try:
+        return json.dumps(scrub(json.loads(content))).encode('utf-8')
+    except ValueError:
+        return content
+
+
+class ReplayTransport(object):
+    '''
+    Serves the responses of a cassette, without any network.
+    The cassette is memory-mapped: only its index is loaded, bodies are read when accessed.
+
+    :param path: cassette written by :class:`RecordingTransport`.
+
+    :param matcher: :class:`RequestMatcher` building the keys, same as when recording.
+
+    :raises CassetteFormatError: the file is not a cassette.
+    '''
+    def __init__(self, path, matcher=None):
+        self._matcher = matcher or RequestMatcher()
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size < _HEADER.size or self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise CassetteFormatError('%s is not a cassette' % path)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        _, version = _HEADER.unpack_from(self._map, 0)
+        if version != FORMAT_VERSION:
+            raise CassetteFormatError('Unsupported cassette format version %d' % version)
+        self._index = self._read_index()
+        self._replayed = {}
+        self._lock = threading.Lock()
+
+
+    def _read_index(self):
+        size = len(self._map)
+        if size >= _HEADER.size + _FOOTER.size:
+            index_offset, magic = _FOOTER.unpack_from(self._map, size - _FOOTER.size)
+            if magic == INDEX_MAGIC:
+                return json.loads(bytes(self._view[index_offset:size - _FOOTER.size]))
+        # interrupted recording: the records are complete up to the last one
+        index = {}
+        offset = _HEADER.size
+        while offset + _RECORD.size <= size:
+            length, key_length, _ = _RECORD.unpack_from(self._map, offset)
+            if offset + 4 + length > size:
+                break
+            key = bytes(self._view[offset + _RECORD.size:offset + _RECORD.size + key_length]).decode('utf-8')
+            index.setdefault(key, []).append(offset)
+            offset += 4 + length
+        return index
+
+
+    def keys(self):
+        '''
+        :return: keys of the recorded requests.
+        '''
+        return self._index.keys()
+
+
+    def __len__(self):
+        return sum(len(offsets) for offsets in self._index.values())
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        '''
+        See :method:`tinder_api.transport.RequestsTransport.request`.
+
+        :return: :class:`CassetteResponse`
+
+        :raises CassetteMissError: the request was not recorded.
+        '''
+        key = self._matcher.key(method, url, data)
+        offsets = self._index.get(key)
+        if offsets is None:
+            raise CassetteMissError('Request not in the cassette: %s' % key)
+        with self._lock:
+            replayed = self._replayed.get(key, 0)
+            self._replayed[key] = replayed + 1
+        offset = offsets[min(replayed, len(offsets) - 1)]
+        length, key_length, metadata_length = _RECORD.unpack_from(self._map, offset)
+        metadata_start = offset + _RECORD.size + key_length
+        body_start = metadata_start + metadata_length
+        metadata = json.loads(bytes(self._view[metadata_start:body_start]))
+        return CassetteResponse(metadata['status'], metadata['headers'], self._view[body_start:offset + 4 + length])
+
+
+    def rewind(self):
+        '''
+        Replays every request from its first recorded response again.
+        '''
+        with self._lock:
+            self._replayed.clear()
+
+
+    def close(self):
+        self._file.close()
+        try:
+            self._view.release()
+            self._map.close()
+        except BufferError:
+            pass  # replayed responses still refer to the cassette, it is unmapped once they are garbage collected
+
+
+class AsyncRecordingTransport(RecordingTransport):
+    '''
+    :class:`RecordingTransport` for :class:`tinder_api.async_api.AsyncTinder_API`.
+
+    :param transport: asynchronous transport sending the requests. Defaults to a :class:`tinder_api.transport.AiohttpTransport`.
+    '''
+    def __init__(self, path, transport=None, matcher=None):
+        if transport is None:
+            from tinder_api.transport import AiohttpTransport
+            transport = AiohttpTransport()
+        super().__init__(path, transport, matcher)
+
+
+    async def request(self, method, url, headers=None, data=None, stream=False):
+        response = await self._transport.request(method, url, headers=headers, data=data)
+        return self._record(method, url, data, response)
+
+
+    async def close(self):
+        self._close_cassette()
+        await self._transport.close()
+
+
+class AsyncReplayTransport(ReplayTransport):
+    '''
+    :class:`ReplayTransport` for :class:`tinder_api.async_api.AsyncTinder_API`.
+    '''
+    async def request(self, method, url, headers=None, data=None, stream=False):
+        return super().request(method, url, headers=headers, data=data)
+
+
+    async def close(self):
+        super().close()
@@ -0,0 +1,369 @@
+# coding=utf-8
+'''
+JSON codecs used to encode request bodies and decode responses, the registry of
+the codec of each endpoint, and incremental decoding of large responses.
+'''
+
+import codecs
+import json
+import re
+import threading
+import warnings
+
+
+class JSONCodec(object):
+    '''
+    Standard library `json` codec.
+    '''
+    name = 'json'
+
+    def dumps(self, data):
+        return json.dumps(data)
+
+
+    def loads(self, content):
+        return json.loads(content)
+
+
+class OrjsonCodec(object):
+    '''
+    `orjson` codec, several times faster than the standard library. Requires `orjson`.
+
+    `dumps` returns `bytes`. Data `orjson` cannot encode, ex: non-string keys or integers over 64 bits,
+    is encoded with the standard library instead.
+    '''
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+
+    def dumps(self, data):
+        try:
+            return self._orjson.dumps(data)
+        except TypeError:
+            return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+    def loads(self, content):
+        return self._orjson.loads(content)
+
+
+CODECS = {'json': JSONCodec, 'orjson': OrjsonCodec}
+
+
+def get_codec(codec='auto'):
+    '''
+    :param codec: 'auto' (the fastest installed), a name from `CODECS`, or a codec object.
+
+    :return: a codec object, with `dumps(data)` and `loads(content)` methods.
+    '''
+    if not isinstance(codec, str):
+        return codec
+    if codec != 'auto':
+        return CODECS[codec]()
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JSONCodec()
+
+
+class CodecRegistry(object):
+    '''
+    Codec of each endpoint: the one registered for it, or else a :class:`tinder_api.protobuf_codec.ProtobufCodec`
+    if it declares `requestSchema` / `responseSchema` and their messages can be loaded, or else the default codec.
+
+    A codec may have a `headers` attribute, a `dict` of headers sent with the requests it encodes, ex: the content type.
+
+    :param default: codec of the other endpoints and of custom requests.
+
+    :param schema_path: directory of the compiled `<package>_pb2` modules, see :class:`tinder_api.protobuf_codec.SchemaLoader`.
+
+    :param protobuf: whether to use protobuf for the endpoints declaring schemas. When `protobuf`
+        or their compiled messages are missing, they use the default codec, with a warning.
+
+    :param as_dict: decode protobuf responses to `dict` instead of messages.
+    '''
+    def __init__(self, default, schema_path=None, protobuf=True, as_dict=False):
+        self.default = default
+        self._schema_path = schema_path
+        self._protobuf = protobuf
+        self._as_dict = as_dict
+        self._schema_loader = None
+        self._codecs = {}
+        self._lock = threading.Lock()
+
+
+    def register(self, endpoint_key, codec):
+        '''
+        Sets the codec of an endpoint.
+
+        :param endpoint_key: 'service.endpoint', ex: 'mediaservice.order'.
+
+        :param codec: object with `dumps(data)` and `loads(content)` methods.
+        '''
+        self._codecs[endpoint_key] = codec
+
+
+    def get(self, api_endpoint):
+        '''
+        :param api_endpoint: :class:`tinder_api.api_endpoints.Endpoint`, or `None` for custom requests.
+
+        :return: the codec of the endpoint.
+        '''
+        if api_endpoint is None:
+            return self.default
+        codec = self._codecs.get(api_endpoint.key)
+        if codec is None:
+            with self._lock:
+                codec = self._codecs.get(api_endpoint.key)
+                if codec is None:
+                    codec = self._codecs[api_endpoint.key] = self._make_codec(api_endpoint)
+        return codec
+
+
+    def _make_codec(self, api_endpoint):
+        if not self._protobuf or (api_endpoint.request_schema is None and api_endpoint.response_schema is None):
+            return self.default
+        try:
+            from tinder_api.protobuf_codec import ProtobufCodec, SchemaLoader
+            if self._schema_loader is None:
+                self._schema_loader = SchemaLoader(self._schema_path)
+            request_class = self._schema_loader.message_class(api_endpoint.request_schema) if api_endpoint.request_schema else None
+            response_class = self._schema_loader.message_class(api_endpoint.response_schema) if api_endpoint.response_schema else None
+        except ImportError as ex:
+            warnings.warn('%s uses %s instead of protobuf: %s' % (api_endpoint.key, self.default.name, ex))
+            return self.default
+        return ProtobufCodec(request_class, response_class, self.default, self._as_dict)
+
+
+# states of the frames of :class:`_ItemParser`
+_FIRST, _KEY, _COLON, _VALUE, _SEPARATOR, _ELEMENT = range(6)
+_MORE = object()
+_NUMBER_TAIL = re.compile(r'[.eE][-+0-9eE]*\Z')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _ItemParser(object):
+    '''
+    Resumable parser behind :func:`iter_json_items` and :func:`aiter_json_items`: it is fed the chunks of
+    a JSON object as they arrive, and returns the elements of the arrays named in `keys` parsed so far.
+    Values are decoded by the C decoder of `json`; only the objects and arrays leading to them are walked here.
+    '''
+    def __init__(self, keys, containers, compact_size=1 << 16):
+        self._keys = frozenset(keys)
+        self._containers = frozenset(containers)
+        self._compact_size = compact_size
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._text = ''
+        self._position = 0
+        self._pending = []  # decoded chunks not appended to the text yet
+        self._pending_size = 0
+        # characters needed before decoding again, so that a large value is re-parsed a few times only
+        self._wait_for = 0
+        self._eof = False
+        self._stack = None  # frames `[is_object, state, key]`, `None` before the opening brace
+        self.done = False
+
+
+    def feed(self, chunk):
+        '''
+        :param chunk: next `bytes` of the JSON object.
+
+        :return: `list` of the `(key, element)` completed by this chunk.
+        '''
+        piece = self._utf8.decode(chunk)
+        self._pending.append(piece)
+        self._pending_size += len(piece)
+        if len(self._text) - self._position + self._pending_size < self._wait_for:
+            return []
+        return self._parse()
+
+
+    def close(self):
+        '''
+        Parses what is left, once every chunk was fed.
+
+        :return: `list` of the last `(key, element)`.
+
+        :raises ValueError: if the JSON object is incomplete or invalid.
+        '''
+        self._pending.append(self._utf8.decode(b'', final=True))
+        self._eof = True
+        items = self._parse()
+        if not self.done:
+            raise ValueError('Invalid JSON: unexpected end at character %d.' % len(self._text))
+        return items
+
+
+    def _parse(self):
+        # drop what was already parsed, so that memory stays flat
+        if self._position > self._compact_size:
+            self._text = self._text[self._position:]
+            self._position = 0
+        if self._pending:
+            self._text += ''.join(self._pending)
+            self._pending = []
+            self._pending_size = 0
+        self._wait_for = 0
+        items = []
+        text = self._text
+        while not self.done:
+            position = self._position
+            while position < len(text) and text[position] in ' \t\r\n':
+                position += 1
+            self._position = position
+            if position == len(text):
+                return items
+            character = text[position]
+            if self._stack is None:
+                self._expect('{')
+                self._stack = [[True, _FIRST, None]]
+                continue
+            frame = self._stack[-1]
+            is_object, state = frame[0], frame[1]
+            if state == _FIRST:
+                if character == ('}' if is_object else ']'):
+                    self._position += 1
+                    self._pop()
+                else:
+                    frame[1] = _KEY if is_object else _ELEMENT
+            elif state == _SEPARATOR:
+                if self._expect(',}' if is_object else ',]') == ',':
+                    frame[1] = _KEY if is_object else _ELEMENT
+                else:
+                    self._pop()
+            elif state == _COLON:
+                self._expect(':')
+                frame[1] = _VALUE
+            elif state == _VALUE and frame[2] in self._keys and character == '[':
+                self._position += 1
+                frame[1] = _SEPARATOR
+                self._stack.append([False, _FIRST, frame[2]])
+            elif state == _VALUE and frame[2] in self._containers and character == '{':
+                self._position += 1
+                frame[1] = _SEPARATOR
+                self._stack.append([True, _FIRST, None])
+            elif state == _ELEMENT:
+                if not self._elements(frame, items):
+                    return items
+            else:
+                # a key, or a skipped value
+                value = self._decode()
+                if value is _MORE:
+                    return items
+                if state == _KEY:
+                    frame[2] = value
+                    frame[1] = _COLON
+                else:
+                    frame[1] = _SEPARATOR
+        return items
+
+
+    def _elements(self, frame, items):
+        '''
+        Parses the elements of an array up to its end, or to the end of the text. The hot loop of the parser.
+
+        :return: `False` if more text is needed.
+        '''
+        key = frame[2]
+        text = self._text
+        length = len(text)
+        while True:
+            value = self._decode()
+            if value is _MORE:
+                return False
+            items.append((key, value))
+            position = self._position
+            while position < length and text[position] in ' \t\r\n':
+                position += 1
+            if position == length or text[position] != ',':
+                # the end of the text, or of the array, left to :method:`_parse`
+                self._position = position
+                frame[1] = _SEPARATOR
+                return True
+            position += 1
+            while position < length and text[position] in ' \t\r\n':
+                position += 1
+            self._position = position
+
+
+    def _pop(self):
+        self._stack.pop()
+        if not self._stack:
+            self.done = True
+
+
+    def _expect(self, characters):
+        character = self._text[self._position]
+        if character not in characters:
+            raise ValueError('Invalid JSON: expected one of %r at character %d, got %r.' % (characters, self._position, character))
+        self._position += 1
+        return character
+
+
+    def _decode(self):
+        '''
+        :return: the next JSON value, or `_MORE` if it may continue in the next chunks.
+        '''
+        text = self._text
+        try:
+            value, end = self._decoder.raw_decode(text, self._position)
+            # a number at the end of the text, or before the start of its fraction or exponent, may continue in the next chunk
+            if self._eof or (end < len(text) and not (_NUMBER_TAIL.match(text, end) and _is_number(value))):
+                self._position = end
+                return value
+        except json.JSONDecodeError:
+            if self._eof:
+                raise
+        # wait for as much text again as is left to parse
+        self._wait_for = max(1, len(text) - self._position) * 2
+        return _MORE
+
+
+def iter_json_items(chunks, keys, containers=('data',)):
+    '''
+    Incrementally decodes a JSON object, yielding the elements of some of its arrays as soon as they are parsed.
+    Only one element is held in memory at a time, plus the other, skipped, values.
+
+    example: for key, match in iter_json_items(response.iter_content(65536), ('matches',)): ...
+
+    :param chunks: iterable of `bytes` making up a JSON object, ex: a streamed response body.
+
+    :param keys: names of the arrays whose elements are yielded, ex: ('matches', 'messages').
+
+    :param containers: names of nested objects in which arrays are also looked for.
+
+    :return: generator of `(key, element)`.
+    '''
+    parser = _ItemParser(keys, containers)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.close()
+
+
+async def aiter_json_items(chunks, keys, containers=('data',)):
+    '''
+    Asynchronous version of :func:`iter_json_items`.
+
+    example: async for key, match in aiter_json_items(response.aiter_content(65536), ('matches',)): ...
+
+    :param chunks: asynchronous iterable of `bytes` making up a JSON object.
+
+    :return: asynchronous generator of `(key, element)`.
+    '''
+    parser = _ItemParser(keys, containers)
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+        if parser.done:
+            return
+    for item in parser.close():
+        yield item
@@ -0,0 +1,122 @@
+# coding=utf-8
+'''
+Threading helpers used to overlap network round trips with processing.
+'''
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+_DONE = object()
+
+
+def prefetch(iterable, depth=1):
+    '''
+    Iterates over `iterable` in a background thread, staying at most `depth` items ahead of the caller.
+
+    Stopping early (`break`, `close()`) stops the background thread after the item it is producing.
+    Exceptions raised by `iterable` are re-raised to the caller.
+
+    :param iterable: iterable whose items are slow to produce, ex: pages fetched from the API.
+
+    :param depth: number of items produced ahead of the caller.
+
+    :return: generator over the items of `iterable`.
+    '''
+    items = queue.Queue()
+    # one slot per item produced and not taken by the caller yet, acquired before producing it
+    slots = threading.Semaphore(max(1, depth))
+    stopped = threading.Event()
+
+    def acquire_slot():
+        while not stopped.is_set():
+            if slots.acquire(timeout=0.1):
+                return True
+        return False
+
+    def produce():
+        try:
+            iterator = iter(iterable)
+            while acquire_slot():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    items.put((_DONE, None))
+                    return
+                items.put((item, None))
+        except BaseException as ex:
+            items.put((_DONE, ex))
+
+    producer = threading.Thread(target=produce, name='tinder_api-prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            slots.release()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def bounded_map(function, items, max_workers=8, ordered=True, executor=None):
+    '''
+    Calls `function` on every item on a pool of `max_workers` threads, with at most
+    twice as many calls submitted at once, so that long inputs don't pile up in memory.
+
+    Stopping early (`break`, `close()`) cancels the calls not started yet.
+    An exception raised by `function` is re-raised to the caller, when its result is reached.
+
+    :param function: function of one item, ex: making an API call.
+
+    :param items: iterable of items.
+
+    :param max_workers: maximum number of calls running at once.
+
+    :param ordered: yield the results in the order of `items`, otherwise as soon as each call completes.
+
+    :param executor: executor running the calls instead of a new thread pool, ex: a
+        :class:`concurrent.futures.ProcessPoolExecutor` of `max_workers` processes. It is not shut down.
+
+    :return: generator of `(index of the item, result)`.
+    '''
+    if executor is not None:
+        yield from _bounded_map(function, items, max_workers, ordered, executor)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tinder_api-fan-out') as executor:
+        yield from _bounded_map(function, items, max_workers, ordered, executor)
+
+
+def _bounded_map(function, items, max_workers, ordered, executor):
+    items = enumerate(items)
+    max_pending = 2 * max_workers
+    pending = deque() if ordered else {}
+
+    def submit(count):
+        for index, item in islice(items, count):
+            future = executor.submit(function, item)
+            if ordered:
+                pending.append((index, future))
+            else:
+                pending[future] = index
+
+    try:
+        submit(max_pending)
+        while pending:
+            if ordered:
+                index, future = pending.popleft()
+                yield index, future.result()
+                submit(1)
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+                submit(len(done))
+    finally:
+        for future in (pending if not ordered else [future for _, future in pending]):
+            future.cancel()
@@ -5,13 +5,17 @@ allows you to sort them by last_activity_date, age,
 gender, message count, and their average successRate.
 '''
 
-from datetime import date, datetime
+from datetime import date
 from random import random
 from time import sleep
 
+from tinder_api.sorting import sort_matches
+from tinder_api.timestamps import how_long_in_words_since_all, parse_timestamp, utc_now
+
 def format_matches(matches):
     '''
     Wrap API data to python object for manipulation by helpers.
+    See :func:`tinder_api.match_view.view_matches` to wrap it lazily, skipping malformed matches.
 
     :param matches: matches obtained from Tinder API.
 
@@ -47,16 +51,17 @@ def get_match_id_by_name(formatted_matches, name):
     '''
     Returns a list of IDs that have the same requested name.
 
-    :param formatted_matches: value from calling :method: `format_matches`.
+    :param formatted_matches: value from calling :method: `format_matches`,
+        or a :class: `tinder_api.match_index.MatchIndex` to avoid scanning every match.
 
     :param name: whose name to look for.
 
     :return: list of IDs that have the same requested name.
     '''
-    list_of_ids = []
-    for match in formatted_matches:
-        if formatted_matches[match]['name'] == name:
-            list_of_ids.append(formatted_matches[match]['match_id'])
+    if hasattr(formatted_matches, 'match_ids_by_name'):
+        list_of_ids = formatted_matches.match_ids_by_name(name)
+    else:
+        list_of_ids = [match['match_id'] for match in formatted_matches.values() if match['name'] == name]
     if len(list_of_ids) > 0:
         return list_of_ids
     return {'error': "No matches by name of %s" % name}
@@ -101,16 +106,21 @@ def distance_in_km(distance_mi):
     return round(ONE_MILE_IN_KM*distance_mi)
 
 
-def sort_by_value(formatted_matches, sort_type):
+def sort_by_value(formatted_matches, sort_type, limit=None):
     '''
-    Sorts matches by the type requested.
+    Sorts matches by the type requested, in descending order. Matches without a value come last.
+    See :module: `tinder_api.sorting` to sort on several fields, or keep matches sorted.
 
     :param formatted_matches: value from calling :method: `format_matches`.
 
     :param sort_type: the field to sort by. Possible values:
         name, match_id, message_count, bio, gender, messages, age, last_activity_date
+
+    :param limit: only return the first `limit` matches, ex: the 20 most recent ones.
+
+    :return: list of `(person_id, match)`.
     '''
-    return sorted(formatted_matches.items(), key=lambda x: x[1][sort_type], reverse=True)
+    return sort_matches(formatted_matches, [(sort_type, 'desc')], limit=limit)
 
 
 def how_long_in_words(duration, include_seconds=False):
@@ -137,11 +147,11 @@ def how_long_in_words_since(ping_time):
     '''
     How long since a person was seen on Tinder.
 
+    :param ping_time: timestamp, ex: '2017-07-09T10:28:13.392Z'
+
     :return: duration formatted as a `string`.
     '''
-    ping_time = ping_time[:len(ping_time) - 5]
-    datetime_ping = datetime.strptime(ping_time, '%Y-%m-%dT%H:%M:%S')
-    return how_long_in_words(datetime.utcnow() - datetime_ping)
+    return how_long_in_words(utc_now() - parse_timestamp(ping_time))
 
 
 def how_long_since_last_seen(match):
@@ -160,16 +170,19 @@ def how_long_since_last_seen_all(formatted_matches):
     :param formatted_matches: value from calling :method: `format_matches`.
 
     :return: :class: `dict` like `{match_id: {'person': {'id': id, 'name': name}, 'duration': duration}}`
+        `duration` is `None` for matches without a `last_activity_date`.
     '''
+    items = list(formatted_matches.items())
+    durations = how_long_in_words_since_all([match['last_activity_date'] for _, match in items])
     return {
-        match['_id']: {
+        match['match_id']: {
             'person': {
-                'id': match['person']['id'],
-                'name': match['person']['name']
+                'id': person_id,
+                'name': match['name']
             },
-            'duration': how_long_since_last_seen(match)
+            'duration': duration
         }
-    for match in formatted_matches }
+    for (person_id, match), duration in zip(items, durations) }
 
 
 def pause():
@@ -0,0 +1,277 @@
+# coding=utf-8
+'''
+Bulk ingestion of saved API responses: formats the matches of many `getUpdates` / `getMatches`
+snapshot files across a pool of processes, like :method:`helpers.format_matches` would.
+
+usage: python -m tinder_api.ingest snapshots/ --output matches.json
+       tinder-ingest updates-*.json.gz --workers 16 --snapshot matches.snapshot
+
+Files are read as they are parsed, never whole, and may be gzip compressed (`.gz`), and formatted in chunks of
+`chunk_size` matches. With at least as many files as workers, each file is read and formatted by one worker;
+with fewer, the files are read by the calling process and their chunks formatted by every worker, so that a single
+large file still uses every core. Results are merged in the order of the files and of their matches, and a person seen
+several times keeps the position of its first match and the values of its last, as with :method:`helpers.format_matches`
+over all the matches in a row. Malformed matches are skipped and reported.
+'''
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from tinder_api import helpers
+from tinder_api.codec import iter_json_items
+from tinder_api.concurrency import bounded_map
+from tinder_api.snapshot import write_snapshot
+
+READ_SIZE = 1 << 20
+
+SNAPSHOT_SUFFIXES = ('.json', '.json.gz')
+
+# top level array of the account data export, which has no person objects
+EXPORT_KEY = 'Messages'
+
+
+class Ingested(dict):
+    '''
+    `dict` of person ID -> formatted match, as returned by :func:`ingest`.
+
+    - `errors`: `list` of the matches and files skipped, as `{'path': ..., 'index': position in the file, 'error': ..., 'exception': ...}`.
+    - `stats`: `dict` of the 'files', 'matches' read, 'skipped', 'bytes' read and 'seconds' taken.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.errors = []
+        self.stats = {'files': 0, 'matches': 0, 'skipped': 0, 'bytes': 0, 'seconds': 0.0}
+
+
+def snapshot_paths(paths):
+    '''
+    :param paths: files, and directories whose `.json` / `.json.gz` files are taken, sorted by name.
+
+    :return: `list` of the snapshot files.
+    '''
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(SNAPSHOT_SUFFIXES)))
+        else:
+            found.append(path)
+    return found
+
+
+def _read_chunks(snapshot_file, counter):
+    while True:
+        chunk = snapshot_file.read(READ_SIZE)
+        if not chunk:
+            return
+        counter[0] += len(chunk)
+        yield chunk
+
+
+def format_chunk(matches):
+    '''
+    Formats matches like :method:`helpers.format_matches`, skipping the malformed ones instead of failing the chunk.
+
+    :param matches: raw matches.
+
+    :return: `tuple` of the `list` of `(person ID, formatted match)`, and the `list` of `(position, error)` of the skipped matches.
+    '''
+    formatted = helpers.format_matches(matches)
+    if 'error' not in formatted:
+        return list(formatted.items()), []
+    # one match is malformed, the chunk is formatted again match by match to skip only the bad ones
+    items, errors = [], []
+    for position, match in enumerate(matches):
+        formatted = helpers.format_matches([match])
+        if 'error' in formatted:
+            errors.append((position, formatted))
+        else:
+            items.extend(formatted.items())
+    return items, errors
+
+
+def read_file(path, chunk_size, result):
+    '''
+    Reads the matches of one snapshot file, in chunks.
+
+    :param path: `getUpdates` or `getMatches` response, or account data export.
+
+    :param chunk_size: matches per chunk.
+
+    :param result: `dict` to which the 'errors' reading the file are appended, and whose 'matches' and 'bytes' read
+        are counted, once the file is read.
+
+    :return: generator of `(index in the file of the first match of the chunk, raw matches)`.
+    '''
+    counter = [0]
+    exported = 0
+    try:
+        with (gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')) as snapshot_file:
+            elements = iter_json_items(_read_chunks(snapshot_file, counter), ('matches', EXPORT_KEY))
+            while True:
+                chunk = list(islice(elements, chunk_size))
+                if not chunk:
+                    break
+                matches = [element for key, element in chunk if key == 'matches']
+                exported += len(chunk) - len(matches)
+                yield result['matches'], matches
+                result['matches'] += len(matches)
+    except Exception as e:
+        result['errors'].append({'path': path, 'index': None, 'error': 'Something went wrong.', 'exception': str(e)})
+    if exported:
+        result['errors'].append({'path': path, 'index': None, 'error': 'Account data exports have no person objects.',
+                                 'exception': '%d conversations skipped' % exported})
+    result['bytes'] += counter[0]
+
+
+def format_file_chunk(path, index, matches):
+    '''
+    Formats one chunk of a snapshot file, see :func:`format_chunk`.
+
+    :param index: index in the file of the first match of the chunk.
+
+    :return: `dict` with the 'items' (`list` of `(person ID, formatted match)`) and the 'errors'.
+    '''
+    items, errors = format_chunk(matches)
+    return {
+        'items': items,
+        'errors': [{'path': path, 'index': index + position, 'error': error['error'], 'exception': str(error.get('exception'))}
+                   for position, error in errors],
+    }
+
+
+def ingest_file(path, chunk_size=1000):
+    '''
+    Formats the matches of one snapshot file. Runs in the worker processes of :func:`ingest`.
+
+    :param path: `getUpdates` or `getMatches` response, or account data export.
+
+    :param chunk_size: matches formatted at once.
+
+    :return: `dict` with the 'items' (`list` of `(person ID, formatted match)`), 'errors', 'matches' read and 'bytes' read.
+    '''
+    result = {'items': [], 'errors': [], 'matches': 0, 'bytes': 0}
+    for index, matches in read_file(path, chunk_size, result):
+        formatted = format_file_chunk(path, index, matches)
+        result['items'].extend(formatted['items'])
+        result['errors'].extend(formatted['errors'])
+    return result
+
+
+def _format_task(task):
+    # runs in the worker processes: a chunk to format, or the end of a file, passed through to keep the order
+    path, index, payload = task
+    if index is None:
+        return True, payload
+    return False, dict(format_file_chunk(path, index, payload), matches=0, bytes=0)
+
+
+def _file_results(paths, chunk_size, max_workers, executor):
+    '''
+    :return: generator of `(whether a file is done, result)`: each file is formatted by one worker.
+    '''
+    for _, result in bounded_map(partial(ingest_file, chunk_size=chunk_size), paths, max_workers, executor=executor):
+        yield True, result
+
+
+def _chunk_results(paths, chunk_size, max_workers, executor):
+    '''
+    :return: generator of `(whether a file is done, result)`: files are read here, their chunks formatted by every worker.
+    '''
+    def tasks():
+        for path in paths:
+            result = {'items': [], 'errors': [], 'matches': 0, 'bytes': 0}
+            for index, matches in read_file(path, chunk_size, result):
+                yield path, index, matches
+            yield path, None, result
+
+    for _, result in bounded_map(_format_task, tasks(), max_workers, executor=executor):
+        yield result
+
+
+def ingest(paths, max_workers=None, chunk_size=1000, progress=None):
+    '''
+    Formats the matches of many snapshot files across a pool of processes.
+
+    example: matches = ingest(['2020-05/', '2020-06/'], progress=print)
+             helpers.sort_by_value(matches, 'last_activity_date', limit=20)
+
+    :param paths: snapshot files, or directories of them. See :func:`snapshot_paths`.
+
+    :param max_workers: number of processes. Defaults to the number of CPUs.
+
+    :param chunk_size: matches formatted at once by a worker.
+
+    :param progress: function called after each file with a `dict` of the 'files' done, 'files_total',
+        'matches' read, 'skipped', 'bytes' read, 'seconds' elapsed and 'matches_per_second'.
+
+    :return: :class:`Ingested`
+    '''
+    paths = snapshot_paths(paths)
+    max_workers = max_workers or os.cpu_count() or 1
+    ingested = Ingested()
+    stats = ingested.stats
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = _file_results if len(paths) >= max_workers else _chunk_results
+        for file_done, result in results(paths, chunk_size, max_workers, executor):
+            # same as `dict.update` on every formatted match: first position, last values
+            ingested.update(result['items'])
+            ingested.errors.extend(result['errors'])
+            stats['matches'] += result['matches']
+            stats['skipped'] += sum(1 for error in result['errors'] if error['index'] is not None)
+            stats['bytes'] += result['bytes']
+            if not file_done:
+                continue
+            stats['files'] += 1
+            stats['seconds'] = time.perf_counter() - start
+            if progress is not None:
+                progress(dict(stats, files_total=len(paths), matches_per_second=stats['matches'] / stats['seconds'] if stats['seconds'] else 0.0))
+    stats['seconds'] = time.perf_counter() - start
+    return ingested
+
+
+def _print_progress(stats):
+    print('%d/%d files, %d matches, %d skipped, %.1f MB, %.0f matches/s' % (
+        stats['files'], stats['files_total'], stats['matches'], stats['skipped'], stats['bytes'] / 1e6, stats['matches_per_second']), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='tinder-ingest', description='Formats the matches of saved getUpdates / getMatches responses.')
+    parser.add_argument('paths', nargs='+', help='snapshot files (.json, .json.gz), or directories of them')
+    parser.add_argument('--output', help='file where the formatted matches are written as JSON, defaults to stdout')
+    parser.add_argument('--snapshot', help='file where the formatted matches are written as a snapshot, see tinder_api.snapshot')
+    parser.add_argument('--errors', help='file where the skipped matches are written as JSON')
+    parser.add_argument('--workers', type=int, help='number of processes, defaults to the number of CPUs')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='matches formatted at once by a worker')
+    parser.add_argument('--quiet', action='store_true', help='do not report progress')
+    args = parser.parse_args(argv)
+
+    ingested = ingest(args.paths, args.workers, args.chunk_size, progress=None if args.quiet else _print_progress)
+    if args.snapshot:
+        write_snapshot(ingested, args.snapshot)
+    if args.output or not args.snapshot:
+        output = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            json.dump(ingested, output)
+            output.write('\n')
+        finally:
+            if args.output:
+                output.close()
+    if args.errors:
+        with open(args.errors, 'w') as errors_file:
+            json.dump(ingested.errors, errors_file)
+    stats = ingested.stats
+    print('%d files, %d matches, %d persons, %d skipped in %.1f s' % (
+        stats['files'], stats['matches'], len(ingested), stats['skipped'], stats['seconds']), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+# coding=utf-8
+'''
+In-memory index over formatted matches, so that lookups by name, gender,
+age and activity date don't have to scan every match.
+'''
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from collections.abc import Mapping
+
+from tinder_api import helpers
+from tinder_api.sorting import SortedMatchView
+
+
+def _merge_messages(messages, new_messages):
+    '''
+    :return: `list` of `messages` followed by those of `new_messages` not already in it, compared by `_id`.
+    '''
+    messages = list(messages or [])
+    known = {message.get('_id') for message in messages}
+    messages.extend(message for message in new_messages or [] if message.get('_id') is None or message.get('_id') not in known)
+    return messages
+
+
+class MatchIndex(Mapping):
+    '''
+    Formatted matches indexed by name (exact and case-folded), gender, age and last activity date.
+
+    Behaves like the `dict` returned by :method:`helpers.format_matches` (person ID -> formatted match),
+    so it can be passed to the other helpers.
+
+    example: index = MatchIndex(helpers.format_matches(tinder_api.iter_matches()))
+             index.filter(gender=1, min_age=25, max_age=30, active_since='2020-05-01')
+
+    :param formatted_matches: value from calling :method:`helpers.format_matches`.
+
+    :param age_bucket_size: number of years grouped in one bucket of the age index.
+    '''
+    def __init__(self, formatted_matches=None, age_bucket_size=5):
+        self._age_bucket_size = age_bucket_size
+        self._matches = {}
+        self._person_id_by_match_id = {}
+        self._by_name = defaultdict(set)
+        self._by_folded_name = defaultdict(set)
+        self._by_gender = defaultdict(set)
+        self._by_age_bucket = defaultdict(set)
+        self._by_activity = []  # sorted (last_activity_date, person_id)
+        self._views = []
+        if formatted_matches:
+            for person_id, match in formatted_matches.items():
+                self.upsert(person_id, match)
+
+
+    # MAPPING
+
+    def __getitem__(self, person_id):
+        return self._matches[person_id]
+
+
+    def __iter__(self):
+        return iter(self._matches)
+
+
+    def __len__(self):
+        return len(self._matches)
+
+
+    def __contains__(self, person_id):
+        return person_id in self._matches
+
+
+    # UPDATES
+
+    def upsert(self, person_id, match):
+        '''
+        Inserts a match, or replaces it if the person is already indexed.
+
+        :param person_id: key of the match in :method:`helpers.format_matches`.
+
+        :param match: formatted match.
+        '''
+        if person_id in self._matches:
+            self._unindex(person_id, self._matches[person_id])
+        self._matches[person_id] = match
+        self._index(person_id, match)
+        for view in self._views:
+            view.upsert(person_id, match)
+
+    insert = update = upsert
+
+
+    def delete(self, person_id):
+        '''
+        Removes a match. Does nothing if the person is not indexed.
+
+        :param person_id: key of the match in :method:`helpers.format_matches`.
+        '''
+        match = self._matches.pop(person_id, None)
+        if match is not None:
+            self._unindex(person_id, match)
+            for view in self._views:
+                view.delete(person_id)
+
+
+    def sorted_view(self, keys, nones='last'):
+        '''
+        Creates a :class:`tinder_api.sorting.SortedMatchView` of the indexed matches,
+        kept up to date as matches are inserted, updated and deleted.
+
+        example: most_active = index.sorted_view('last_activity_date')
+                 most_active.top(20)
+
+        :param keys: field name, or list of field names and `(field, 'asc' | 'desc')` pairs.
+
+        :param nones: 'last' or 'first', where to put matches whose field is `None`.
+        '''
+        view = SortedMatchView(self._matches, keys, nones)
+        self._views.append(view)
+        return view
+
+
+    def delete_match(self, match_id):
+        '''
+        Removes a match by match ID, ex: after an unmatch.
+
+        :param match_id: ID of the match.
+        '''
+        person_id = self._person_id_by_match_id.get(match_id)
+        if person_id is not None:
+            self.delete(person_id)
+
+
+    def apply_updates(self, updates):
+        '''
+        Applies the response of :method:`Tinder_API.get_updates`.
+
+        Matches with a `person` are inserted or replaced; as the `messages` of an update are only the new ones,
+        they are appended to those of the already indexed match. Matches without a `person`
+        only update the messages and activity date of the already indexed match.
+        Matches listed in `blocks` are removed.
+
+        :param updates: value from calling :method:`Tinder_API.get_updates`.
+        '''
+        for raw_match in updates.get('matches', []):
+            if raw_match.get('person') is not None:
+                formatted = helpers.format_matches([raw_match])
+                if 'error' not in formatted:
+                    for person_id, match in formatted.items():
+                        previous = self._matches.get(person_id)
+                        if previous is not None and previous.get('match_id') == match.get('match_id'):
+                            match['messages'] = _merge_messages(previous.get('messages'), match.get('messages'))
+                            if match.get('message_count') is None:
+                                match['message_count'] = len(match['messages'])
+                        self.upsert(person_id, match)
+                continue
+            person_id = self._person_id_by_match_id.get(raw_match.get('_id'))
+            if person_id is None:
+                continue
+            match = dict(self._matches[person_id])
+            if raw_match.get('messages'):
+                match['messages'] = _merge_messages(match.get('messages'), raw_match['messages'])
+                match['message_count'] = len(match['messages'])
+            if raw_match.get('last_activity_date'):
+                match['last_activity_date'] = raw_match['last_activity_date']
+            self.upsert(person_id, match)
+        for match_id in updates.get('blocks', []):
+            self.delete_match(match_id)
+
+
+    def _age_bucket(self, age):
+        return age // self._age_bucket_size
+
+
+    def _index(self, person_id, match):
+        if match.get('match_id') is not None:
+            self._person_id_by_match_id[match['match_id']] = person_id
+        name = match.get('name')
+        if name is not None:
+            self._by_name[name].add(person_id)
+            self._by_folded_name[name.casefold()].add(person_id)
+        self._by_gender[match.get('gender')].add(person_id)
+        if match.get('age') is not None:
+            self._by_age_bucket[self._age_bucket(match['age'])].add(person_id)
+        if match.get('last_activity_date') is not None:
+            insort(self._by_activity, (match['last_activity_date'], person_id))
+
+
+    def _unindex(self, person_id, match):
+        if self._person_id_by_match_id.get(match.get('match_id')) == person_id:
+            del self._person_id_by_match_id[match['match_id']]
+        name = match.get('name')
+        if name is not None:
+            _discard(self._by_name, name, person_id)
+            _discard(self._by_folded_name, name.casefold(), person_id)
+        _discard(self._by_gender, match.get('gender'), person_id)
+        if match.get('age') is not None:
+            _discard(self._by_age_bucket, self._age_bucket(match['age']), person_id)
+        if match.get('last_activity_date') is not None:
+            entry = (match['last_activity_date'], person_id)
+            position = bisect_left(self._by_activity, entry)
+            if position < len(self._by_activity) and self._by_activity[position] == entry:
+                del self._by_activity[position]
+
+
+    # LOOKUPS
+
+    def get_by_match_id(self, match_id):
+        '''
+        :param match_id: ID of the match.
+
+        :return: the formatted match, or `None`.
+        '''
+        person_id = self._person_id_by_match_id.get(match_id)
+        return None if person_id is None else self._matches[person_id]
+
+
+    def by_name(self, name, ignore_case=False):
+        '''
+        :param name: name to look for.
+
+        :param ignore_case: compare case-folded names.
+
+        :return: `set` of person IDs.
+        '''
+        if ignore_case:
+            return set(self._by_folded_name.get(name.casefold(), ()))
+        return set(self._by_name.get(name, ()))
+
+
+    def match_ids_by_name(self, name, ignore_case=False):
+        '''
+        :param name: name to look for.
+
+        :param ignore_case: compare case-folded names.
+
+        :return: `list` of match IDs.
+        '''
+        return [self._matches[person_id]['match_id'] for person_id in self.by_name(name, ignore_case)]
+
+
+    def by_gender(self, gender):
+        '''
+        :param gender: 0 == male, 1 == female.
+
+        :return: `set` of person IDs.
+        '''
+        return set(self._by_gender.get(gender, ()))
+
+
+    def by_age(self, min_age=None, max_age=None):
+        '''
+        :param min_age: minimum age, inclusive.
+
+        :param max_age: maximum age, inclusive.
+
+        :return: `set` of person IDs.
+        '''
+        buckets = self._by_age_bucket.keys()
+        first = min(buckets, default=0) if min_age is None else self._age_bucket(min_age)
+        last = max(buckets, default=0) if max_age is None else self._age_bucket(max_age)
+        person_ids = set()
+        for bucket in range(first, last + 1):
+            for person_id in self._by_age_bucket.get(bucket, ()):
+                age = self._matches[person_id]['age']
+                if (min_age is None or age >= min_age) and (max_age is None or age <= max_age):
+                    person_ids.add(person_id)
+        return person_ids
+
+
+    def active_between(self, since=None, until=None):
+        '''
+        Matches whose last activity date is within the given range.
+
+        :param since: earliest activity date, inclusive. ex: '2020-05-01' or '2020-05-01T10:28:13.392Z'
+
+        :param until: latest activity date, exclusive.
+
+        :return: `list` of person IDs, from least to most recently active.
+        '''
+        start = 0 if since is None else bisect_left(self._by_activity, (since,))
+        end = len(self._by_activity) if until is None else bisect_left(self._by_activity, (until,))
+        return [person_id for _, person_id in self._by_activity[start:end]]
+
+
+    def filter(self, name=None, ignore_case=False, gender=None, min_age=None, max_age=None, active_since=None, active_until=None):
+        '''
+        Matches satisfying every given criteria.
+
+        :return: `set` of person IDs.
+        '''
+        candidates = []
+        if name is not None:
+            candidates.append(self.by_name(name, ignore_case))
+        if gender is not None:
+            candidates.append(self.by_gender(gender))
+        if min_age is not None or max_age is not None:
+            candidates.append(self.by_age(min_age, max_age))
+        if active_since is not None or active_until is not None:
+            candidates.append(set(self.active_between(active_since, active_until)))
+        if not candidates:
+            return set(self._matches)
+        candidates.sort(key=len)
+        return candidates[0].intersection(*candidates[1:])
+
+
+def _discard(index, key, person_id):
+    person_ids = index.get(key)
+    if person_ids is not None:
+        person_ids.discard(person_id)
+        if not person_ids:
+            del index[key]
@@ -0,0 +1,252 @@
+# coding=utf-8
+'''
+Columnar, NumPy-backed alternative to :method:`helpers.format_matches`.
+
+Each field of the matches is stored as one array, so ages, distances and
+activity durations are computed for every match at once instead of row by row.
+Requires `numpy` (`pip install tinder_api[table]`). Exporting requires `pandas` or `pyarrow`.
+'''
+
+import sys
+from datetime import date
+
+import numpy as np
+
+from tinder_api.helpers import get_photos
+
+ONE_MILE_IN_KM = 1.60934
+
+# column -> value where Tinder did not send it, the smallest of the dtype: -1 is a valid gender
+MISSING = {
+    'gender': np.iinfo(np.int8).min,
+    'age': np.iinfo(np.int16).min,
+    'message_count': np.iinfo(np.int32).min,
+}
+
+# column name -> dtype, in export order
+COLUMNS = (
+    ('person_id', object),
+    ('match_id', object),
+    ('name', object),
+    ('gender', np.int8),
+    ('birth_date', 'datetime64[D]'),
+    ('age', np.int16),
+    ('distance_mi', np.float64),
+    ('distance_km', np.float64),
+    ('message_count', np.int32),
+    ('last_activity_date', 'datetime64[ms]'),
+    ('bio', object),
+    ('photos', object),
+    ('messages', object),
+)
+
+
+def _strip_timezone(timestamp):
+    # numpy parses ISO 8601 but warns on the trailing 'Z' of Tinder timestamps
+    if not timestamp:
+        return 'NaT'
+    return timestamp[:-1] if timestamp.endswith('Z') else timestamp
+
+
+def _object_array(values):
+    # np.array() would turn a list of lists into a 2D array
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def ages_at(birth_dates, today=None):
+    '''
+    Vectorized :method:`helpers.calculate_age`.
+
+    :param birth_dates: `datetime64[D]` array.
+
+    :param today: `datetime.date` to compute the ages at. Defaults to today.
+
+    :return: `int16` array of ages, `MISSING['age']` where the birth date is unknown.
+    '''
+    today = np.datetime64(today or date.today(), 'D')
+    months = birth_dates.astype('datetime64[M]')
+    birth_years = birth_dates.astype('datetime64[Y]').astype(np.int64)
+    birth_month_days = (months.astype(np.int64) % 12) * 32 + (birth_dates - months).astype(np.int64)
+    today_month = today.astype('datetime64[M]')
+    today_month_day = (today_month.astype(np.int64) % 12) * 32 + (today - today_month).astype(np.int64)
+    ages = today.astype('datetime64[Y]').astype(np.int64) - birth_years - (today_month_day < birth_month_days)
+    return np.where(np.isnat(birth_dates), MISSING['age'], ages).astype(np.int16)
+
+
+def _optional_int(value, column):
+    value = int(value)
+    return None if value == MISSING[column] else value
+
+
+def distances_in_km(distances_mi):
+    '''
+    Vectorized :method:`helpers.distance_in_km`.
+
+    :param distances_mi: array of distances in miles.
+
+    :return: `float64` array of distances in km, rounded. NaN where unknown.
+    '''
+    return np.rint(ONE_MILE_IN_KM * np.asarray(distances_mi, dtype=np.float64))
+
+
+class MatchTable(object):
+    '''
+    Matches stored column by column. Integer columns hold `MISSING[column]` where a value is `None`.
+
+    example: table = MatchTable.from_matches(tinder_api.iter_matches())
+             table.to_pandas()
+
+    :param columns: `dict` of column name -> array, all of the same length. See `COLUMNS`.
+    '''
+    def __init__(self, columns):
+        self._columns = columns
+
+
+    @classmethod
+    def from_matches(cls, matches, today=None):
+        '''
+        Builds the table in a single pass over the matches.
+
+        :param matches: matches obtained from Tinder API, or any iterable of them.
+
+        :param today: `datetime.date` to compute the ages at. Defaults to today.
+
+        :return: :class:`MatchTable`
+        '''
+        intern = sys.intern
+        person_ids, match_ids, names, genders, birth_dates, distances = [], [], [], [], [], []
+        message_counts, last_activity_dates, bios, photos, messages = [], [], [], [], []
+        for match in matches:
+            person = match.get('person') or {}
+            person_ids.append(person.get('_id'))
+            match_ids.append(match.get('_id'))
+            name = person.get('name')
+            names.append(intern(name) if name is not None else None)
+            gender = person.get('gender')
+            genders.append(MISSING['gender'] if gender is None else gender)
+            birth_dates.append((person.get('birth_date') or 'NaT')[:10])
+            distance = person.get('distance_mi')
+            distances.append(np.nan if distance is None else distance)
+            message_count = match.get('message_count')
+            message_counts.append(MISSING['message_count'] if message_count is None else message_count)
+            last_activity_dates.append(_strip_timezone(match.get('last_activity_date')))
+            bios.append(person.get('bio'))
+            photos.append(get_photos(person))
+            messages.append(match.get('messages'))
+
+        birth_dates = np.array(birth_dates, dtype='datetime64[D]')
+        distances = np.array(distances, dtype=np.float64)
+        return cls({
+            'person_id': _object_array(person_ids),
+            'match_id': _object_array(match_ids),
+            'name': _object_array(names),
+            'gender': np.array(genders, dtype=np.int8),
+            'birth_date': birth_dates,
+            'age': ages_at(birth_dates, today),
+            'distance_mi': distances,
+            'distance_km': distances_in_km(distances),
+            'message_count': np.array(message_counts, dtype=np.int32),
+            'last_activity_date': np.array(last_activity_dates, dtype='datetime64[ms]'),
+            'bio': _object_array(bios),
+            'photos': _object_array(photos),
+            'messages': _object_array(messages),
+        })
+
+
+    def __len__(self):
+        return len(self._columns['person_id'])
+
+
+    def __getitem__(self, column):
+        '''
+        :param column: column name, see `COLUMNS`.
+
+        :return: the column array (not a copy).
+        '''
+        return self._columns[column]
+
+
+    @property
+    def columns(self):
+        return [name for name, _ in COLUMNS]
+
+
+    def recompute_ages(self, today=None):
+        '''
+        Recomputes the `age` column, ex: for a long-lived table.
+
+        :param today: `datetime.date` to compute the ages at. Defaults to today.
+        '''
+        self._columns['age'] = ages_at(self._columns['birth_date'], today)
+
+
+    def time_since_activity(self, now=None):
+        '''
+        Time elapsed since each match's last activity.
+
+        :param now: `numpy.datetime64` or `datetime.datetime` (UTC). Defaults to now.
+
+        :return: `timedelta64[ms]` array, NaT where the activity date is unknown.
+        '''
+        now = np.datetime64('now', 'ms') if now is None else np.datetime64(now, 'ms')
+        return now - self._columns['last_activity_date']
+
+
+    def select(self, mask):
+        '''
+        Rows where `mask` is true, ex: `table.select(table['age'] < 30)`.
+
+        :param mask: boolean array, or array of row indices.
+
+        :return: :class:`MatchTable`
+        '''
+        return MatchTable({name: column[mask] for name, column in self._columns.items()})
+
+
+    def row(self, index):
+        '''
+        :return: `dict` of column name -> value for one match.
+        '''
+        return {name: column[index] for name, column in self._columns.items()}
+
+
+    def to_formatted_matches(self):
+        '''
+        Converts back to the `dict` returned by :method:`helpers.format_matches`,
+        for use with the other helpers. `MISSING` values are converted back to `None`.
+        '''
+        columns = self._columns
+        last_activity_dates = np.datetime_as_string(columns['last_activity_date'], unit='ms')
+        return {
+            person_id: {
+                'match_id': columns['match_id'][i],
+                'message_count': _optional_int(columns['message_count'][i], 'message_count'),
+                'messages': columns['messages'][i],
+                'last_activity_date': None if last_activity_dates[i] == 'NaT' else last_activity_dates[i] + 'Z',
+                'name': columns['name'][i],
+                'photos': columns['photos'][i],
+                'bio': columns['bio'][i],
+                'gender': _optional_int(columns['gender'][i], 'gender'),
+                'age': _optional_int(columns['age'][i], 'age'),
+            }
+            for i, person_id in enumerate(columns['person_id'])
+        }
+
+
+    def to_pandas(self):
+        '''
+        Exports to a :class:`pandas.DataFrame`. Numeric and date columns share memory with the table.
+        '''
+        import pandas
+        return pandas.DataFrame(self._columns, columns=self.columns, copy=False)
+
+
+    def to_arrow(self):
+        '''
+        Exports to a :class:`pyarrow.Table`. Numeric and date columns share memory with the table.
+        `photos` and `messages` are not exported, Arrow needs a schema for nested values.
+        '''
+        import pyarrow
+        return pyarrow.table({name: pyarrow.array(self._columns[name]) for name in self.columns if name not in ('photos', 'messages')})
@@ -0,0 +1,164 @@
+# coding=utf-8
+'''
+Lazy views over raw matches, an alternative to :method:`helpers.format_matches` which copies
+every field of every match up front.
+
+A :class:`MatchView` reads its fields from the decoded API payload when they are accessed,
+and computes the derived ones (`age`, `photos`) once, on first access.
+Views behave like the `dict` values of :method:`helpers.format_matches`, with the same keys, so they can be passed to the helpers.
+'''
+
+from collections.abc import Mapping
+
+from tinder_api import helpers
+
+FIELDS = ('match_id', 'message_count', 'messages', 'last_activity_date', 'name', 'photos', 'bio', 'gender', 'age')
+
+_UNSET = object()
+
+
+def _age(person):
+    birth_date = person.get('birth_date')
+    try:
+        return None if birth_date is None else helpers.calculate_age(birth_date)
+    except (TypeError, ValueError):
+        return None
+
+
+def _distance(person):
+    distance_mi = person.get('distance_mi')
+    return None if distance_mi is None else helpers.distance_in_km(distance_mi)
+
+
+class MatchView(Mapping):
+    '''
+    Read-only, dict-like view of a raw match, with the keys of :method:`helpers.format_matches`.
+
+    Fields are read from the raw match on every access, without copying it.
+    `age` (`None` if the birth date is missing or malformed) and `photos` are computed on first access and memoized.
+    The `distance` attribute (km, `None` if unknown) is not one of the keys, as :method:`helpers.format_matches` has no such field.
+
+    :param match: raw match, with a `person`.
+    '''
+    __slots__ = ('_match', '_person', '_age', '_photos', '_distance')
+
+    def __init__(self, match):
+        self._match = match
+        self._person = match['person']
+        self._age = self._photos = self._distance = _UNSET
+
+
+    @property
+    def raw(self):
+        '''
+        The raw match.
+        '''
+        return self._match
+
+
+    @property
+    def person_id(self):
+        return self._person.get('_id')
+
+
+    @property
+    def age(self):
+        if self._age is _UNSET:
+            self._age = _age(self._person)
+        return self._age
+
+
+    @property
+    def photos(self):
+        if self._photos is _UNSET:
+            self._photos = helpers.get_photos(self._person)
+        return self._photos
+
+
+    @property
+    def distance(self):
+        if self._distance is _UNSET:
+            self._distance = _distance(self._person)
+        return self._distance
+
+
+    def __getitem__(self, key):
+        getter = _GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        return getter(self)
+
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+
+    def __len__(self):
+        return len(FIELDS)
+
+
+    def __contains__(self, key):
+        return key in _GETTERS
+
+
+    def copy(self):
+        '''
+        :return: `dict` of every field, as returned by :method:`helpers.format_matches`.
+        '''
+        return {key: self[key] for key in FIELDS}
+
+
+    def __repr__(self):
+        return 'MatchView(%r)' % self.copy()
+
+
+_GETTERS = {
+    'match_id': lambda view: view._match.get('_id'),
+    'message_count': lambda view: view._match.get('message_count'),
+    'messages': lambda view: view._match.get('messages'),
+    'last_activity_date': lambda view: view._match.get('last_activity_date'),
+    'name': lambda view: view._person.get('name'),
+    'photos': lambda view: view.photos,
+    'bio': lambda view: view._person.get('bio'),
+    'gender': lambda view: view._person.get('gender'),
+    'age': lambda view: view.age,
+}
+
+
+class MatchViews(dict):
+    '''
+    `dict` of person ID -> :class:`MatchView`, as returned by :func:`view_matches`.
+
+    `errors` lists the matches skipped because they are malformed, each as
+    `{'error': ..., 'exception': ..., 'index': position in the input, 'match_id': ID if known}`.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.errors = []
+
+
+def view_matches(matches):
+    '''
+    Lazy version of :method:`helpers.format_matches`: wraps each raw match in a :class:`MatchView`
+    instead of copying its fields. A malformed match is skipped and reported in `errors`,
+    the others are still returned.
+
+    example: matches = view_matches(tinder_api.iter_matches())
+             helpers.get_match_id_by_name(matches, 'Alex')
+
+    :param matches: matches obtained from Tinder API.
+
+    :return: :class:`MatchViews`
+    '''
+    views = MatchViews()
+    for index, match in enumerate(matches):
+        try:
+            view = MatchView(match)
+            person_id = view.person_id
+            if person_id is None:
+                raise KeyError('_id')
+            views[person_id] = view
+        except Exception as ex:
+            match_id = match.get('_id') if isinstance(match, Mapping) else None
+            views.errors.append({'error': 'Malformed match.', 'exception': '%s: %s' % (type(ex).__name__, ex), 'index': index, 'match_id': match_id})
+    return views
@@ -0,0 +1,473 @@
+# coding=utf-8
+'''
+Experimental: uploads of your own profile media through the `mediaservice` endpoints, with :class:`MediaUploader`.
+
+Only the paths and schema names of these endpoints are known (see `api_endpoints.json`), not the fields of their
+messages nor how `photo` answers. The upload protocol below is an assumption following the usual resumable upload
+conventions, so this module is not part of :class:`tinder_api.api.Tinder_API`, and may change or go away:
+
+- `placeholders` is sent `{'count': n}` and answers the IDs of the new media in `media_id`.
+- each chunk is POSTed to `photo?media_id=...` with a `Content-Range: bytes first-last/total` header.
+  The server answers `308` with a `Range: bytes=0-last` header while the upload is incomplete, `200` or `201` once complete.
+- an empty POST with `Content-Range: bytes */total` asks how many bytes already arrived, to resume an upload.
+- `order` is sent `{'media_id': [...]}`, the media IDs in profile order.
+
+Files are streamed from disk in blocks, never loaded whole in memory, and sent in chunks of `chunk_size` bytes.
+Progress is kept in an :class:`UploadJournal`, so that an interrupted upload resumes where it stopped.
+'''
+
+import asyncio
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from tinder_api.api import PreparedRequest
+from tinder_api.concurrency import bounded_map
+
+# bytes read from disk at once
+BLOCK_SIZE = 1 << 16
+
+DEFAULT_CHUNK_SIZE = 8 << 20
+
+# statuses of the upload requests
+UPLOAD_INCOMPLETE = 308
+UPLOAD_COMPLETE = (200, 201)
+
+_RANGE_RE = re.compile(r'bytes=(\d+)-(\d+)')
+
+
+class FileSlice(object):
+    '''
+    Request body streaming `length` bytes of a file from `offset`, in blocks of `block_size` bytes.
+    It can be iterated over several times, ex: when the request is retried.
+    '''
+    __slots__ = ('path', 'offset', 'length', 'block_size')
+
+    def __init__(self, path, offset, length, block_size=BLOCK_SIZE):
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.block_size = block_size
+
+
+    def __len__(self):
+        return self.length
+
+
+    def __iter__(self):
+        with open(self.path, 'rb') as media_file:
+            media_file.seek(self.offset)
+            left = self.length
+            while left > 0:
+                block = media_file.read(min(self.block_size, left))
+                if not block:
+                    raise IOError('%s is shorter than expected' % self.path)
+                left -= len(block)
+                yield block
+
+
+class AsyncFileSlice(FileSlice):
+    '''
+    Asynchronous version of :class:`FileSlice`, for the asynchronous transports.
+    Blocks are read in the default executor, so that disk reads do not block the event loop.
+    '''
+    __slots__ = ()
+
+    # only asynchronously iterable, so that transports accepting both stream it asynchronously
+    __iter__ = None
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        media_file = await loop.run_in_executor(None, open, self.path, 'rb')
+        try:
+            await loop.run_in_executor(None, media_file.seek, self.offset)
+            left = self.length
+            while left > 0:
+                block = await loop.run_in_executor(None, media_file.read, min(self.block_size, left))
+                if not block:
+                    raise IOError('%s is shorter than expected' % self.path)
+                left -= len(block)
+                yield block
+        finally:
+            media_file.close()
+
+
+class UploadJournal(object):
+    '''
+    Progress of an upload, saved to a JSON file after every chunk so that it can be resumed after a failure.
+    Thread-safe.
+
+    For each file: its size and modification time when the upload started, its media ID,
+    the bytes the server confirmed, whether a chunk was sent and whether it is complete. A file modified since is uploaded again.
+
+    :param path: file where the journal is saved, `None` to keep it in memory only.
+    '''
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._journal = {'files': {}}
+        if path is not None and os.path.exists(path):
+            with open(path) as journal_file:
+                self._journal = json.load(journal_file)
+
+
+    def entry(self, media_path):
+        '''
+        :return: `dict` of the upload of `media_path`, reset if the file changed since it was recorded.
+        '''
+        stat = os.stat(media_path)
+        with self._lock:
+            entry = self._journal['files'].get(media_path)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                entry = self._journal['files'][media_path] = {
+                    'size': stat.st_size, 'mtime': stat.st_mtime, 'media_id': None, 'offset': 0, 'started': False, 'done': False,
+                }
+            return dict(entry)
+
+
+    def update(self, media_path, **fields):
+        '''
+        Updates the upload of `media_path`, and saves the journal.
+        '''
+        with self._lock:
+            self._journal['files'][media_path].update(fields)
+            self._save()
+
+
+    def remove(self):
+        '''
+        Deletes the journal file, once the upload is complete.
+        '''
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
+
+
+    def _save(self):
+        if self._path is None:
+            return
+        temporary_path = '%s.%d.tmp' % (self._path, os.getpid())
+        with open(temporary_path, 'w') as journal_file:
+            json.dump(self._journal, journal_file)
+        os.replace(temporary_path, self._path)
+
+
+def content_type(media_path):
+    '''
+    :return: MIME type of a media file, from its extension.
+    '''
+    return mimetypes.guess_type(media_path)[0] or 'application/octet-stream'
+
+
+def upload_headers(offset, length, size, media_path=None):
+    '''
+    :return: headers of the request sending `length` bytes from `offset` of a `size` bytes file,
+        or asking how many bytes arrived when `length` is 0.
+    '''
+    if length == 0:
+        return {'Content-Range': 'bytes */%d' % size, 'Content-Length': '0'}
+    return {
+        'content-type': content_type(media_path),
+        'Content-Range': 'bytes %d-%d/%d' % (offset, offset + length - 1, size),
+        'Content-Length': str(length),
+    }
+
+
+def confirmed_offset(response, size):
+    '''
+    :param response: response to an upload request.
+
+    :param size: bytes of the file.
+
+    :return: bytes of the file received by the server, `None` if the response is an error.
+    '''
+    if response.status_code in UPLOAD_COMPLETE:
+        return size
+    if response.status_code != UPLOAD_INCOMPLETE:
+        return None
+    received = _RANGE_RE.match(response.headers.get('Range') or '')
+    return int(received.group(2)) + 1 if received else 0
+
+
+def placeholder_request(count):
+    '''
+    :return: body of the `placeholders` request creating `count` media.
+    '''
+    return {'count': count}
+
+
+def placeholder_media_ids(client_data):
+    '''
+    :param client_data: response of the `placeholders` request, `dict` or protobuf message.
+
+    :return: `list` of the media IDs created.
+    '''
+    media_ids = client_data.get('media_id') if isinstance(client_data, dict) else getattr(client_data, 'media_id', None)
+    return list(media_ids or [])
+
+
+def order_request(media_ids):
+    '''
+    :return: body of the `order` request, setting the order of the profile media.
+    '''
+    return {'media_id': list(media_ids)}
+
+
+def _chunk_result(response, error, attempts, size):
+    confirmed = None if response is None else confirmed_offset(response, size)
+    return upload_error(response, error, attempts) if confirmed is None else confirmed
+
+
+def upload_error(response, error, attempts):
+    '''
+    :return: error `dict` of a failed upload request.
+    '''
+    if error is not None:
+        return {'error': 'Something went wrong.', 'exception': str(error), 'attempts': attempts}
+    return {'error': 'Upload failed.', 'status': response.status_code, 'attempts': attempts}
+
+
+class MediaUploader(object):
+    '''
+    Experimental, see the module documentation: the upload protocol is assumed, not documented.
+
+    example: uploader = MediaUploader(tinder_api)
+             uploader.upload_photos(['1.jpg', '2.jpg'], journal_path='upload.journal')
+
+    :param tinder_api: authenticated :class:`tinder_api.api.Tinder_API`.
+    '''
+    body_class = FileSlice
+
+    def __init__(self, tinder_api):
+        self._api = tinder_api
+
+
+    def create_media_placeholders(self, count):
+        '''
+        Creates placeholders for new media of your profile, to upload them to.
+
+        :param count: number of media.
+
+        :return: response listing the new media IDs in `media_id`.
+        '''
+        return self._api.api_request('mediaservice', 'placeholders', data=placeholder_request(count))
+
+
+    def order_media(self, media_ids):
+        '''
+        Sets the order of the media of your profile.
+
+        :param media_ids: every media ID, in profile order.
+        '''
+        return self._api.api_request('mediaservice', 'order', data=order_request(media_ids))
+
+
+    def delete_media(self, media_ids):
+        '''
+        Deletes media of your profile.
+
+        :param media_ids: IDs of the media to delete.
+        '''
+        return self._api.api_request('mediaservice', 'delete', data={'media_id': list(media_ids)})
+
+
+    def upload_media(self, path, media_id, journal=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        Uploads a file to a media placeholder, streaming it from disk in chunks.
+        An upload recorded in `journal` resumes from the bytes the server confirmed.
+
+        :param path: path of the file.
+
+        :param media_id: ID of the placeholder, from :method:`create_media_placeholders`.
+
+        :param journal: :class:`UploadJournal` recording the progress of the upload.
+
+        :param chunk_size: bytes sent per request.
+
+        :return: `{'media_id': media_id}`, or an error `dict`.
+        '''
+        path = os.path.abspath(path)
+        journal = journal if journal is not None else UploadJournal()
+        entry = journal.entry(path)
+        if entry['media_id'] != media_id:
+            journal.update(path, media_id=media_id, offset=0, started=False, done=False)
+            entry = journal.entry(path)
+        size, offset = entry['size'], entry['offset']
+        try:
+            if entry['started']:
+                # the server may have received more than the journal recorded, or less
+                offset = self._send_chunk(path, media_id, offset, 0, size)
+            else:
+                journal.update(path, started=True)
+            while not isinstance(offset, dict) and offset < size:
+                offset = self._send_chunk(path, media_id, offset, min(chunk_size, size - offset), size)
+                if not isinstance(offset, dict):
+                    journal.update(path, offset=offset)
+        except Exception as e:
+            return {'error': 'Something went wrong.', 'exception': str(e)}
+        if isinstance(offset, dict):
+            return offset
+        journal.update(path, done=True)
+        return {'media_id': media_id}
+
+
+    def _prepare_chunk(self, path, media_id, offset, length, size):
+        api = self._api
+        if api._auth_key not in api._headers:
+            raise RuntimeError(api._not_authenticated_error['error'])
+        api_endpoint = api._endpoints.get('mediaservice', 'photo')
+        url = api._host + api_endpoint.format_path() + api.data_to_query_string({'media_id': media_id})
+        headers = dict(api._headers, **upload_headers(offset, length, size, path))
+        if not length:
+            headers.pop(api._content_type, None)
+        return PreparedRequest('post', url, headers, self.body_class(path, offset, length) if length else None, api_endpoint)
+
+
+    def _send_chunk(self, path, media_id, offset, length, size):
+        '''
+        Sends `length` bytes of a file from `offset`, or asks how many bytes arrived when `length` is 0.
+
+        :return: bytes of the file received by the server, or an error `dict`.
+        '''
+        response, error, attempts = self._api._exchange(self._prepare_chunk(path, media_id, offset, length, size))
+        return _chunk_result(response, error, attempts, size)
+
+
+    def _placeholders(self, paths, journal, response):
+        '''
+        Records the media IDs of the placeholders created for the files of `paths` without one.
+
+        :return: error `dict`, `None` on success.
+        '''
+        if isinstance(response, dict) and 'error' in response:
+            return response
+        media_ids = placeholder_media_ids(response)
+        if len(media_ids) != len(paths):
+            return {'error': 'Something went wrong.', 'exception': 'Expected %d placeholders, got %d' % (len(paths), len(media_ids))}
+        for path, media_id in zip(paths, media_ids):
+            journal.update(path, media_id=media_id)
+        return None
+
+
+    def upload_photos(self, paths, journal_path=None, max_workers=4, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        Replaces the media of your profile: creates placeholders, uploads the files to them in parallel,
+        then orders them as in `paths`. Takes about as long as the slowest upload.
+
+        With `journal_path`, the progress is saved after every chunk, and calling again with the same paths
+        and journal after a failure resumes the upload without sending again what already arrived.
+        The journal is deleted once the upload is complete.
+
+        :param paths: paths of the files, in profile order.
+
+        :param journal_path: file where the progress is saved, `None` to not save it.
+
+        :param max_workers: maximum number of files uploaded at once.
+
+        :param chunk_size: bytes sent per request.
+
+        :return: `{'media_ids': [...], 'order': response}`, or an error `dict`. When uploads failed,
+            'failed' maps their paths to their errors.
+        '''
+        paths = [os.path.abspath(path) for path in paths]
+        journal = UploadJournal(journal_path)
+        entries = [journal.entry(path) for path in paths]
+        missing = [path for path, entry in zip(paths, entries) if entry['media_id'] is None]
+        if missing:
+            error = self._placeholders(missing, journal, self.create_media_placeholders(len(missing)))
+            if error is not None:
+                return error
+            entries = [journal.entry(path) for path in paths]
+
+        def upload(item):
+            path, entry = item
+            if entry['done']:
+                return {'media_id': entry['media_id']}
+            return self.upload_media(path, entry['media_id'], journal, chunk_size)
+
+        results = [result for _, result in bounded_map(upload, list(zip(paths, entries)), max_workers)]
+        failed = {path: result for path, result in zip(paths, results) if 'error' in result}
+        media_ids = [entry['media_id'] for entry in entries]
+        if failed:
+            return {'error': 'Upload failed.', 'failed': failed, 'media_ids': media_ids}
+        order = self.order_media(media_ids)
+        if isinstance(order, dict) and 'error' in order:
+            return order
+        journal.remove()
+        return {'media_ids': media_ids, 'order': order}
+
+
+class AsyncMediaUploader(MediaUploader):
+    '''
+    Asynchronous version of :class:`MediaUploader`, for :class:`tinder_api.async_api.AsyncTinder_API`.
+    Disk reads do not block the event loop.
+    '''
+    body_class = AsyncFileSlice
+
+    async def upload_media(self, path, media_id, journal=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        See :method:`MediaUploader.upload_media`.
+        '''
+        path = os.path.abspath(path)
+        journal = journal if journal is not None else UploadJournal()
+        entry = journal.entry(path)
+        if entry['media_id'] != media_id:
+            journal.update(path, media_id=media_id, offset=0, started=False, done=False)
+            entry = journal.entry(path)
+        size, offset = entry['size'], entry['offset']
+        try:
+            if entry['started']:
+                offset = await self._send_chunk(path, media_id, offset, 0, size)
+            else:
+                journal.update(path, started=True)
+            while not isinstance(offset, dict) and offset < size:
+                offset = await self._send_chunk(path, media_id, offset, min(chunk_size, size - offset), size)
+                if not isinstance(offset, dict):
+                    journal.update(path, offset=offset)
+        except Exception as e:
+            return {'error': 'Something went wrong.', 'exception': str(e)}
+        if isinstance(offset, dict):
+            return offset
+        journal.update(path, done=True)
+        return {'media_id': media_id}
+
+
+    async def _send_chunk(self, path, media_id, offset, length, size):
+        response, error, attempts = await self._api._exchange(self._prepare_chunk(path, media_id, offset, length, size))
+        return _chunk_result(response, error, attempts, size)
+
+
+    async def upload_photos(self, paths, journal_path=None, max_workers=4, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        See :method:`MediaUploader.upload_photos`.
+
+        :param max_workers: maximum number of files uploaded at once.
+        '''
+        paths = [os.path.abspath(path) for path in paths]
+        journal = UploadJournal(journal_path)
+        entries = [journal.entry(path) for path in paths]
+        missing = [path for path, entry in zip(paths, entries) if entry['media_id'] is None]
+        if missing:
+            error = self._placeholders(missing, journal, await self.create_media_placeholders(len(missing)))
+            if error is not None:
+                return error
+            entries = [journal.entry(path) for path in paths]
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def upload(path, entry):
+            if entry['done']:
+                return {'media_id': entry['media_id']}
+            async with semaphore:
+                return await self.upload_media(path, entry['media_id'], journal, chunk_size)
+
+        results = await asyncio.gather(*[upload(path, entry) for path, entry in zip(paths, entries)])
+        failed = {path: result for path, result in zip(paths, results) if 'error' in result}
+        media_ids = [entry['media_id'] for entry in entries]
+        if failed:
+            return {'error': 'Upload failed.', 'failed': failed, 'media_ids': media_ids}
+        order = await self.order_media(media_ids)
+        if isinstance(order, dict) and 'error' in order:
+            return order
+        journal.remove()
+        return {'media_ids': media_ids, 'order': order}
@@ -0,0 +1,287 @@
+# coding=utf-8
+'''
+Full-text index over the messages of matches, so that finding a conversation by its content
+doesn't have to scan every message of every match.
+'''
+
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r'\w+')
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 ranking parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    '''
+    Splits text into case-folded words, so that 'Straße', 'STRASSE' and 'strasse' are the same word.
+
+    :param text: message text.
+
+    :return: `list` of words.
+    '''
+    return _TOKEN_RE.findall(unicodedata.normalize('NFKC', text).casefold())
+
+
+class MessageIndex(object):
+    '''
+    Inverted index over the text of messages, answering word, phrase and prefix queries
+    with hits ranked by relevance (BM25).
+
+    example: messages = MessageIndex(helpers.format_matches(tinder_api.iter_matches()))
+             messages.search('"see you" tomorrow din*')
+             messages.apply_updates(tinder_api.get_updates(last_activity_date))
+
+    :param formatted_matches: value from calling :method:`helpers.format_matches`,
+        or a :class:`tinder_api.match_index.MatchIndex`.
+    '''
+    def __init__(self, formatted_matches=None):
+        self._postings = defaultdict(dict)  # word -> {document: positions}
+        self._words = []  # sorted, for prefix queries
+        self._documents = {}  # (match_id, message_id) -> document
+        self._keys = {}  # document -> (match_id, message_id)
+        self._document_words = {}  # document -> words, to unindex it
+        self._lengths = {}  # document -> number of words
+        self._by_match_id = defaultdict(set)
+        self._total_length = 0
+        self._next_document = 0
+        if formatted_matches:
+            for match in formatted_matches.values():
+                self.add_messages(match.get('messages') or [], match.get('match_id'))
+
+
+    def __len__(self):
+        return len(self._documents)
+
+
+    def __contains__(self, key):
+        return key in self._documents
+
+
+    # UPDATES
+
+    def add_message(self, message, match_id=None):
+        '''
+        Indexes a message, or re-indexes it if already indexed.
+
+        :param message: message object, with its `_id`, `match_id` and `message` text.
+
+        :param match_id: ID of the match, when the message doesn't have it.
+        '''
+        key = (message.get('match_id') or match_id, message.get('_id'))
+        if key in self._documents:
+            self.remove_message(*key)
+        document = self._next_document
+        self._next_document += 1
+        words = tokenize(message.get('message') or '')
+        positions = defaultdict(list)
+        for position, word in enumerate(words):
+            positions[word].append(position)
+        for word, word_positions in positions.items():
+            postings = self._postings[word]
+            if not postings:
+                insort(self._words, word)
+            postings[document] = tuple(word_positions)
+        self._documents[key] = document
+        self._keys[document] = key
+        self._document_words[document] = tuple(positions)
+        self._lengths[document] = len(words)
+        self._by_match_id[key[0]].add(document)
+        self._total_length += len(words)
+
+
+    def add_messages(self, messages, match_id=None):
+        '''
+        :param messages: message objects.
+
+        :param match_id: ID of the match, when the messages don't have it.
+        '''
+        for message in messages:
+            self.add_message(message, match_id)
+
+
+    def remove_message(self, match_id, message_id):
+        '''
+        Removes a message. Does nothing if it is not indexed.
+        '''
+        document = self._documents.pop((match_id, message_id), None)
+        if document is None:
+            return
+        for word in self._document_words.pop(document):
+            postings = self._postings[word]
+            del postings[document]
+            if not postings:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+        del self._keys[document]
+        self._total_length -= self._lengths.pop(document)
+        documents = self._by_match_id[match_id]
+        documents.discard(document)
+        if not documents:
+            del self._by_match_id[match_id]
+
+
+    def remove_match(self, match_id):
+        '''
+        Removes every message of a match, ex: after an unmatch.
+        '''
+        for document in list(self._by_match_id.get(match_id, ())):
+            self.remove_message(*self._keys[document])
+
+
+    def apply_updates(self, updates):
+        '''
+        Applies the response of :method:`Tinder_API.get_updates`: indexes the new messages
+        of `matches` and `inbox`, and removes the matches listed in `blocks`.
+
+        :param updates: value from calling :method:`Tinder_API.get_updates`.
+        '''
+        for raw_match in updates.get('matches', []):
+            self.add_messages(raw_match.get('messages') or [], raw_match.get('_id'))
+        self.add_messages(updates.get('inbox', []))
+        for match_id in updates.get('blocks', []):
+            self.remove_match(match_id)
+
+
+    # SEARCH
+
+    def words_with_prefix(self, prefix):
+        '''
+        :param prefix: beginning of words, case-folded like :func:`tokenize`.
+
+        :return: `list` of the indexed words starting with `prefix`.
+        '''
+        words = []
+        for position in range(bisect_left(self._words, prefix), len(self._words)):
+            if not self._words[position].startswith(prefix):
+                break
+            words.append(self._words[position])
+        return words
+
+
+    def search(self, query, limit=20, match_id=None, scores=False):
+        '''
+        Finds the messages matching every part of `query`, most relevant first.
+
+        example: messages.search('"see you" tomorrow din*')
+
+        :param query: words, `"quoted phrases"` whose words must follow each other,
+            and prefixes ending with `*`. Case and accents are compared as by :func:`tokenize`.
+
+        :param limit: maximum number of hits, `None` for all of them.
+
+        :param match_id: only search the messages of this match.
+
+        :param scores: also return the relevance of each hit.
+
+        :return: `list` of `(match_id, message_id)`, or `(match_id, message_id, score)` with `scores`.
+        '''
+        clauses = self._parse(query)
+        if not clauses:
+            return []
+        candidates = None if match_id is None else self._by_match_id.get(match_id, set())
+        # most selective clauses first: once the candidates are few, the others only check them
+        sizes = [self._clause_size(words, phrase) for words, phrase in clauses]
+        for size, (words, phrase) in sorted(zip(sizes, clauses), key=lambda clause: clause[0]):
+            if candidates is None:
+                candidates = self._clause_documents(words, phrase)
+            elif len(candidates) < size:
+                candidates = {document for document in candidates if self._clause_matches(document, words, phrase)}
+            else:
+                candidates = self._clause_documents(words, phrase) & candidates
+            if not candidates:
+                return []
+        # only the hits are scored, from their own words rather than from the postings of every query word
+        words = set().union(*[clause_words for clause_words, _ in clauses])
+        average_length = self._total_length / len(self._documents)
+        idfs = {}
+        totals = {document: self._score(document, words, idfs, average_length) for document in candidates}
+        order = lambda document: (-totals[document], -document)
+        hits = sorted(candidates, key=order) if limit is None else heapq.nsmallest(limit, candidates, key=order)
+        if scores:
+            return [self._keys[document] + (totals[document],) for document in hits]
+        return [self._keys[document] for document in hits]
+
+
+    def _parse(self, query):
+        '''
+        :return: `list` of `(words, phrase)` per clause of `query`: the words of a phrase,
+            the `frozenset` of the words starting with a prefix, or a single word. `words` is empty when nothing matches.
+        '''
+        clauses = []
+        for phrase, term in _QUERY_RE.findall(query):
+            words = tokenize(phrase or term)
+            if not words:
+                continue
+            if term.endswith('*') and len(words) == 1:
+                clauses.append((frozenset(self.words_with_prefix(words[0])), False))
+            elif any(word not in self._postings for word in words):
+                clauses.append((frozenset(), False))
+            else:
+                clauses.append((words, len(words) > 1))
+        return clauses
+
+
+    def _clause_size(self, words, phrase):
+        '''
+        :return: upper bound of the number of documents matching a clause.
+        '''
+        if phrase:
+            return min(len(self._postings[word]) for word in words)
+        return sum(len(self._postings[word]) for word in words)
+
+
+    def _clause_documents(self, words, phrase):
+        '''
+        :return: `set` of the documents matching a clause.
+        '''
+        if phrase:
+            postings = [self._postings[word] for word in words]
+            documents = set(min(postings, key=len))
+            documents.intersection_update(*postings)
+            return {document for document in documents if self._clause_matches(document, words, phrase)}
+        documents = set()
+        for word in words:
+            documents.update(self._postings[word])
+        return documents
+
+
+    def _clause_matches(self, document, words, phrase):
+        if not phrase:
+            # `words` is a single word, or the `frozenset` of a prefix: the shorter side is scanned
+            document_words = self._document_words[document]
+            if len(words) > len(document_words):
+                return any(word in words for word in document_words)
+            return any(document in self._postings[word] for word in words)
+        following = []
+        for word in words:
+            positions = self._postings[word].get(document)
+            if positions is None:
+                return False
+            following.append(set(positions))
+        return any(all(start + offset in following[offset] for offset in range(1, len(words))) for start in following[0])
+
+
+    def _score(self, document, words, idfs, average_length):
+        '''
+        :return: BM25 relevance of a document to the query `words`.
+        '''
+        length = self._lengths[document]
+        score = 0.0
+        for word in self._document_words[document]:
+            if word in words:
+                postings = self._postings[word]
+                idf = idfs.get(word)
+                if idf is None:
+                    count = len(self._documents)
+                    idf = idfs[word] = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                frequency = len(postings[document])
+                score += idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length / (average_length or 1)))
+        return score
@@ -0,0 +1,268 @@
+# coding=utf-8
+'''
+Request metrics per endpoint: latency histograms, bytes sent and received (decoded and on the wire), status codes,
+cache hit rates and requests in flight, exportable in the Prometheus text format.
+
+Endpoints are identified by their 'service.endpoint' key in `api_endpoints.json`,
+requests made with :method:`Tinder_API.custom_request` are grouped under 'custom'.
+'''
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EndpointMetrics(object):
+    '''
+    Metrics of one endpoint. `buckets` holds the number of requests per latency bucket, not cumulated,
+    the last one counting requests slower than every bound.
+    '''
+    __slots__ = ('buckets', 'latency_sum', 'requests', 'errors', 'status_codes', 'request_bytes', 'request_wire_bytes',
+                 'response_bytes', 'response_wire_bytes', 'in_flight', 'cache_hits', 'cache_misses', 'cache_revalidations')
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.status_codes = {}
+        self.request_bytes = 0
+        self.request_wire_bytes = 0
+        self.response_bytes = 0
+        self.response_wire_bytes = 0
+        self.in_flight = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_revalidations = 0
+
+
+class Metrics(object):
+    '''
+    Thread-safe collector of request metrics, filled by :class:`Tinder_API` when passed as `metrics`.
+
+    example: metrics = Metrics()
+             tinder_api = Tinder_API(api_token=api_token, metrics=metrics)
+             metrics.add_hooks(post=lambda request, response, error, elapsed: print(request.url, elapsed))
+             print(metrics.to_prometheus())
+
+    :param buckets: upper bounds of the latency histogram buckets, in seconds.
+
+    :param prefix: prefix of the Prometheus metric names.
+    '''
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='tinder_api'):
+        self._bounds = tuple(sorted(buckets))
+        self._prefix = prefix
+        self._endpoints = {}
+        self._pre_hooks = []
+        self._post_hooks = []
+        self._lock = threading.Lock()
+
+
+    def add_hooks(self, pre=None, post=None):
+        '''
+        Registers functions called around every request sent, from the thread sending it.
+        Exceptions raised by hooks are logged, they do not change the outcome of the request.
+
+        :param pre: called with the :class:`tinder_api.api.PreparedRequest` before it is sent.
+
+        :param post: called with the request, the response (`None` on error), the exception
+            raised (`None` on success) and the seconds elapsed.
+        '''
+        if pre is not None:
+            self._pre_hooks.append(pre)
+        if post is not None:
+            self._post_hooks.append(post)
+
+
+    @staticmethod
+    def endpoint_key(request):
+        '''
+        :param request: :class:`tinder_api.api.PreparedRequest`
+
+        :return: label of the request's endpoint.
+        '''
+        return 'custom' if request.api_endpoint is None else request.api_endpoint.key
+
+
+    def _get(self, key):
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = EndpointMetrics(len(self._bounds))
+        return endpoint
+
+
+    def request_started(self, request):
+        '''
+        Called before a request is sent.
+
+        :return: start time, to pass to :method:`request_finished`.
+        '''
+        self._call_hooks(self._pre_hooks, request)
+        with self._lock:
+            self._get(self.endpoint_key(request)).in_flight += 1
+        return time.perf_counter()
+
+
+    def request_finished(self, request, started, response=None, error=None):
+        '''
+        Called when a request got a response, or failed with `error`.
+        The body of a streamed response is not read yet, and not counted.
+
+        :param started: value returned by :method:`request_started`.
+        '''
+        elapsed = time.perf_counter() - started
+        body = request.body
+        with self._lock:
+            endpoint = self._get(self.endpoint_key(request))
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            endpoint.latency_sum += elapsed
+            endpoint.buckets[bisect_left(self._bounds, elapsed)] += 1
+            if body is not None:
+                endpoint.request_bytes += len(body)
+            if response is None:
+                endpoint.errors += 1
+            else:
+                endpoint.status_codes[response.status_code] = endpoint.status_codes.get(response.status_code, 0) + 1
+                content = None if request.stream else response.content
+                if content is not None:
+                    endpoint.response_bytes += len(content)
+                # reported by transports compressing bodies, ex: HttpxTransport; the same as the body size otherwise
+                endpoint.response_wire_bytes += getattr(response, 'wire_bytes', None) or len(content or b'')
+                endpoint.request_wire_bytes += getattr(response, 'request_wire_bytes', None) or len(body or b'')
+        self._call_hooks(self._post_hooks, request, response, error, elapsed)
+
+
+    @staticmethod
+    def _call_hooks(hooks, *args):
+        for hook in hooks:
+            try:
+                hook(*args)
+            except Exception:
+                logger.exception('Metrics hook %r failed', hook)
+
+
+    def cache_lookup(self, request, hit):
+        '''
+        Called when a request is looked up in the response cache.
+
+        :param hit: whether a fresh response was found.
+        '''
+        with self._lock:
+            endpoint = self._get(self.endpoint_key(request))
+            if hit:
+                endpoint.cache_hits += 1
+            else:
+                endpoint.cache_misses += 1
+
+
+    def cache_revalidated(self, request):
+        '''
+        Called when the server confirmed an expired cached response with `304 Not Modified`.
+        '''
+        with self._lock:
+            self._get(self.endpoint_key(request)).cache_revalidations += 1
+
+
+    def reset(self):
+        '''
+        Forgets every metric. Requests in flight are still counted.
+        '''
+        with self._lock:
+            for key, endpoint in list(self._endpoints.items()):
+                in_flight = endpoint.in_flight
+                self._endpoints[key] = EndpointMetrics(len(self._bounds))
+                self._endpoints[key].in_flight = in_flight
+
+
+    def snapshot(self):
+        '''
+        :return: `dict` of endpoint key -> `dict` of its metrics. Latency buckets are cumulated,
+            as `(upper bound, requests at most this slow)` pairs, the last bound being `inf`.
+        '''
+        snapshot = {}
+        with self._lock:
+            for key, endpoint in self._endpoints.items():
+                cumulated, count = [], 0
+                for bound, bucket_count in zip(self._bounds + (float('inf'),), endpoint.buckets):
+                    count += bucket_count
+                    cumulated.append((bound, count))
+                lookups = endpoint.cache_hits + endpoint.cache_misses
+                snapshot[key] = {
+                    'requests': endpoint.requests,
+                    'errors': endpoint.errors,
+                    'status_codes': dict(endpoint.status_codes),
+                    'latency_sum': endpoint.latency_sum,
+                    'latency_mean': endpoint.latency_sum / endpoint.requests if endpoint.requests else None,
+                    'latency_buckets': cumulated,
+                    'request_bytes': endpoint.request_bytes,
+                    'request_wire_bytes': endpoint.request_wire_bytes,
+                    'response_bytes': endpoint.response_bytes,
+                    'response_wire_bytes': endpoint.response_wire_bytes,
+                    'in_flight': endpoint.in_flight,
+                    'cache_hits': endpoint.cache_hits,
+                    'cache_misses': endpoint.cache_misses,
+                    'cache_revalidations': endpoint.cache_revalidations,
+                    'cache_hit_rate': endpoint.cache_hits / lookups if lookups else None,
+                }
+        return snapshot
+
+
+    def to_prometheus(self):
+        '''
+        :return: the metrics in the Prometheus text exposition format.
+        '''
+        snapshot = self.snapshot()
+        prefix = self._prefix
+        lines = []
+
+        def family(name, metric_type, help_text, samples):
+            lines.append('# HELP %s_%s %s' % (prefix, name, help_text))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, metric_type))
+            for suffix, labels, value in samples:
+                label_text = ','.join('%s="%s"' % (label, _escape(label_value)) for label, label_value in labels)
+                lines.append('%s_%s%s{%s} %s' % (prefix, name, suffix, label_text, _format(value)))
+
+        keys = sorted(snapshot)
+        family('request_duration_seconds', 'histogram', 'Latency of the requests sent, per endpoint.', [
+            sample
+            for key in keys
+            for sample in [('_bucket', (('endpoint', key), ('le', _format(bound))), count) for bound, count in snapshot[key]['latency_buckets']]
+            + [('_sum', (('endpoint', key),), snapshot[key]['latency_sum']), ('_count', (('endpoint', key),), snapshot[key]['requests'])]
+        ])
+        family('responses_total', 'counter', 'Responses received, per endpoint and status code.', [
+            ('', (('endpoint', key), ('status', str(status))), count)
+            for key in keys for status, count in sorted(snapshot[key]['status_codes'].items())
+        ])
+        for name, field, help_text in (
+                ('request_errors_total', 'errors', 'Requests which got no response, per endpoint.'),
+                ('request_bytes_total', 'request_bytes', 'Bytes of request bodies sent, per endpoint.'),
+                ('request_wire_bytes_total', 'request_wire_bytes', 'Bytes of request bodies sent on the wire, after compression, per endpoint.'),
+                ('response_bytes_total', 'response_bytes', 'Bytes of response bodies received, per endpoint.'),
+                ('response_wire_bytes_total', 'response_wire_bytes', 'Bytes of response bodies received on the wire, before decompression, per endpoint.'),
+                ('cache_hits_total', 'cache_hits', 'Requests answered from the response cache, per endpoint.'),
+                ('cache_misses_total', 'cache_misses', 'Requests not answered from the response cache, per endpoint.'),
+                ('cache_revalidations_total', 'cache_revalidations', 'Cached responses revalidated by the server, per endpoint.')):
+            family(name, 'counter', help_text, [('', (('endpoint', key),), snapshot[key][field]) for key in keys])
+        family('requests_in_flight', 'gauge', 'Requests sent and waiting for a response, per endpoint.', [
+            ('', (('endpoint', key),), snapshot[key]['in_flight']) for key in keys
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
@@ -0,0 +1,219 @@
+# coding=utf-8
+'''
+Request policy: client-side rate limits, and retries directed by the server.
+
+- Requests are paced by a token bucket per endpoint group (the service name in
+  `api_endpoints.json`, or 'custom' for :method:`Tinder_API.custom_request`).
+- `429 Too Many Requests` and `503 Service Unavailable` answers pause their group for
+  the time given in their `Retry-After` header.
+- Idempotent requests failing with a retryable status or a connection error are retried
+  with jittered exponential backoff, as long as the global retry budget allows it.
+'''
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# requests that can be sent again without changing the result
+IDEMPOTENT_HTTP_VERBS = ('get', 'head', 'options', 'put', 'delete')
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value, now=None):
+    '''
+    :param value: `Retry-After` header, in seconds or as an HTTP date.
+
+    :param now: current time, as a UNIX timestamp. Defaults to now.
+
+    :return: seconds to wait, or `None` if the header is missing or invalid.
+    '''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+
+class TokenBucket(object):
+    '''
+    Thread-safe token bucket.
+
+    :param rate: tokens added per second.
+
+    :param capacity: maximum number of tokens, i.e. the allowed burst.
+    '''
+    def __init__(self, rate, capacity=1):
+        self._rate = float(rate)
+        self._capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+
+    def reserve(self):
+        '''
+        Takes a token, possibly in advance.
+
+        :return: seconds to wait before using the token.
+        '''
+        with self._lock:
+            now = time.monotonic()
+            if self._rate > 0:
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 or self._rate <= 0 else -self._tokens / self._rate
+            return max(wait, self._paused_until - now)
+
+
+    def pause(self, seconds):
+        '''
+        Lets no request through for `seconds`, ex: when the server asked to retry later.
+        '''
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RetryBudget(object):
+    '''
+    Caps retries to a fraction of the requests, so that an outage does not turn into a retry storm.
+
+    :param ratio: retries allowed per request sent.
+
+    :param minimum: retries always allowed, ex: when few requests are sent.
+    '''
+    def __init__(self, ratio=0.2, minimum=10):
+        self._ratio = ratio
+        self._minimum = minimum
+        self._balance = float(minimum)
+        self._lock = threading.Lock()
+
+
+    def record_request(self):
+        with self._lock:
+            self._balance = min(self._balance + self._ratio, self._minimum + 100 * self._ratio)
+
+
+    def try_spend(self):
+        '''
+        :return: whether a retry is allowed. If so, it is deducted from the budget.
+        '''
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RequestPolicy(object):
+    '''
+    Rate limits and retries applied by :class:`Tinder_API` to every request.
+
+    example: Tinder_API(policy=RequestPolicy(limits={'recs': (1, 5)}, max_retries=3))
+
+    :param limits: `dict` of endpoint group -> `(requests per second, burst)`.
+
+    :param default_limit: `(requests per second, burst)` for groups not in `limits`, `None` for no limit.
+
+    :param max_retries: maximum number of retries of one request.
+
+    :param backoff_base: seconds of the first retry's backoff, doubled at each retry.
+
+    :param backoff_max: maximum seconds of backoff.
+
+    :param max_retry_after: `Retry-After` longer than this is not waited for: the error is returned,
+        and the group of the endpoint is paused for `max_retry_after` seconds only.
+
+    :param budget: :class:`RetryBudget` shared by every request.
+    '''
+    def __init__(self, limits=None, default_limit=None, max_retries=3, backoff_base=0.5, backoff_max=30.0, max_retry_after=120.0, budget=None):
+        self._limits = limits or {}
+        self._default_limit = default_limit
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._max_retry_after = max_retry_after
+        self._budget = budget if budget is not None else RetryBudget()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def group(api_endpoint):
+        '''
+        :param api_endpoint: :class:`tinder_api.api_endpoints.Endpoint`, or `None` for custom requests.
+
+        :return: the endpoint group, used for rate limits.
+        '''
+        return 'custom' if api_endpoint is None else api_endpoint.service
+
+
+    def _bucket(self, group):
+        bucket = self._buckets.get(group)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(group)
+                if bucket is None:
+                    limit = self._limits.get(group, self._default_limit)
+                    bucket = self._buckets[group] = TokenBucket(*limit) if limit else TokenBucket(0, 0)
+        return bucket
+
+
+    def before_request(self, api_endpoint, attempt=0):
+        '''
+        Called before each attempt.
+
+        :param api_endpoint: :class:`tinder_api.api_endpoints.Endpoint`, or `None`.
+
+        :param attempt: number of the attempt, starting at 0. Only first attempts add to the retry budget.
+
+        :return: seconds to wait before sending it.
+        '''
+        if attempt == 0:
+            self._budget.record_request()
+        return self._bucket(self.group(api_endpoint)).reserve()
+
+
+    def retry_delay(self, http_verb, api_endpoint, attempt, response=None, exception=None):
+        '''
+        Decides whether a failed attempt is retried.
+
+        :param http_verb: lower case HTTP verb.
+
+        :param api_endpoint: :class:`tinder_api.api_endpoints.Endpoint`, or `None`.
+
+        :param attempt: number of the attempt that failed, starting at 0.
+
+        :param response: response of the attempt, if any.
+
+        :param exception: exception raised by the attempt, if any.
+
+        :return: seconds to wait before retrying, or `None` to not retry.
+        '''
+        retry_after = None
+        if response is not None:
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                return None
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                # the whole group is paused, not only this request, but no longer than a retry would wait
+                self._bucket(self.group(api_endpoint)).pause(min(retry_after, self._max_retry_after))
+        elif exception is None:
+            return None
+        if http_verb not in IDEMPOTENT_HTTP_VERBS or attempt >= self._max_retries:
+            return None
+        if retry_after is not None and retry_after > self._max_retry_after:
+            return None
+        if not self._budget.try_spend():
+            return None
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** attempt))
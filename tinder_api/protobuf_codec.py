@@ -0,0 +1,127 @@
+# coding=utf-8
+'''
+Protobuf codec for the endpoints declaring `requestSchema` / `responseSchema` in `api_endpoints.json`,
+ex: `"requestSchema": ["mediaservice", "CreatePlaceholderRequest"]`.
+
+Messages are looked up in compiled `<package>_pb2` modules, ex: `mediaservice_pb2.py` generated by
+`protoc --python_out=. mediaservice.proto`, found in `schema_path` or else on `sys.path`.
+Requires `protobuf` (`pip install tinder_api[protobuf]`).
+'''
+
+import importlib
+import os
+import sys
+import threading
+
+try:
+    from google.protobuf import json_format
+    from google.protobuf.message import Message
+except ImportError:  # optional, see `_require_protobuf`
+    json_format = Message = None
+
+CONTENT_TYPE = 'application/x-protobuf'
+
+
+def _require_protobuf():
+    if json_format is None:
+        raise ImportError('Protobuf schemas require protobuf: pip install protobuf')
+
+
+class ProtobufCodec(object):
+    '''
+    Encodes requests and decodes responses of one endpoint with its protobuf messages.
+
+    :param request_class: message class of the request body, `None` to send it as JSON.
+
+    :param response_class: message class of the response body, `None` to decode it as JSON.
+
+    :param fallback: codec used for the parts without a message class.
+
+    :param as_dict: decode responses to `dict` (field names as in the `.proto` file) instead of messages.
+    '''
+    name = 'protobuf'
+
+    def __init__(self, request_class, response_class, fallback, as_dict=False):
+        self._request_class = request_class
+        self._response_class = response_class
+        self._fallback = fallback
+        self._as_dict = as_dict
+        self.headers = {}
+        if request_class is not None:
+            self.headers['content-type'] = CONTENT_TYPE
+        if response_class is not None:
+            self.headers['Accept'] = CONTENT_TYPE
+
+
+    def dumps(self, data):
+        '''
+        :param data: message, or `dict` with the fields of the request message.
+        '''
+        if self._request_class is None:
+            return self._fallback.dumps(data)
+        if not isinstance(data, Message):
+            data = json_format.ParseDict(data, self._request_class())
+        return data.SerializeToString()
+
+
+    def loads(self, content):
+        if self._response_class is None:
+            return self._fallback.loads(content)
+        message = self._response_class.FromString(content)
+        if self._as_dict:
+            return json_format.MessageToDict(message, preserving_proto_field_name=True)
+        return message
+
+
+class SchemaLoader(object):
+    '''
+    Finds message classes in compiled `<package>_pb2` modules.
+
+    :param schema_path: directory of the `_pb2` modules. Defaults to the `TINDER_API_SCHEMA_PATH`
+        environment variable, or else the modules are imported from `sys.path`.
+    '''
+    def __init__(self, schema_path=None):
+        _require_protobuf()
+        self._schema_path = schema_path or os.environ.get('TINDER_API_SCHEMA_PATH')
+        self._modules = {}
+        self._lock = threading.Lock()
+
+
+    def module(self, package):
+        '''
+        :param package: protobuf package, ex: 'mediaservice'.
+
+        :return: the `<package>_pb2` module.
+
+        :raises ImportError: if the module is not found.
+        '''
+        module = self._modules.get(package)
+        if module is None:
+            with self._lock:
+                module = self._modules.get(package)
+                if module is None:
+                    module = self._modules[package] = self._import(package + '_pb2')
+        return module
+
+
+    def _import(self, module_name):
+        if self._schema_path is not None and self._schema_path not in sys.path:
+            # on the import path rather than loaded by filename, as `_pb2` modules import each other by name
+            sys.path.append(self._schema_path)
+        return importlib.import_module(module_name)
+
+
+    def message_class(self, schema):
+        '''
+        :param schema: `(package, message name)`, ex: `('mediaservice', 'ClientDataProto')`.
+
+        :return: the message class.
+
+        :raises ImportError: if the module or the message is not found.
+        '''
+        package, message_name = schema
+        module = self.module(package)
+        try:
+            return getattr(module, message_name)
+        except AttributeError:
+            raise ImportError('No message %s in %s' % (message_name, module.__name__), name=module.__name__) from None
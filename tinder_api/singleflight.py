@@ -0,0 +1,107 @@
+# coding=utf-8
+'''
+Coalescing of identical concurrent calls: while a call for a key is in flight,
+other callers with the same key wait for it and get a copy of its result,
+instead of making their own call.
+'''
+
+import threading
+from functools import partial
+
+from tinder_api.cache import copy_value
+
+
+class _Call(object):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    '''
+    Coalesces identical concurrent calls made from several threads.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+
+    def do(self, key, function):
+        '''
+        Calls `function`, or waits for the call already in flight for `key`.
+
+        :param key: hashable identifying the call.
+
+        :param function: function without arguments making the call.
+
+        :return: the result of the call, a copy of it for the waiting callers, see :func:`tinder_api.cache.copy_value`.
+            Its exception is raised to every waiting caller.
+        '''
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy_value(call.result)
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class AsyncSingleFlight(object):
+    '''
+    Coalesces identical concurrent calls made from several tasks of one event loop.
+    The call runs in a task of its own: cancelling one of the callers, even the first, does not cancel it for the others.
+    '''
+    def __init__(self):
+        self._calls = {}
+
+
+    async def do(self, key, function):
+        '''
+        Awaits `function()`, or the call already in flight for `key`.
+
+        :param key: hashable identifying the call.
+
+        :param function: coroutine function without arguments making the call.
+
+        :return: the result of the call, a copy of it for the waiting callers, see :func:`tinder_api.cache.copy_value`.
+            Its exception is raised to every waiting caller.
+        '''
+        import asyncio  # not imported at module level, Tinder_API imports this module
+        task = self._calls.get(key)
+        if task is not None:
+            return copy_value(await asyncio.shield(task))
+        # the call runs in its own task, so that no caller being cancelled cancels it for the others
+        task = self._calls[key] = asyncio.ensure_future(function())
+        task.add_done_callback(partial(self._done, key))
+        return await asyncio.shield(task)
+
+
+    def _done(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved when every caller was cancelled
+
+
+    def __len__(self):
+        return len(self._calls)
@@ -0,0 +1,396 @@
+# coding=utf-8
+'''
+Binary snapshots of formatted matches, so that a process can reload millions of matches at startup
+without fetching them again, parsing JSON or rebuilding the dicts of :method:`helpers.format_matches`.
+
+example: write_snapshot(helpers.format_matches(tinder_api.iter_matches()), 'matches.snapshot')
+         with Snapshot('matches.snapshot') as matches:
+             matches[person_id]['name']
+
+A snapshot file is laid out as:
+
+- a header: `MAGIC`, the format `VERSION`, the number of rows and a directory of the sections (name, type, offset, length).
+- a heap of UTF-8 strings: IDs, names, bios and dates, with photos and messages encoded as JSON.
+- fixed-width columns, one value per match: an offset in the heap and a length (-1 for `None`) per string field,
+  and `message_count`, `gender` and `age` as integers (`NULL_INTEGERS` for `None`).
+- an open addressing hash table of the person IDs (CRC-32, linear probing), to find a match without scanning.
+
+Numbers are little-endian and sections are 8-byte aligned. A :class:`Snapshot` maps the file read-only with `mmap`
+and reads the columns in place: opening one costs the same for a thousand or a million matches, and processes opening
+the same file share its pages in the OS page cache instead of each holding a copy of the matches.
+'''
+
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping
+
+from tinder_api.codec import get_codec
+
+MAGIC = b'TNDRSNAP'
+VERSION = 1
+
+# magic, version, header size, rows, number of sections
+_HEADER = struct.Struct('<8sHHQI4x')
+# name, type code, offset, length in bytes
+_SECTION = struct.Struct('<32s1s7xQQ')
+_ALIGNMENT = 8
+
+# fields of :method:`helpers.format_matches` stored as strings, person ID first
+STRING_FIELDS = ('person_id', 'match_id', 'name', 'bio', 'last_activity_date')
+JSON_FIELDS = ('photos', 'messages')
+# field -> `array` type code
+INTEGER_FIELDS = {'message_count': 'i', 'gender': 'b', 'age': 'h'}
+NULL_INTEGERS = {'i': -(1 << 31), 'b': -(1 << 7), 'h': -(1 << 15)}
+
+FIELDS = ('match_id', 'message_count', 'messages', 'last_activity_date', 'name', 'photos', 'bio', 'gender', 'age')
+
+_INDEX = 'person_id.index'
+_HEAP = 'heap'
+
+
+def _align(offset):
+    return offset + -offset % _ALIGNMENT
+
+
+def _sections():
+    '''
+    :return: `list` of `(name, type code)` of the columns of a snapshot, in file order.
+    '''
+    sections = []
+    for field in STRING_FIELDS + JSON_FIELDS:
+        sections.append((field + '.offset', 'Q'))
+        sections.append((field + '.length', 'i'))
+    sections.extend(INTEGER_FIELDS.items())
+    return sections
+
+
+def _index_slots(rows):
+    # a power of two at least twice the number of rows, so that probes stay short
+    slots = 8
+    while slots < 2 * rows:
+        slots <<= 1
+    return slots
+
+
+def _little_endian(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def write_snapshot(formatted_matches, path, codec='auto'):
+    '''
+    Writes formatted matches to a snapshot file, replacing it atomically if it exists.
+    Fields other than those of :method:`helpers.format_matches` are not saved.
+
+    :param formatted_matches: value from calling :method:`helpers.format_matches`, or any mapping of
+        person ID -> formatted match, ex: :func:`tinder_api.ingest.ingest` or :class:`tinder_api.match_index.MatchIndex`.
+
+    :param path: snapshot file.
+
+    :param codec: JSON codec of `photos` and `messages`, see :func:`tinder_api.codec.get_codec`.
+
+    :return: number of matches written.
+    '''
+    codec = get_codec(codec)
+    rows = len(formatted_matches)
+    if rows >= 0xffffffff:
+        raise ValueError('A snapshot holds less than 2**32 - 1 matches.')
+    sections = _sections()
+    columns = {name: array(typecode) for name, typecode in sections}
+    index = array('I', bytes(4 * _index_slots(rows)))
+    mask = len(index) - 1
+    header_size = _align(_HEADER.size + _SECTION.size * (len(sections) + 2))
+
+    temporary_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(temporary_path, 'wb') as snapshot_file:
+            snapshot_file.write(bytes(header_size))
+            # the heap is written as the matches are read, the columns are kept until the end
+            string_columns = [(columns[field + '.offset'].append, columns[field + '.length'].append) for field in STRING_FIELDS + JSON_FIELDS]
+            integer_columns = [(field, columns[field].append, NULL_INTEGERS[typecode]) for field, typecode in INTEGER_FIELDS.items()]
+            heap_size = 0
+            row = 0
+            for person_id, match in formatted_matches.items():
+                if not isinstance(person_id, str):
+                    raise ValueError('Person IDs must be strings, got %r.' % (person_id,))
+                values = [person_id] + [match.get(field) for field in STRING_FIELDS[1:]]
+                for field in JSON_FIELDS:
+                    value = match.get(field)
+                    values.append(None if value is None else codec.dumps(value))
+                chunks = []
+                for (append_offset, append_length), value in zip(string_columns, values):
+                    append_offset(heap_size)
+                    if value is None:
+                        append_length(-1)
+                        continue
+                    if isinstance(value, str):
+                        value = value.encode('utf-8')
+                    chunks.append(value)
+                    append_length(len(value))
+                    heap_size += len(value)
+                snapshot_file.write(b''.join(chunks))
+                for field, append, null in integer_columns:
+                    value = match.get(field)
+                    append(null if value is None else int(value))
+                slot = zlib.crc32(values[0].encode('utf-8')) & mask
+                while index[slot]:
+                    slot = (slot + 1) & mask
+                index[slot] = row + 1
+                row += 1
+            if row != rows:
+                raise ValueError('The matches changed while the snapshot was written.')
+
+            directory = [(_HEAP, b'B', header_size, heap_size)]
+            offset = header_size + heap_size
+            for name, typecode in sections + [(_INDEX, 'I')]:
+                column = _little_endian(index if name == _INDEX else columns[name])
+                padding = _align(offset) - offset
+                snapshot_file.write(bytes(padding))
+                offset += padding
+                column.tofile(snapshot_file)
+                directory.append((name, typecode.encode('ascii'), offset, column.itemsize * len(column)))
+                offset += column.itemsize * len(column)
+
+            snapshot_file.seek(0)
+            snapshot_file.write(_HEADER.pack(MAGIC, VERSION, header_size, rows, len(directory)))
+            for name, typecode, offset, length in directory:
+                snapshot_file.write(_SECTION.pack(name.encode('ascii'), typecode, offset, length))
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return rows
+
+
+class Snapshot(Mapping):
+    '''
+    Read-only, memory-mapped snapshot written by :func:`write_snapshot`.
+
+    Behaves like the `dict` returned by :method:`helpers.format_matches` (person ID -> formatted match),
+    in the order the matches were written. Each access decodes one match from the file;
+    use :method:`value` to read a single field, and :method:`column` for the integer columns.
+
+    Pickling a snapshot pickles its path, so that worker processes map the same file rather than copy it.
+
+    :param path: snapshot file.
+
+    :param codec: JSON codec of `photos` and `messages`, see :func:`tinder_api.codec.get_codec`.
+    '''
+    def __init__(self, path, codec='auto'):
+        if sys.byteorder == 'big':
+            raise ValueError('Snapshots are little-endian and can only be mapped on little-endian machines.')
+        self.path = path
+        self._codec_name = codec
+        self._codec = get_codec(codec)
+        self._view = self._heap = None
+        self._columns = {}
+        with open(path, 'rb') as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+
+    def _open(self):
+        size = len(self._mmap)
+        if size < _HEADER.size:
+            raise ValueError('%s is not a snapshot.' % self.path)
+        magic, version, header_size, rows, section_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not a snapshot.' % self.path)
+        if version > VERSION:
+            raise ValueError('%s is a snapshot of version %d, this version of tinder_api reads up to version %d.' % (self.path, version, VERSION))
+        if _HEADER.size + _SECTION.size * section_count > header_size or header_size > size:
+            raise ValueError('%s is truncated.' % self.path)
+        sections = {}
+        for position in range(section_count):
+            name, typecode, offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + _SECTION.size * position)
+            if offset + length > size:
+                raise ValueError('%s is truncated.' % self.path)
+            sections[name.rstrip(b'\0').decode('ascii')] = (typecode.decode('ascii'), offset, length)
+
+        self._rows = rows
+        self._view = memoryview(self._mmap)
+        heap_offset = sections[_HEAP][1]
+        self._heap = self._view[heap_offset:heap_offset + sections[_HEAP][2]]
+        self._columns = {}
+        for name, typecode in _sections() + [(_INDEX, 'I')]:
+            if name not in sections:
+                raise ValueError('%s has no %s column.' % (self.path, name))
+            _, offset, length = sections[name]
+            # zero copy: the column reads the mapped pages
+            self._columns[name] = self._view[offset:offset + length].cast(typecode)
+        if any(len(self._columns[name]) != rows for name, _ in _sections()):
+            raise ValueError('%s is truncated.' % self.path)
+        self._index = self._columns[_INDEX]
+        self._mask = len(self._index) - 1
+        self._offsets = [self._columns[field + '.offset'] for field in STRING_FIELDS + JSON_FIELDS]
+        self._lengths = [self._columns[field + '.length'] for field in STRING_FIELDS + JSON_FIELDS]
+
+
+    def close(self):
+        '''
+        Unmaps the file. Matches already read stay valid, the columns returned by :method:`column` do not.
+        '''
+        if self._mmap.closed:
+            return
+        for view in list(self._columns.values()) + [self._heap, self._view]:
+            if view is not None:
+                view.release()
+        self._columns = {}
+        self._view = self._heap = None
+        self._offsets = self._lengths = []
+        self._mmap.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def __reduce__(self):
+        return Snapshot, (self.path, self._codec_name)
+
+
+    # MAPPING
+
+    def __len__(self):
+        return self._rows
+
+
+    def __iter__(self):
+        for row in range(self._rows):
+            yield self.person_id(row)
+
+
+    def __contains__(self, person_id):
+        return self.row_of(person_id) is not None
+
+
+    def __getitem__(self, person_id):
+        row = self.row_of(person_id)
+        if row is None:
+            raise KeyError(person_id)
+        return self.row(row)
+
+
+    def items(self):
+        # decodes each match once, rather than once to list the keys and once to find the match
+        for row in range(self._rows):
+            yield self.person_id(row), self.row(row)
+
+
+    def values(self):
+        for row in range(self._rows):
+            yield self.row(row)
+
+
+    # ROWS
+
+    def row_of(self, person_id):
+        '''
+        :return: position of the match of `person_id` in the snapshot, `None` if it is not there.
+        '''
+        if not isinstance(person_id, str):
+            return None
+        key = person_id.encode('utf-8')
+        offsets, lengths = self._offsets[0], self._lengths[0]
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            row = self._index[slot] - 1
+            if row < 0:
+                return None
+            if lengths[row] == len(key) and self._heap[offsets[row]:offsets[row] + len(key)] == key:
+                return row
+            slot = (slot + 1) & self._mask
+
+
+    def person_id(self, row):
+        '''
+        :return: person ID of the match at position `row`.
+        '''
+        return self._string(0, row)
+
+
+    def row(self, row):
+        '''
+        :return: formatted match at position `row`, as returned by :method:`helpers.format_matches`.
+        '''
+        if not 0 <= row < self._rows:
+            raise IndexError(row)
+        match = {}
+        for field in FIELDS:
+            match[field] = self._value(row, field)
+        return match
+
+
+    def value(self, person_id, field):
+        '''
+        Reads a single field of a match, without decoding the others.
+
+        :param person_id: key of the match in :method:`helpers.format_matches`.
+
+        :param field: one of `FIELDS`.
+        '''
+        if field not in FIELDS:
+            raise KeyError(field)
+        row = self.row_of(person_id)
+        if row is None:
+            raise KeyError(person_id)
+        return self._value(row, field)
+
+
+    def column(self, field):
+        '''
+        Integer column, read in place from the file. Missing values are `NULL_INTEGERS[typecode]`.
+
+        example: numpy.frombuffer(snapshot.column('age'), dtype=numpy.int16)
+
+        :param field: 'message_count', 'gender' or 'age'.
+
+        :return: `memoryview` of the column (not a copy), valid until the snapshot is closed.
+        '''
+        if field not in INTEGER_FIELDS:
+            raise KeyError(field)
+        return self._columns[field]
+
+
+    def to_formatted_matches(self):
+        '''
+        :return: `dict` of every match, as returned by :method:`helpers.format_matches`.
+        '''
+        return dict(self.items())
+
+
+    def _string(self, position, row):
+        length = self._lengths[position][row]
+        if length < 0:
+            return None
+        offset = self._offsets[position][row]
+        return str(self._heap[offset:offset + length], 'utf-8')
+
+
+    def _value(self, row, field):
+        if field in INTEGER_FIELDS:
+            value = self._columns[field][row]
+            return None if value == NULL_INTEGERS[INTEGER_FIELDS[field]] else value
+        if field in JSON_FIELDS:
+            position = len(STRING_FIELDS) + JSON_FIELDS.index(field)
+            length = self._lengths[position][row]
+            if length < 0:
+                return None
+            offset = self._offsets[position][row]
+            return self._codec.loads(self._heap[offset:offset + length].tobytes())
+        return self._string(STRING_FIELDS.index(field), row)
@@ -0,0 +1,175 @@
+# coding=utf-8
+'''
+Sorting of formatted matches: multi-key ordering, top-k selection and
+sorted views kept up to date as matches change.
+
+Sort keys are given as a field name (descending, like :method:`helpers.sort_by_value`),
+or as a `(field, 'asc' | 'desc')` pair. Matches where a field is `None` or missing
+are placed last for that key, whatever its direction, unless `nones='first'`.
+'''
+
+import heapq
+from bisect import bisect_left, insort
+
+
+class _Reversed(object):
+    '''
+    Inverts the ordering of a value that cannot be negated, ex: a string.
+    '''
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def _parse_keys(keys):
+    if isinstance(keys, str):
+        keys = [keys]
+    parsed = []
+    for key in keys:
+        field, direction = (key, 'desc') if isinstance(key, str) else key
+        if direction not in ('asc', 'desc'):
+            raise ValueError("Sort direction of '%s' must be 'asc' or 'desc', got %r." % (field, direction))
+        parsed.append((field, direction == 'desc'))
+    return parsed
+
+
+def make_sort_key(keys, nones='last'):
+    '''
+    Builds a function returning the sort key of a formatted match, sorting in ascending order.
+
+    :param keys: field name, or list of field names and `(field, 'asc' | 'desc')` pairs.
+
+    :param nones: 'last' or 'first', where to put matches whose field is `None`.
+
+    :return: function of a formatted match.
+    '''
+    return _make_sort_key(_parse_keys(keys), nones)
+
+
+def _make_sort_key(parsed, nones):
+    none_rank, value_rank = (1, 0) if nones == 'last' else (0, 1)
+
+    def sort_key(match):
+        key = []
+        for field, descending in parsed:
+            value = match.get(field)
+            if value is None:
+                key.append((none_rank, 0))
+            elif not descending:
+                key.append((value_rank, value))
+            elif isinstance(value, (int, float)):
+                key.append((value_rank, -value))
+            else:
+                key.append((value_rank, _Reversed(value)))
+        return tuple(key)
+    return sort_key
+
+
+def sort_matches(formatted_matches, keys, limit=None, nones='last'):
+    '''
+    Sorts matches on one or more fields.
+
+    example: sort_matches(formatted_matches, [('message_count', 'desc'), ('name', 'asc')], limit=20)
+
+    :param formatted_matches: value from calling :method:`helpers.format_matches`.
+
+    :param keys: field name, or list of field names and `(field, 'asc' | 'desc')` pairs.
+
+    :param limit: only return the first `limit` matches. Uses a heap instead of a full sort.
+
+    :param nones: 'last' or 'first', where to put matches whose field is `None`.
+
+    :return: `list` of `(person_id, formatted_match)`.
+    '''
+    parsed = _parse_keys(keys)
+    items = list(formatted_matches.items())
+    if limit is not None and len(parsed) > 1:
+        sort_key = _make_sort_key(parsed, nones)
+        return heapq.nsmallest(limit, items, key=lambda item: sort_key(item[1]))
+    # one stable sort per key, from the least significant one, avoids building composite keys
+    for field, descending in reversed(parsed):
+        items = _sort_on(items, field, descending, nones, limit)
+    return items
+
+
+def _sort_on(items, field, descending, nones, limit=None):
+    present = [item for item in items if item[1].get(field) is not None]
+    missing = [item for item in items if item[1].get(field) is None]
+    value = lambda item: item[1][field]
+    if limit is None:
+        present.sort(key=value, reverse=descending)
+    else:
+        present = (heapq.nlargest if descending else heapq.nsmallest)(limit, present, key=value)
+    items = present + missing if nones == 'last' else missing + present
+    return items if limit is None else items[:limit]
+
+
+class SortedMatchView(object):
+    '''
+    Matches kept sorted on one or more fields, updated one match at a time
+    instead of re-sorting everything.
+
+    example: most_active = SortedMatchView(formatted_matches, 'last_activity_date')
+             most_active.upsert(person_id, formatted_match)
+             most_active.top(20)
+
+    :param formatted_matches: initial value from calling :method:`helpers.format_matches`.
+
+    :param keys: field name, or list of field names and `(field, 'asc' | 'desc')` pairs.
+
+    :param nones: 'last' or 'first', where to put matches whose field is `None`.
+    '''
+    def __init__(self, formatted_matches=None, keys='last_activity_date', nones='last'):
+        self._sort_key = make_sort_key(keys, nones)
+        self._matches = {}
+        self._keys = {}
+        self._sorted = []  # sorted (sort key, person ID)
+        if formatted_matches:
+            for person_id, match in formatted_matches.items():
+                self._matches[person_id] = match
+                self._keys[person_id] = self._sort_key(match)
+            self._sorted = sorted((key, person_id) for person_id, key in self._keys.items())
+
+
+    def upsert(self, person_id, match):
+        '''
+        Inserts or replaces a match, and moves it to its new position.
+        '''
+        self.delete(person_id)
+        key = self._sort_key(match)
+        self._matches[person_id] = match
+        self._keys[person_id] = key
+        insort(self._sorted, (key, person_id))
+
+
+    def delete(self, person_id):
+        '''
+        Removes a match. Does nothing if it is not in the view.
+        '''
+        key = self._keys.pop(person_id, None)
+        if key is None:
+            return
+        del self._matches[person_id]
+        del self._sorted[bisect_left(self._sorted, (key, person_id))]
+
+
+    def top(self, limit):
+        '''
+        :return: `list` of the first `limit` `(person_id, formatted_match)`.
+        '''
+        return [(person_id, self._matches[person_id]) for _, person_id in self._sorted[:limit]]
+
+
+    def __iter__(self):
+        return ((person_id, self._matches[person_id]) for _, person_id in self._sorted)
+
+
+    def __len__(self):
+        return len(self._sorted)
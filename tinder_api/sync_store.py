@@ -0,0 +1,412 @@
+# coding=utf-8
+'''
+Local SQLite copy of your matches, persons and messages, kept up to date with :method:`Tinder_API.get_updates`.
+
+The `last_activity_date` cursor of the last update applied is stored with the data,
+so each run only fetches what changed since the previous one instead of every match again.
+Queries then run against the local database.
+'''
+
+import sqlite3
+import threading
+
+from tinder_api.codec import get_codec
+
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS persons (
+    person_id TEXT PRIMARY KEY,
+    name TEXT,
+    gender INTEGER,
+    birth_date TEXT,
+    bio TEXT,
+    raw BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS persons_name ON persons (name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    person_id TEXT,
+    created_date TEXT,
+    last_activity_date TEXT,
+    message_count INTEGER,
+    raw BLOB
+);
+CREATE INDEX IF NOT EXISTS matches_person_id ON matches (person_id);
+CREATE INDEX IF NOT EXISTS matches_last_activity_date ON matches (last_activity_date);
+
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,
+    match_id TEXT NOT NULL,
+    sender_id TEXT,
+    recipient_id TEXT,
+    sent_date TEXT,
+    message TEXT,
+    raw BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_match_id_sent_date ON messages (match_id, sent_date);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+_UPSERT_PERSON = '''
+INSERT INTO persons (person_id, name, gender, birth_date, bio, raw) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (person_id) DO UPDATE SET
+    name = excluded.name, gender = excluded.gender, birth_date = excluded.birth_date, bio = excluded.bio, raw = excluded.raw
+'''
+
+_UPSERT_MATCH = '''
+INSERT INTO matches (match_id, person_id, created_date, last_activity_date, message_count, raw) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (match_id) DO UPDATE SET
+    person_id = COALESCE(excluded.person_id, person_id),
+    created_date = COALESCE(excluded.created_date, created_date),
+    last_activity_date = COALESCE(excluded.last_activity_date, last_activity_date),
+    message_count = COALESCE(excluded.message_count, message_count),
+    raw = COALESCE(excluded.raw, raw)
+'''
+
+_UPSERT_MESSAGE = '''
+INSERT INTO messages (message_id, match_id, sender_id, recipient_id, sent_date, message, raw) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (message_id) DO UPDATE SET
+    match_id = excluded.match_id, sender_id = excluded.sender_id, recipient_id = excluded.recipient_id,
+    sent_date = excluded.sent_date, message = excluded.message, raw = excluded.raw
+'''
+
+CURSOR_KEY = 'last_activity_date'
+
+
+class SyncStore(object):
+    '''
+    SQLite database of matches, persons and messages, in WAL mode so that readers in other processes
+    don't block the updates. Thread-safe. Every update is applied in a single transaction.
+
+    example: with SyncStore('tinder.sqlite') as store:
+                 store.sync(tinder_api)  # only fetches what changed since the last run
+                 store.matches(active_since='2020-05-01', limit=20)
+
+    :param path: database file, created if missing. ':memory:' for a temporary database.
+
+    :param codec: JSON codec of the raw objects stored, see :func:`tinder_api.codec.get_codec`.
+    '''
+    def __init__(self, path, codec='auto'):
+        self._codec = get_codec(codec)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        # durable at each checkpoint rather than each commit, which WAL keeps consistent
+        self._connection.execute('PRAGMA synchronous = NORMAL')
+        # not in a transaction, `executescript` commits first
+        self._connection.executescript(SCHEMA)
+        self._connection.execute('INSERT OR IGNORE INTO state (key, value) VALUES (?, ?)', ('schema_version', str(SCHEMA_VERSION)))
+
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def _transaction(self):
+        return _Transaction(self._connection, self._lock)
+
+
+    # CURSOR
+
+    @property
+    def last_activity_date(self):
+        '''
+        Cursor of the last update applied, to pass to :method:`Tinder_API.get_updates`. `None` if never synced.
+        '''
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM state WHERE key = ?', (CURSOR_KEY,)).fetchone()
+        return None if row is None else row[0]
+
+
+    def _set_cursor(self, connection, last_activity_date):
+        connection.execute('INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)', (CURSOR_KEY, last_activity_date))
+
+
+    # UPDATES
+
+    def sync(self, tinder_api):
+        '''
+        Fetches the updates since the stored cursor, and applies them. The first sync fetches everything.
+        With :class:`tinder_api.async_api.AsyncTinder_API`, call
+        `store.apply_updates(await tinder_api.get_updates(store.last_activity_date))` instead.
+
+        :param tinder_api: authenticated :class:`Tinder_API`.
+
+        :return: see :method:`apply_updates`, or the error `dict` of the request.
+        '''
+        updates = tinder_api.get_updates(self.last_activity_date)
+        if 'error' in updates:
+            return updates
+        return self.apply_updates(updates)
+
+
+    def apply_updates(self, updates):
+        '''
+        Applies the response of :method:`Tinder_API.get_updates`, in one transaction:
+        matches and their persons are inserted or updated, the messages of `matches` and `inbox` inserted,
+        the fields of the matches without a `person` merged into the stored ones (and ignored for matches not stored yet),
+        the matches listed in `blocks` deleted with their messages, and the cursor moved to the response's `last_activity_date`.
+
+        :param updates: value from calling :method:`Tinder_API.get_updates`.
+
+        :return: `dict` of the number of 'matches', 'messages' and 'blocks' applied.
+        '''
+        matches = updates.get('matches', [])
+        messages = list(updates.get('inbox', []))
+        for match in matches:
+            messages.extend(self._match_messages(match))
+        blocks = updates.get('blocks', [])
+        with self._transaction() as connection:
+            self._upsert_matches(connection, matches)
+            self._upsert_messages(connection, messages)
+            self._delete_matches(connection, blocks)
+            if updates.get('last_activity_date'):
+                self._set_cursor(connection, updates['last_activity_date'])
+        return {'matches': len(matches), 'messages': len(messages), 'blocks': len(blocks)}
+
+
+    def load_matches(self, matches, last_activity_date=None):
+        '''
+        Inserts or updates many matches in one transaction, ex: a first full load from :method:`Tinder_API.iter_matches`.
+
+        :param matches: raw matches, with their `person` and optionally their `messages`.
+
+        :param last_activity_date: cursor to store once loaded, ex: the `last_activity_date` of a `get_updates`
+            response fetched just before listing the matches. `None` keeps the current cursor.
+
+        :return: number of matches loaded.
+        '''
+        count = 0
+        with self._transaction() as connection:
+            # in batches, so that a generator of pages is not held in memory at once
+            batch = []
+            for match in matches:
+                batch.append(match)
+                if len(batch) == 1000:
+                    count += self._load_batch(connection, batch)
+                    batch = []
+            count += self._load_batch(connection, batch)
+            if last_activity_date is not None:
+                self._set_cursor(connection, last_activity_date)
+        return count
+
+
+    def _load_batch(self, connection, matches):
+        self._upsert_matches(connection, matches)
+        self._upsert_messages(connection, [message for match in matches for message in self._match_messages(match)])
+        return len(matches)
+
+
+    def delete_match(self, match_id):
+        '''
+        Deletes a match and its messages, ex: after an unmatch.
+        '''
+        with self._transaction() as connection:
+            self._delete_matches(connection, [match_id])
+
+
+    @staticmethod
+    def _match_messages(match):
+        messages = match.get('messages') or []
+        for message in messages:
+            if message.get('match_id') is None:
+                message = dict(message, match_id=match.get('_id'))
+            yield message
+
+
+    def _upsert_matches(self, connection, matches):
+        dumps, loads = self._codec.dumps, self._codec.loads
+        persons, stored = [], {}
+        for match in matches:
+            match_id = match.get('_id')
+            # the person and messages are stored in their own tables
+            fields = {key: value for key, value in match.items() if key not in ('person', 'messages')}
+            person = match.get('person')
+            if person is not None:
+                persons.append((person.get('_id'), person.get('name'), person.get('gender'), person.get('birth_date'), person.get('bio'), dumps(person)))
+                stored[match_id] = (person.get('_id'), fields)
+                continue
+            # matches without a `person` in updates only carry what changed, merged into the stored match
+            if match_id not in stored:
+                row = connection.execute('SELECT person_id, raw FROM matches WHERE match_id = ?', (match_id,)).fetchone()
+                if row is None or row[1] is None:
+                    continue  # not stored yet, nothing to merge into
+                stored[match_id] = (row[0], loads(row[1]))
+            stored[match_id][1].update(fields)
+        connection.executemany(_UPSERT_PERSON, persons)
+        connection.executemany(_UPSERT_MATCH, [
+            (match_id, person_id, fields.get('created_date'), fields.get('last_activity_date'), fields.get('message_count'), dumps(fields))
+            for match_id, (person_id, fields) in stored.items()
+        ])
+
+
+    def _upsert_messages(self, connection, messages):
+        dumps = self._codec.dumps
+        connection.executemany(_UPSERT_MESSAGE, [
+            (message.get('_id'), message.get('match_id'), message.get('from'), message.get('to'), message.get('sent_date'), message.get('message'), dumps(message))
+            for message in messages if message.get('_id') is not None
+        ])
+
+
+    def _delete_matches(self, connection, match_ids):
+        if not match_ids:
+            return
+        parameters = [(match_id,) for match_id in match_ids]
+        person_ids = [row for match_id in parameters
+                      for row in connection.execute('SELECT person_id FROM matches WHERE match_id = ? AND person_id IS NOT NULL', match_id)]
+        connection.executemany('DELETE FROM messages WHERE match_id = ?', parameters)
+        connection.executemany('DELETE FROM matches WHERE match_id = ?', parameters)
+        # persons left without a match
+        connection.executemany('DELETE FROM persons WHERE person_id = ?1 AND NOT EXISTS (SELECT 1 FROM matches WHERE person_id = ?1)', person_ids)
+
+
+    # QUERIES
+
+    def count(self, table='matches'):
+        '''
+        :param table: 'matches', 'persons' or 'messages'.
+
+        :return: number of rows.
+        '''
+        if table not in ('matches', 'persons', 'messages'):
+            raise ValueError("table must be 'matches', 'persons' or 'messages', got %r." % (table,))
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM %s' % table).fetchone()[0]
+
+
+    def get_match(self, match_id, messages=False):
+        '''
+        :param match_id: ID of the match.
+
+        :param messages: also include its messages, oldest first.
+
+        :return: raw match with its `person`, as returned by the API, or `None`.
+        '''
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT matches.raw, persons.raw FROM matches LEFT JOIN persons USING (person_id) WHERE match_id = ? AND matches.raw IS NOT NULL',
+                (match_id,)).fetchone()
+        if row is None:
+            return None
+        match = self._match(*row)
+        if messages:
+            match['messages'] = self.messages(match_id)
+        return match
+
+
+    def get_person(self, person_id):
+        '''
+        :return: raw person, or `None`.
+        '''
+        with self._lock:
+            row = self._connection.execute('SELECT raw FROM persons WHERE person_id = ?', (person_id,)).fetchone()
+        return None if row is None else self._codec.loads(row[0])
+
+
+    def matches(self, active_since=None, active_until=None, name=None, limit=None):
+        '''
+        Matches, most recently active first.
+
+        example: helpers.format_matches(store.matches(active_since='2020-05-01'))
+
+        :param active_since: earliest last activity date, inclusive. ex: '2020-05-01' or '2020-05-01T10:28:13.392Z'
+
+        :param active_until: latest last activity date, exclusive.
+
+        :param name: name of the person, compared ignoring case.
+
+        :param limit: maximum number of matches.
+
+        :return: `list` of raw matches with their `person`, without their messages.
+        '''
+        conditions, parameters = ['matches.raw IS NOT NULL'], []
+        if active_since is not None:
+            conditions.append('last_activity_date >= ?')
+            parameters.append(active_since)
+        if active_until is not None:
+            conditions.append('last_activity_date < ?')
+            parameters.append(active_until)
+        if name is not None:
+            conditions.append('persons.name = ? COLLATE NOCASE')
+            parameters.append(name)
+        query = ('SELECT matches.raw, persons.raw FROM matches LEFT JOIN persons USING (person_id) WHERE %s '
+                 'ORDER BY last_activity_date DESC' % ' AND '.join(conditions))
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        return [self._match(*row) for row in rows]
+
+
+    def messages(self, match_id, since=None, limit=None):
+        '''
+        Messages of a match, oldest first.
+
+        :param match_id: ID of the match.
+
+        :param since: earliest sent date, inclusive.
+
+        :param limit: only the `limit` most recent messages.
+
+        :return: `list` of raw messages.
+        '''
+        query, parameters = 'SELECT raw FROM messages WHERE match_id = ?', [match_id]
+        if since is not None:
+            query += ' AND sent_date >= ?'
+            parameters.append(since)
+        query += ' ORDER BY sent_date DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        return [self._codec.loads(row[0]) for row in reversed(rows)]
+
+
+    def _match(self, match_raw, person_raw):
+        match = self._codec.loads(match_raw)
+        if person_raw is not None:
+            match['person'] = self._codec.loads(person_raw)
+        return match
+
+
+class _Transaction(object):
+    '''
+    Holds the store's lock, and commits on success or rolls back on error.
+    '''
+    def __init__(self, connection, lock):
+        self._connection = connection
+        self._lock = lock
+
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._connection.execute('BEGIN IMMEDIATE')
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._connection
+
+
+    def __exit__(self, exc_type, *exc_info):
+        try:
+            self._connection.execute('ROLLBACK' if exc_type is not None else 'COMMIT')
+        finally:
+            self._lock.release()
@@ -0,0 +1,147 @@
+# coding=utf-8
+'''
+Parsing and formatting of Tinder timestamps, one at a time or for whole columns.
+
+Tinder timestamps are ISO 8601 UTC strings, ex: '2017-07-09T10:28:13.392Z'.
+They are parsed to naive `datetime` objects in UTC, converted first if they have an offset. Batch functions take
+"now" once for the whole batch, so every duration has the same reference,
+and convert whole columns with NumPy when it is installed.
+'''
+
+from array import array
+from datetime import datetime, timezone
+
+EPOCH = datetime(1970, 1, 1)
+_FALLBACK_FORMATS = ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                     '%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z')
+
+
+def utc_now():
+    '''
+    :return: the current time, as a naive `datetime` in UTC.
+    '''
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_timestamp(timestamp):
+    '''
+    Converts a Tinder timestamp to a `datetime`.
+
+    :param timestamp: ex: '2017-07-09T10:28:13.392Z', or with an offset: '2017-07-09T12:28:13.392+02:00'
+
+    :return: naive `datetime` in UTC, or `None` if `timestamp` is empty.
+    '''
+    if not timestamp:
+        return None
+    try:
+        # fast path, `fromisoformat` is implemented in C but only accepts the 'Z' suffix from Python 3.11
+        parsed = datetime.fromisoformat(timestamp[:-1] if timestamp[-1] == 'Z' else timestamp)
+    except ValueError:
+        parsed = None
+    for timestamp_format in _FALLBACK_FORMATS if parsed is None else ():
+        try:
+            parsed = datetime.strptime(timestamp, timestamp_format)
+            break
+        except ValueError:
+            pass
+    if parsed is None:
+        raise ValueError('Unknown timestamp format: %r' % timestamp)
+    return parsed if parsed.tzinfo is None else parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_epoch(timestamp):
+    '''
+    :param timestamp: ex: '2017-07-09T10:28:13.392Z'
+
+    :return: seconds since the epoch (`float`), NaN if `timestamp` is empty.
+    '''
+    parsed = parse_timestamp(timestamp)
+    return float('nan') if parsed is None else (parsed - EPOCH).total_seconds()
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def to_epoch_array(timestamps):
+    '''
+    Converts a column of timestamps to seconds since the epoch, with :method:`to_datetime64` if NumPy is installed.
+
+    :param timestamps: iterable of Tinder timestamps.
+
+    :return: `numpy.ndarray` of `float64`, or `array('d')` without NumPy. NaN where a timestamp is empty.
+    '''
+    np = _numpy()
+    if np is None:
+        return array('d', [to_epoch(timestamp) for timestamp in timestamps])
+    return (to_datetime64(timestamps) - np.datetime64(0, 'ms')) / np.timedelta64(1, 's')
+
+
+def to_datetime64(timestamps):
+    '''
+    Converts a column of timestamps to a NumPy `datetime64[ms]` array, parsed by NumPy in a single call.
+    Timestamps not ending with 'Z' are normalized by :func:`parse_timestamp` first. Requires `numpy`.
+
+    :param timestamps: iterable of Tinder timestamps.
+
+    :return: `numpy.ndarray` of `datetime64[ms]`, NaT where a timestamp is empty.
+    '''
+    import numpy as np
+    return np.array([(timestamp[:-1] if timestamp[-1] == 'Z' else parse_timestamp(timestamp).isoformat()) if timestamp else 'NaT'
+                     for timestamp in timestamps], dtype='datetime64[ms]')
+
+
+def seconds_since(timestamps, now=None):
+    '''
+    Seconds elapsed since each timestamp, with :method:`to_datetime64` if NumPy is installed.
+
+    :param timestamps: iterable of Tinder timestamps.
+
+    :param now: naive `datetime` in UTC. Defaults to now, taken once for the whole batch.
+
+    :return: `numpy.ndarray` of `float64`, or `array('d')` without NumPy. NaN where a timestamp is empty.
+    '''
+    now = now or utc_now()
+    np = _numpy()
+    if np is None:
+        reference = (now - EPOCH).total_seconds()
+        return array('d', [reference - epoch for epoch in to_epoch_array(timestamps)])
+    return (np.datetime64(now, 'us') - to_datetime64(timestamps)) / np.timedelta64(1, 's')
+
+
+def seconds_in_words(seconds, include_seconds=False):
+    '''
+    Formats a duration like :method:`helpers.how_long_in_words`.
+
+    :param seconds: duration in seconds.
+
+    :param include_seconds: whether to include seconds or not.
+
+    :return: ex: '3 days, 4 hrs 05 min'
+    '''
+    days, secs = divmod(int(seconds // 1), 86400)
+    m, s = divmod(secs, 60)
+    h, m = divmod(m, 60)
+    how_long = ("%d days, %d hrs %02d min" % (days, h, m))
+    if include_seconds:
+        how_long = ("%s %02d s" % (how_long, s))
+    return how_long
+
+
+def how_long_in_words_since_all(timestamps, now=None, include_seconds=False):
+    '''
+    Time elapsed since each timestamp, in words.
+
+    :param timestamps: iterable of Tinder timestamps.
+
+    :param now: naive `datetime` in UTC. Defaults to now, taken once for the whole batch.
+
+    :param include_seconds: whether to include seconds or not.
+
+    :return: `list` of durations in words, `None` where a timestamp is empty.
+    '''
+    return [None if elapsed != elapsed else seconds_in_words(elapsed, include_seconds) for elapsed in seconds_since(timestamps, now)]
@@ -0,0 +1,231 @@
+# coding=utf-8
+'''
+API token lifecycle: the token is refreshed in the background before it expires,
+and shared between processes through a locked cache file, so that a pool of workers
+authenticates once instead of once per process.
+'''
+
+import inspect
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# seconds an API token is valid for, Tinder does not send it
+API_TOKEN_LIFETIME = 24 * 3600
+
+
+class _FileLock(object):
+    '''
+    Exclusive lock between processes, held on a `.lock` file next to the token cache.
+    '''
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+
+
+    def __enter__(self):
+        self._file = open(self._path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class TokenManager(object):
+    '''
+    Keeps the API token of a :class:`tinder_api.api.Tinder_API` valid.
+
+    The token is refreshed from the refresh token `refresh_margin` seconds before it expires, by a
+    background timer. With a `cache_path`, the current token is read from and written to that file
+    under a lock: the first process due for a refresh gets a new token, the others adopt it.
+    New tokens replace the client's headers at once, requests already in flight keep the previous ones.
+
+    Usually created with :method:`tinder_api.api.Tinder_API.manage_token`.
+
+    :param tinder_api: client whose token is managed, :class:`Tinder_API` or :class:`AsyncTinder_API`.
+
+    :param refresh_token: obtained from :method:`tinder_api.api.Tinder_API.get_refresh_token`.
+
+    :param cache_path: file shared by the processes using the same account, `None` to not share the token.
+
+    :param lifetime: seconds an API token is valid for.
+
+    :param refresh_margin: seconds before expiry at which the token is refreshed.
+
+    :param retry_interval: seconds before trying again after a failed refresh.
+
+    :param clock: function returning the current time in seconds since the epoch, as `time.time`.
+    '''
+    def __init__(self, tinder_api, refresh_token, cache_path=None, lifetime=API_TOKEN_LIFETIME, refresh_margin=3600, retry_interval=60, clock=time.time):
+        self._tinder_api = tinder_api
+        self._refresh_token = refresh_token
+        self._cache_path = cache_path
+        self._lifetime = lifetime
+        self._refresh_margin = refresh_margin
+        self._retry_interval = retry_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._timer = None
+        self._stopped = False
+        self._client = None
+        self.api_token = None
+        self.expires_at = 0.0
+        self.last_error = None
+
+
+    def start(self):
+        '''
+        Authenticates the client, with the cached token if still valid, and schedules the next refresh.
+        Blocks until authenticated: :method:`tinder_api.async_api.AsyncTinder_API.manage_token` runs it in an executor.
+
+        :return: the API token.
+        '''
+        self._stopped = False
+        cached = self._read_cache()
+        if cached is not None and not self._is_due(cached['expires_at']):
+            self._apply(cached)
+        else:
+            self.refresh()
+        self._schedule()
+        return self.api_token
+
+
+    def stop(self):
+        '''
+        Cancels the background refresh.
+        '''
+        with self._lock:
+            self._stopped = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if self._client is not None and self._client is not self._tinder_api:
+            self._client.close()
+            self._client = None
+
+
+    def refresh(self, force=False):
+        '''
+        Gets a new API token, unless another process already stored a token that is not due for a refresh.
+
+        :param force: get a new token even if the cached one is still valid, ex: after it was revoked.
+
+        :return: the API token.
+        '''
+        with self._lock:
+            if self._cache_path is None:
+                self._apply(self._request_token())
+                return self.api_token
+            with _FileLock(self._cache_path + '.lock'):
+                cached = self._read_cache()
+                if cached is not None and not force and not self._is_due(cached['expires_at']):
+                    self._apply(cached)
+                else:
+                    token = self._request_token()
+                    self._write_cache(token)
+                    self._apply(token)
+            return self.api_token
+
+
+    def seconds_left(self):
+        '''
+        :return: seconds before the current token expires.
+        '''
+        return self.expires_at - self._clock()
+
+
+    def _is_due(self, expires_at):
+        return expires_at - self._clock() <= self._refresh_margin
+
+
+    def _apply(self, token):
+        self.api_token = token['api_token']
+        self.expires_at = token['expires_at']
+        self._refresh_token = token.get('refresh_token') or self._refresh_token
+        self._tinder_api._set_api_token(self.api_token)
+
+
+    def _request_token(self):
+        if self._client is None:
+            # the refresh runs on the timer thread, so an asynchronous client refreshes with a synchronous one
+            if inspect.iscoroutinefunction(self._tinder_api._send):
+                from tinder_api.api import Tinder_API
+                self._client = Tinder_API(host=self._tinder_api._host)
+            else:
+                self._client = self._tinder_api
+        data = {'refresh_token': self._refresh_token}
+        response_body = self._client.custom_request(self._client._endpoints.auth_api_path + '/sms', http_verb='POST', data=data)
+        api_token = response_body.get('data', {}).get('api_token')
+        if not api_token:
+            raise RuntimeError('Could not refresh the API token: %s' % (response_body.get('error') or response_body,))
+        return {
+            'api_token': api_token,
+            'refresh_token': response_body['data'].get('refresh_token') or self._refresh_token,
+            'expires_at': self._clock() + self._lifetime,
+        }
+
+
+    def _read_cache(self):
+        if self._cache_path is None:
+            return None
+        try:
+            with open(self._cache_path) as cache_file:
+                token = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(token, dict) or not token.get('api_token') or 'expires_at' not in token:
+            return None
+        return token
+
+
+    def _write_cache(self, token):
+        # written to a temporary file then renamed, so readers never see a partial file
+        temporary_path = '%s.%d.tmp' % (self._cache_path, os.getpid())
+        descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as cache_file:
+            json.dump(token, cache_file)
+        os.replace(temporary_path, self._cache_path)
+
+
+    def _schedule(self, delay=None):
+        with self._lock:
+            if self._stopped:
+                return
+            if delay is None:
+                delay = max(0.0, self.seconds_left() - self._refresh_margin)
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+    def _on_timer(self):
+        try:
+            self.refresh()
+            self.last_error = None
+        except Exception as e:
+            # the current token may still be valid for a while, try again soon
+            self.last_error = e
+            self._schedule(self._retry_interval)
+            return
+        self._schedule()
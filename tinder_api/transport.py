@@ -0,0 +1,370 @@
+# coding=utf-8
+'''
+HTTP transports used by :class:`tinder_api.api.Tinder_API`.
+
+A transport is any object with a `request(method, url, headers=None, data=None)`
+method returning a response object (`status_code`, `headers`, `content`, `json()`),
+and a `close()` method releasing its resources. Transports supporting streamed
+responses also accept `stream=True`, and return a response with `iter_content(chunk_size)`
+and `close()` methods.
+
+Asynchronous transports have a coroutine `request()` and a coroutine `close()`. When they support
+streamed responses, the response has an asynchronous `aiter_content(chunk_size)` and a coroutine `aclose()` instead.
+'''
+
+import gzip
+import json
+
+
+class RequestsTransport(object):
+    '''
+    Default transport, backed by a long-lived :class:`requests.Session`.
+
+    Connections are kept alive and pooled per host, so consecutive calls
+    reuse the same TCP+TLS connection instead of opening a new one each time.
+
+    :param pool_size: maximum number of connections kept alive per host.
+
+    :param pool_block: when the pool is full, wait for a free connection
+        instead of opening a throw-away one.
+
+    :param session: an existing :class:`requests.Session` to use.
+    '''
+    def __init__(self, pool_size=10, pool_block=False, session=None):
+        # requests is imported here rather than at module level, it dominates the import time of the package
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_size, pool_block=pool_block)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        '''
+        Sends a request over the pooled session.
+
+        :param method: HTTP verb, upper case.
+
+        :param url: absolute URL.
+
+        :param headers: request headers.
+
+        :param data: request body.
+
+        :param stream: return as soon as the headers are received, the body is read with `iter_content`.
+
+        :return: :class:`requests.Response`
+        '''
+        return self._session.request(method, url, headers=headers, data=data, stream=stream)
+
+
+    def close(self):
+        '''
+        Closes every pooled connection.
+        '''
+        self._session.close()
+
+
+class BufferedResponse(object):
+    '''
+    Fully read response, as returned by the asynchronous transports.
+
+    :param status_code: HTTP status code.
+
+    :param headers: response headers.
+
+    :param content: raw response body (`bytes`).
+    '''
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AiohttpStreamedResponse(object):
+    '''
+    Response of :class:`AiohttpTransport` whose body is read as it is downloaded.
+
+    :param response: :class:`aiohttp.ClientResponse`, not read yet.
+    '''
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status
+        self.headers = response.headers
+
+
+    def aiter_content(self, chunk_size=1 << 16):
+        return self._response.content.iter_chunked(chunk_size)
+
+
+    async def aclose(self):
+        self._response.release()
+
+
+class AiohttpTransport(object):
+    '''
+    Asynchronous transport, backed by a long-lived :class:`aiohttp.ClientSession`.
+    Requires `aiohttp` (`pip install tinder_api[async]`).
+
+    The session is created on first use, so that it binds to the running event loop.
+
+    :param pool_size: maximum number of connections kept alive per host.
+    '''
+    def __init__(self, pool_size=100):
+        try:
+            import aiohttp
+        except ImportError as ex:
+            raise ImportError('AiohttpTransport requires aiohttp: pip install aiohttp') from ex
+        self._aiohttp = aiohttp
+        self._pool_size = pool_size
+        self._session = None
+
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = self._aiohttp.TCPConnector(limit=0, limit_per_host=self._pool_size)
+            self._session = self._aiohttp.ClientSession(connector=connector)
+        return self._session
+
+
+    async def request(self, method, url, headers=None, data=None, stream=False):
+        '''
+        Sends a request over the pooled session and reads the whole body.
+
+        :param method: HTTP verb, upper case.
+
+        :param url: absolute URL.
+
+        :param headers: request headers.
+
+        :param data: request body.
+
+        :param stream: return as soon as the headers are received, the body is read with `aiter_content`.
+
+        :return: :class:`BufferedResponse`, or :class:`AiohttpStreamedResponse` with `stream`.
+        '''
+        # streamed bodies, ex: media uploads, cannot be sent again, and their `308` answers are not redirects
+        allow_redirects = data is None or isinstance(data, (str, bytes, bytearray))
+        if stream:
+            response = await self._get_session().request(method, url, headers=headers, data=data, allow_redirects=allow_redirects)
+            return AiohttpStreamedResponse(response)
+        async with self._get_session().request(method, url, headers=headers, data=data, allow_redirects=allow_redirects) as response:
+            content = await response.read()
+            return BufferedResponse(response.status, response.headers, content)
+
+
+    async def close(self):
+        '''
+        Closes every pooled connection.
+        '''
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def _accept_encoding():
+    # brotli is only decoded by httpx when one of the brotli packages is installed
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+            return 'br, gzip'
+        except ImportError:
+            pass
+    return 'gzip'
+
+
+class HttpxResponse(object):
+    '''
+    Response of the httpx transports, reporting the bytes on the wire against the decoded bytes.
+
+    - `wire_bytes`: bytes of the response body received, compressed. Known once the body is read.
+    - `decoded_bytes`: bytes of the response body after decompression.
+    - `request_wire_bytes`, `request_bytes`: bytes of the request body sent, compressed and not.
+    - `http_version`: ex: 'HTTP/2'.
+
+    :param response: :class:`httpx.Response`
+    '''
+    def __init__(self, response, request_bytes=0, request_wire_bytes=0):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.http_version = response.http_version
+        self.request_bytes = request_bytes
+        self.request_wire_bytes = request_wire_bytes
+
+
+    @property
+    def content(self):
+        return self._response.content
+
+
+    @property
+    def text(self):
+        return self._response.text
+
+
+    def json(self):
+        return json.loads(self._response.content)
+
+
+    @property
+    def wire_bytes(self):
+        return self._response.num_bytes_downloaded
+
+
+    @property
+    def decoded_bytes(self):
+        return len(self._response.content)
+
+
+    def iter_content(self, chunk_size=1 << 16):
+        return self._response.iter_bytes(chunk_size)
+
+
+    def aiter_content(self, chunk_size=1 << 16):
+        return self._response.aiter_bytes(chunk_size)
+
+
+    def close(self):
+        self._response.close()
+
+
+    async def aclose(self):
+        await self._response.aclose()
+
+
+class _HttpxTransportBase(object):
+    def __init__(self, http2, compress_requests_over):
+        try:
+            import httpx
+            if http2:
+                import h2  # noqa: F401, only checked here, httpx imports it itself
+        except ImportError as ex:
+            raise ImportError('%s requires httpx with HTTP/2 support: pip install httpx[http2]' % type(self).__name__) from ex
+        self._httpx = httpx
+        self._http2 = http2
+        self._compress_requests_over = compress_requests_over
+
+
+    def _encode_body(self, headers, data):
+        '''
+        :return: `tuple` of the headers, the body to send, its size before compression, and after.
+        '''
+        if data is None:
+            return headers, None, 0, 0
+        if not isinstance(data, (str, bytes, bytearray)):
+            # streamed body, ex: :class:`tinder_api.media.FileSlice`, sent as is
+            return headers, data, len(data), len(data)
+        body = data.encode('utf-8') if isinstance(data, str) else data
+        if self._compress_requests_over is None or len(body) < self._compress_requests_over:
+            return headers, body, len(body), len(body)
+        compressed = gzip.compress(body, compresslevel=5)
+        return dict(headers or {}, **{'Content-Encoding': 'gzip'}), compressed, len(body), len(compressed)
+
+
+class HttpxTransport(_HttpxTransportBase):
+    '''
+    HTTP/2 transport, backed by a long-lived :class:`httpx.Client`. Requires `httpx[http2]` (`pip install tinder_api[http2]`).
+
+    Concurrent requests to the same host are multiplexed over a single connection instead of one socket each.
+    Responses are compressed with gzip, or brotli when a brotli package is installed.
+
+    :param pool_size: maximum number of connections.
+
+    :param http2: use HTTP/2, when the server supports it. Otherwise HTTP/1.1.
+
+    :param compress_requests_over: gzip request bodies of at least this many bytes, `None` to never compress them.
+        The server must accept `Content-Encoding: gzip` requests.
+
+    :param client: an existing :class:`httpx.Client` to use.
+    '''
+    def __init__(self, pool_size=10, http2=True, compress_requests_over=None, client=None):
+        super().__init__(http2, compress_requests_over)
+        if client is None:
+            limits = self._httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            client = self._httpx.Client(http2=http2, limits=limits, headers={'Accept-Encoding': _accept_encoding()})
+        self._client = client
+
+
+    def request(self, method, url, headers=None, data=None, stream=False):
+        '''
+        Sends a request over the pooled client.
+
+        :param method: HTTP verb, upper case.
+
+        :param url: absolute URL.
+
+        :param headers: request headers.
+
+        :param data: request body.
+
+        :param stream: return as soon as the headers are received, the body is read with `iter_content`.
+
+        :return: :class:`HttpxResponse`
+        '''
+        headers, body, request_bytes, request_wire_bytes = self._encode_body(headers, data)
+        request = self._client.build_request(method, url, headers=headers, content=body)
+        response = self._client.send(request, stream=stream)
+        return HttpxResponse(response, request_bytes, request_wire_bytes)
+
+
+    def close(self):
+        '''
+        Closes every pooled connection.
+        '''
+        self._client.close()
+
+
+class AsyncHttpxTransport(_HttpxTransportBase):
+    '''
+    Asynchronous version of :class:`HttpxTransport`, backed by a long-lived :class:`httpx.AsyncClient`,
+    for :class:`tinder_api.async_api.AsyncTinder_API`.
+
+    The client is created on first use, so that it binds to the running event loop.
+
+    :param pool_size: maximum number of connections.
+    '''
+    def __init__(self, pool_size=100, http2=True, compress_requests_over=None):
+        super().__init__(http2, compress_requests_over)
+        self._pool_size = pool_size
+        self._client = None
+
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            limits = self._httpx.Limits(max_connections=self._pool_size, max_keepalive_connections=self._pool_size)
+            self._client = self._httpx.AsyncClient(http2=self._http2, limits=limits, headers={'Accept-Encoding': _accept_encoding()})
+        return self._client
+
+
+    async def request(self, method, url, headers=None, data=None, stream=False):
+        '''
+        Sends a request over the pooled client and reads the whole body.
+
+        :param stream: return as soon as the headers are received, the body is read with `aiter_content`.
+
+        :return: :class:`HttpxResponse`
+        '''
+        headers, body, request_bytes, request_wire_bytes = self._encode_body(headers, data)
+        client = self._get_client()
+        response = await client.send(client.build_request(method, url, headers=headers, content=body), stream=stream)
+        return HttpxResponse(response, request_bytes, request_wire_bytes)
+
+
+    async def close(self):
+        '''
+        Closes every pooled connection.
+        '''
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None